@@ -35,8 +35,12 @@ CREATE TABLE IF NOT EXISTS public.recipes (
     instructions TEXT NOT NULL,
     prep_time_mins INTEGER,
     cook_time_mins INTEGER,
+    total_time_mins INTEGER GENERATED ALWAYS AS (COALESCE(prep_time_mins, 0) + COALESCE(cook_time_mins, 0)) STORED,
     difficulty VARCHAR(20) DEFAULT 'easy' CHECK (difficulty IN ('easy', 'medium', 'hard')),
     servings INTEGER DEFAULT 4,
+    ingredient_count INTEGER NOT NULL DEFAULT 0, -- Maintained by trigger on recipe_ingredients
+    ingredient_ids INTEGER[] NOT NULL DEFAULT '{}', -- Maintained by trigger on recipe_ingredients
+    ingredient_names TEXT NOT NULL DEFAULT '', -- Maintained by trigger on recipe_ingredients
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -144,6 +148,30 @@ CREATE INDEX IF NOT EXISTS idx_user_favorites_user_id ON public.user_favorites(u
 CREATE INDEX IF NOT EXISTS idx_user_allergies_user_id ON public.user_allergies(user_id);
 CREATE INDEX IF NOT EXISTS idx_fridge_scans_user_id ON public.fridge_scans(user_id);
 CREATE INDEX IF NOT EXISTS idx_detected_ingredients_scan_id ON public.detected_ingredients(scan_id);
+CREATE INDEX IF NOT EXISTS idx_fridge_scans_user_active ON public.fridge_scans(user_id) WHERE is_active = true;
+
+-- Per-recipe ingredient summary used for ingredient matching
+-- (columns are added here too so existing databases pick them up)
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS ingredient_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS ingredient_ids INTEGER[] NOT NULL DEFAULT '{}';
+CREATE INDEX IF NOT EXISTS idx_recipes_ingredient_ids ON public.recipes USING GIN (ingredient_ids);
+
+-- Total time for filtering and sorting in the database (id breaks ties for keyset paging)
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS total_time_mins INTEGER
+    GENERATED ALWAYS AS (COALESCE(prep_time_mins, 0) + COALESCE(cook_time_mins, 0)) STORED;
+CREATE INDEX IF NOT EXISTS idx_recipes_total_time ON public.recipes(total_time_mins, recipe_id);
+
+-- Full-text search over title, ingredient names and instructions (weighted in that order),
+-- plus trigram indexes on title for typo-tolerant matching
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS ingredient_names TEXT NOT NULL DEFAULT '';
+ALTER TABLE public.recipes ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(ingredient_names, '')), 'B') ||
+    setweight(to_tsvector('english', COALESCE(instructions, '')), 'C')
+) STORED;
+CREATE INDEX IF NOT EXISTS idx_recipes_search_vector ON public.recipes USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_recipes_title_trgm ON public.recipes USING GIN (title gin_trgm_ops);
 
 -- Enable Row Level Security (RLS)
 ALTER TABLE public.users ENABLE ROW LEVEL SECURITY;
@@ -283,10 +311,79 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
+-- Function to recompute a recipe's ingredient summary
+CREATE OR REPLACE FUNCTION update_recipe_ingredient_summary(target_recipe_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE public.recipes r
+    SET ingredient_ids = COALESCE((
+            SELECT array_agg(ri.ingredient_id ORDER BY ri.ingredient_id)
+            FROM public.recipe_ingredients ri
+            WHERE ri.recipe_id = target_recipe_id
+        ), '{}'),
+        ingredient_count = (
+            SELECT COUNT(*)
+            FROM public.recipe_ingredients ri
+            WHERE ri.recipe_id = target_recipe_id
+        ),
+        ingredient_names = COALESCE((
+            SELECT string_agg(i.name, ' ' ORDER BY i.name)
+            FROM public.recipe_ingredients ri
+            JOIN public.ingredients i ON i.ingredient_id = ri.ingredient_id
+            WHERE ri.recipe_id = target_recipe_id
+        ), '')
+    WHERE r.recipe_id = target_recipe_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Trigger function keeping recipe ingredient summaries in sync
+CREATE OR REPLACE FUNCTION sync_recipe_ingredient_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM update_recipe_ingredient_summary(OLD.recipe_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM update_recipe_ingredient_summary(NEW.recipe_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Drop existing trigger if it exists
+DROP TRIGGER IF EXISTS sync_recipe_ingredient_summary ON public.recipe_ingredients;
+
+-- Create trigger for recipe ingredient summaries
+CREATE TRIGGER sync_recipe_ingredient_summary AFTER INSERT OR UPDATE OR DELETE ON public.recipe_ingredients
+    FOR EACH ROW EXECUTE FUNCTION sync_recipe_ingredient_summary();
+
+-- Backfill summaries for recipes created before the trigger existed
+UPDATE public.recipes r
+SET ingredient_ids = summary.ingredient_ids,
+    ingredient_count = cardinality(summary.ingredient_ids),
+    ingredient_names = summary.ingredient_names
+FROM (
+    SELECT ri.recipe_id,
+           array_agg(ri.ingredient_id ORDER BY ri.ingredient_id) AS ingredient_ids,
+           string_agg(i.name, ' ' ORDER BY i.name) AS ingredient_names
+    FROM public.recipe_ingredients ri
+    JOIN public.ingredients i ON i.ingredient_id = ri.ingredient_id
+    GROUP BY ri.recipe_id
+) summary
+WHERE r.recipe_id = summary.recipe_id
+AND (r.ingredient_ids IS DISTINCT FROM summary.ingredient_ids
+     OR r.ingredient_names IS DISTINCT FROM summary.ingredient_names);
+
 -- Function to find recipes based on available ingredients
+-- Uses the given ingredient_ids, or the user's active scans when none are passed.
+-- Candidates come from the GIN index on recipes.ingredient_ids and are filtered
+-- by match threshold against the stored ingredient_count.
+DROP FUNCTION IF EXISTS find_recipes_by_ingredients(UUID, DECIMAL);
+
 CREATE OR REPLACE FUNCTION find_recipes_by_ingredients(
     user_uuid UUID,
-    min_match_percentage DECIMAL DEFAULT 0.5
+    min_match_percentage DECIMAL DEFAULT 0.5,
+    ingredient_ids INTEGER[] DEFAULT NULL
 )
 RETURNS TABLE (
     recipe_id INTEGER,
@@ -294,46 +391,174 @@ RETURNS TABLE (
     match_percentage DECIMAL,
     missing_ingredients TEXT[]
 ) AS $$
+DECLARE
+    available_ids INTEGER[];
 BEGIN
-    RETURN QUERY
-    WITH user_ingredients AS (
-        SELECT DISTINCT di.ingredient_id
+    IF cardinality(find_recipes_by_ingredients.ingredient_ids) > 0 THEN
+        available_ids := find_recipes_by_ingredients.ingredient_ids;
+    ELSE
+        SELECT COALESCE(array_agg(DISTINCT di.ingredient_id), '{}')
+        INTO available_ids
         FROM public.detected_ingredients di
         JOIN public.fridge_scans fs ON di.scan_id = fs.scan_id
-        WHERE fs.user_id = user_uuid AND fs.is_active = true
-    ),
-    recipe_matches AS (
+        WHERE fs.user_id = user_uuid AND fs.is_active = true;
+    END IF;
+
+    RETURN QUERY
+    WITH candidates AS (
         SELECT 
             r.recipe_id,
-            r.title::TEXT,
-            COUNT(ri.ingredient_id) as total_ingredients,
-            COUNT(ui.ingredient_id) as matched_ingredients,
-            ROUND(
-                COUNT(ui.ingredient_id)::DECIMAL / COUNT(ri.ingredient_id)::DECIMAL, 
-                2
-            ) as match_percentage
+            r.title::TEXT AS recipe_title,
+            r.ingredient_ids AS recipe_ingredient_ids,
+            r.ingredient_count,
+            (
+                SELECT COUNT(*)
+                FROM unnest(r.ingredient_ids) AS recipe_ingredient(id)
+                WHERE recipe_ingredient.id = ANY(available_ids)
+            ) AS matched_count
         FROM public.recipes r
-        JOIN public.recipe_ingredients ri ON r.recipe_id = ri.recipe_id
-        LEFT JOIN user_ingredients ui ON ri.ingredient_id = ui.ingredient_id
-        GROUP BY r.recipe_id, r.title
-        HAVING COUNT(ui.ingredient_id)::DECIMAL / COUNT(ri.ingredient_id)::DECIMAL >= min_match_percentage
+        WHERE r.ingredient_ids && available_ids
+        AND r.ingredient_count > 0
     )
     SELECT 
-        rm.recipe_id,
-        rm.title,
-        rm.match_percentage,
+        c.recipe_id,
+        c.recipe_title,
+        ROUND(c.matched_count::DECIMAL / c.ingredient_count::DECIMAL, 2) as match_percentage,
         ARRAY(
             SELECT i.name
-            FROM public.recipe_ingredients ri2
-            JOIN public.ingredients i ON ri2.ingredient_id = i.ingredient_id
-            WHERE ri2.recipe_id = rm.recipe_id
-            AND ri2.ingredient_id NOT IN (SELECT ingredient_id FROM user_ingredients)
+            FROM public.ingredients i
+            WHERE i.ingredient_id = ANY(c.recipe_ingredient_ids)
+            AND NOT (i.ingredient_id = ANY(available_ids))
+            ORDER BY i.name
         )::TEXT[] as missing_ingredients
-    FROM recipe_matches rm
-    ORDER BY rm.match_percentage DESC, rm.title;
+    FROM candidates c
+    WHERE c.matched_count::DECIMAL >= min_match_percentage * c.ingredient_count
+    ORDER BY 3 DESC, c.recipe_title;
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
+-- Function for ranked recipe search
+-- Matches the full-text index (websearch syntax: quotes, OR, -exclusions) and,
+-- for typos, titles whose trigram word similarity to the query is high enough.
+-- Rank combines ts_rank_cd with title similarity; highlights wrap matched
+-- terms in <mark> tags. total_count is the number of matches before paging.
+DROP FUNCTION IF EXISTS search_recipes_fulltext(TEXT, INTEGER, INTEGER, TEXT, INTEGER);
+
+CREATE OR REPLACE FUNCTION search_recipes_fulltext(
+    search_query TEXT,
+    result_limit INTEGER DEFAULT 20,
+    result_offset INTEGER DEFAULT 0,
+    difficulty_filter TEXT DEFAULT NULL,
+    max_total_time INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    recipe_id INTEGER,
+    title TEXT,
+    prep_time_mins INTEGER,
+    cook_time_mins INTEGER,
+    total_time_mins INTEGER,
+    servings INTEGER,
+    difficulty TEXT,
+    created_at TIMESTAMP WITH TIME ZONE,
+    relevance REAL,
+    title_highlight TEXT,
+    snippet TEXT,
+    total_count BIGINT
+) AS $$
+DECLARE
+    ts_query TSQUERY := websearch_to_tsquery('english', search_query);
+BEGIN
+    RETURN QUERY
+    WITH matches AS (
+        SELECT
+            r.*,
+            ts_rank_cd(r.search_vector, ts_query) + word_similarity(search_query, r.title) AS rank
+        FROM public.recipes r
+        WHERE (r.search_vector @@ ts_query OR search_query <% r.title)
+        AND (difficulty_filter IS NULL OR r.difficulty = difficulty_filter)
+        AND (max_total_time IS NULL OR r.total_time_mins <= max_total_time)
+    ),
+    page AS (
+        SELECT m.*, COUNT(*) OVER () AS match_count
+        FROM matches m
+        ORDER BY m.rank DESC, m.recipe_id
+        LIMIT result_limit OFFSET result_offset
+    )
+    SELECT
+        p.recipe_id,
+        p.title::TEXT,
+        p.prep_time_mins,
+        p.cook_time_mins,
+        p.total_time_mins,
+        p.servings,
+        p.difficulty::TEXT,
+        p.created_at,
+        p.rank::REAL,
+        ts_headline('english', p.title, ts_query, 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true'),
+        ts_headline('english', p.instructions, ts_query,
+                    'StartSel=<mark>, StopSel=</mark>, MaxWords=25, MinWords=10, MaxFragments=2'),
+        p.match_count
+    FROM page p
+    ORDER BY p.rank DESC, p.recipe_id;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Function for search facet counts
+-- Counts recipes per difficulty, total-time bucket and ingredient category for a
+-- filter set in one query. Matching follows search_recipes_fulltext. Each facet
+-- ignores its own filter so the other values stay selectable; categories count
+-- distinct recipes under every filter.
+CREATE OR REPLACE FUNCTION get_recipe_facets(
+    search_query TEXT DEFAULT NULL,
+    difficulty_filter TEXT DEFAULT NULL,
+    max_total_time INTEGER DEFAULT NULL
+)
+RETURNS TABLE (
+    facet TEXT,
+    value TEXT,
+    recipe_count BIGINT
+) AS $$
+DECLARE
+    ts_query TSQUERY := websearch_to_tsquery('english', COALESCE(search_query, ''));
+BEGIN
+    RETURN QUERY
+    WITH base AS (
+        SELECT
+            r.recipe_id,
+            COALESCE(r.difficulty::TEXT, 'unknown') AS difficulty,
+            CASE
+                WHEN r.total_time_mins <= 15 THEN '0-15'
+                WHEN r.total_time_mins <= 30 THEN '16-30'
+                WHEN r.total_time_mins <= 60 THEN '31-60'
+                WHEN r.total_time_mins <= 120 THEN '61-120'
+                ELSE '120+'
+            END AS time_bucket,
+            (difficulty_filter IS NULL OR r.difficulty = difficulty_filter) AS difficulty_ok,
+            (max_total_time IS NULL OR r.total_time_mins <= max_total_time) AS time_ok
+        FROM public.recipes r
+        WHERE search_query IS NULL
+           OR r.search_vector @@ ts_query
+           OR search_query <% r.title
+    )
+    SELECT 'difficulty'::TEXT, b.difficulty, COUNT(*)
+    FROM base b
+    WHERE b.time_ok
+    GROUP BY b.difficulty
+    UNION ALL
+    SELECT 'total_time'::TEXT, b.time_bucket, COUNT(*)
+    FROM base b
+    WHERE b.difficulty_ok
+    GROUP BY b.time_bucket
+    UNION ALL
+    SELECT 'ingredient_category'::TEXT, i.category::TEXT, COUNT(DISTINCT b.recipe_id)
+    FROM base b
+    JOIN public.recipe_ingredients ri ON ri.recipe_id = b.recipe_id
+    JOIN public.ingredients i ON i.ingredient_id = ri.ingredient_id
+    WHERE b.difficulty_ok AND b.time_ok AND i.category IS NOT NULL
+    GROUP BY i.category;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
 -- ======================================================
 -- SCHEMA CREATION COMPLETE!
 -- Next, run the sample recipes script in a separate query
@@ -4,12 +4,14 @@ Authentication API Routes
 from flask import Blueprint, request, jsonify
 from services.auth import AuthService
 from services.database import SupabaseService
+from services.recommendation import RecommendationService
 from utils.helpers import validate_email, validate_password
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_auth_routes(auth_service: AuthService, db_service: SupabaseService) -> Blueprint:
+def create_auth_routes(auth_service: AuthService, db_service: SupabaseService,
+                       recommendation_service: RecommendationService) -> Blueprint:
     """Create authentication routes blueprint"""
     
     auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -291,6 +293,8 @@ def create_auth_routes(auth_service: AuthService, db_service: SupabaseService) -
             result = db_service.update_user_profile(user_id, update_data)
             
             if result['success']:
+                # Precomputed recommendations depend on skill level and diets
+                recommendation_service.invalidate_user(user_id)
                 return jsonify({
                     'message': 'Profile updated successfully',
                     'data': result['data']
@@ -369,6 +373,7 @@ def create_auth_routes(auth_service: AuthService, db_service: SupabaseService) -
             result = db_service.add_user_allergy(user_id, allergy_data)
             
             if result['success']:
+                recommendation_service.invalidate_user(user_id)
                 return jsonify({
                     'message': 'Allergy added successfully',
                     'data': result['data']
@@ -402,6 +407,7 @@ def create_auth_routes(auth_service: AuthService, db_service: SupabaseService) -
             result = db_service.remove_user_allergy(user_id, allergy_id)
             
             if result['success']:
+                recommendation_service.invalidate_user(user_id)
                 return jsonify({
                     'message': 'Allergy removed successfully'
                 }), 200
@@ -451,6 +457,8 @@ def create_auth_routes(auth_service: AuthService, db_service: SupabaseService) -
             result = db_service.delete_user_account(user_id)
             
             if result['success']:
+                recommendation_service.invalidate_user(user_id, recompute=False)
+                
                 # Also delete from auth service (Supabase auth)
                 try:
                     auth_service.delete_user(user_id)
@@ -2,15 +2,63 @@
 Recipe API Routes
 Handles recipe management and search
 """
-from flask import Blueprint, request, jsonify
+import json
+from typing import Any, Optional
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from services.database import SupabaseService
 from services.auth import AuthService
+from services.recommendation import RecommendationService
+from services.similarity import SimilarityService
+from services.collaborative import CollaborativeService
+from services.trending import TrendingService
+from services.autocomplete import AutocompleteService
+from utils.deadline import Deadline
 from utils.helpers import format_ingredient_name
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService) -> Blueprint:
+# Largest number of ingredient sets accepted by /recommend/batch
+MAX_BATCH_ITEMS = 1000
+
+def _is_number(value: Any) -> bool:
+    """Check for an int or float that is not a bool"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _batch_item_error(item: Any) -> Optional[str]:
+    """Describe what is wrong with one /recommend/batch item, or None if it is valid"""
+    if not isinstance(item, dict):
+        return 'must be an object'
+    if 'ingredients' in item:
+        if not isinstance(item['ingredients'], list) or not all(isinstance(name, str) for name in item['ingredients']):
+            return 'ingredients must be a list of names'
+    else:
+        detected = item.get('detected_ingredients', [])
+        if not isinstance(detected, list) or not all(isinstance(ingredient, dict) for ingredient in detected):
+            return 'detected_ingredients must be a list of objects'
+        for ingredient in detected:
+            if not isinstance(ingredient.get('name', ''), str):
+                return 'detected ingredient names must be strings'
+            if not _is_number(ingredient.get('confidence', 0)):
+                return 'detected ingredient confidences must be numbers'
+        if not _is_number(item.get('confidence_threshold', 0.5)):
+            return 'confidence_threshold must be a number'
+    if not isinstance(item.get('skill_level', ''), str):
+        return 'skill_level must be a string'
+    restrictions = item.get('dietary_restrictions', [])
+    if not isinstance(restrictions, list) or not all(isinstance(diet, str) for diet in restrictions):
+        return 'dietary_restrictions must be a list of strings'
+    allergies = item.get('allergy_ingredient_ids', [])
+    if not isinstance(allergies, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in allergies):
+        return 'allergy_ingredient_ids must be a list of ingredient ids'
+    return None
+
+def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService,
+                        recommendation_service: RecommendationService,
+                        similarity_service: SimilarityService,
+                        collaborative_service: CollaborativeService,
+                        trending_service: TrendingService,
+                        autocomplete_service: AutocompleteService) -> Blueprint:
     """Create recipe routes blueprint"""
     
     recipe_bp = Blueprint('recipes', __name__, url_prefix='/api/recipes')
@@ -57,14 +105,15 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 20, type=int)
             per_page = min(per_page, 50)  # Max 50 per page
+            cursor = request.args.get('cursor')  # next_cursor of the previous page
             
             # Try simple method first for better reliability
-            result = db_service.get_all_recipes_simple(page, per_page)
+            result = db_service.get_all_recipes_simple(page, per_page, cursor)
             
             if not result['success']:
                 # Fallback to original method
                 offset = (page - 1) * per_page
-                result = db_service.get_recipes(per_page, offset)
+                result = db_service.get_recipes(per_page, offset, cursor)
             
             if result['success']:
                 # Format recipes
@@ -96,7 +145,9 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
                     'recipes': recipes,
                     'page': page,
                     'per_page': per_page,
-                    'total': len(recipes)
+                    'total': len(recipes),
+                    'has_next': result['has_next'],
+                    'next_cursor': result['next_cursor']
                 }), 200
             else:
                 return jsonify({'error': result['error']}), 400
@@ -145,6 +196,52 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             logger.error(f"Get recipe error: {str(e)}")
             return jsonify({'error': 'Internal server error'}), 500
     
+    @recipe_bp.route('/<int:recipe_id>/similar', methods=['GET'])
+    def get_similar_recipes(recipe_id):
+        """Get recipes with similar ingredients"""
+        try:
+            limit = request.args.get('limit', 10, type=int)
+            limit = min(max(limit, 1), 50)  # Max 50 similar recipes
+            
+            result = similarity_service.get_similar_recipes(recipe_id, limit)
+            
+            if result['success']:
+                return jsonify({
+                    'recipe_id': recipe_id,
+                    'similar_recipes': result['data'],
+                    'total_found': len(result['data'])
+                }), 200
+            elif result['error'] == 'Recipe not found':
+                return jsonify({'error': result['error']}), 404
+            else:
+                return jsonify({'error': result['error']}), 503
+                
+        except Exception as e:
+            logger.error(f"Similar recipes error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
+    @recipe_bp.route('/<int:recipe_id>/also-favorited', methods=['GET'])
+    def get_also_favorited(recipe_id):
+        """Get recipes that users who favorited this recipe also favorited"""
+        try:
+            limit = request.args.get('limit', 10, type=int)
+            limit = min(max(limit, 1), collaborative_service.top_n)
+            
+            result = collaborative_service.get_also_favorited(recipe_id, limit)
+            
+            if result['success']:
+                return jsonify({
+                    'recipe_id': recipe_id,
+                    'also_favorited': result['data'],
+                    'total_found': len(result['data'])
+                }), 200
+            else:
+                return jsonify({'error': result['error']}), 503
+                
+        except Exception as e:
+            logger.error(f"Also favorited error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
     @recipe_bp.route('/create', methods=['POST'])
     def create_recipe():
         """Create new recipe"""
@@ -176,6 +273,7 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             }
             
             # Process ingredients
+            ingredients_used = []
             for ingredient_data in data['ingredients']:
                 if 'name' in ingredient_data:
                     # Get or create ingredient
@@ -184,6 +282,7 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
                     
                     if ingredient_result['success'] and ingredient_result['data']:
                         ingredient_id = ingredient_result['data']['ingredient_id']
+                        ingredients_used.append((ingredient_id, ingredient_name))
                         recipe_data['ingredients'].append({
                             'ingredient_id': ingredient_id,
                             'quantity': ingredient_data.get('quantity'),
@@ -194,6 +293,8 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             result = db_service.create_recipe(recipe_data)
             
             if result['success']:
+                recommendation_service.invalidate()
+                autocomplete_service.add_recipe(result['data']['recipe_id'], data['title'], ingredients_used)
                 return jsonify({
                     'message': 'Recipe created successfully',
                     'recipe_id': result['data']['recipe_id']
@@ -257,6 +358,22 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             logger.error(f"Search recipes error: {str(e)}")
             return jsonify({'error': 'Internal server error'}), 500
     
+    @recipe_bp.route('/autocomplete', methods=['GET'])
+    def autocomplete():
+        """Suggest recipe titles and ingredient names for a partially typed search - no auth required"""
+        try:
+            query = request.args.get('q', '')
+            limit = int(request.args.get('limit', 8))
+            if limit < 1 or limit > 20:
+                limit = 8
+            
+            suggestions = autocomplete_service.suggest(query, limit)
+            return jsonify(dict(suggestions, query=query)), 200
+            
+        except Exception as e:
+            logger.error(f"Autocomplete error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
     @recipe_bp.route('/search', methods=['GET'])
     def search_recipes_advanced():
         """Advanced recipe search with filtering and sorting - no auth required for testing"""
@@ -270,8 +387,11 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             difficulty = request.args.get('difficulty', '').strip()
             max_time = request.args.get('max_time')
             dietary_restriction = request.args.get('dietary_restriction', '').strip()
-            sort_by = request.args.get('sort_by', 'title')
+            sort_by = request.args.get('sort_by', 'relevance' if search_query else 'title')
             sort_order = request.args.get('sort_order', 'asc')
+            cursor = request.args.get('cursor')  # next_cursor of the previous page
+            include_total = request.args.get('include_total', 'true').lower() == 'true'
+            include_facets = request.args.get('include_facets', 'false').lower() == 'true'
             
             # Validate pagination
             if page < 1:
@@ -308,30 +428,37 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
                 sort_by=sort_by,
                 sort_order=sort_order,
                 page=page,
-                limit=limit
+                limit=limit,
+                cursor=cursor,
+                include_count=include_total
             )
             
             if result['success']:
                 recipes = result['data']
-                total_count = result.get('total_count', len(recipes))
                 
-                # Calculate pagination info
-                total_pages = (total_count + limit - 1) // limit
-                has_next = page < total_pages
-                has_prev = page > 1
+                # Calculate pagination info; has_next comes from the page query itself
+                pagination = {
+                    'page': page,
+                    'limit': limit,
+                    'has_next': result['has_next'],
+                    'has_prev': page > 1 or bool(cursor),
+                    'next_cursor': result['next_cursor']
+                }
+                if result['total_count'] is not None:
+                    pagination['total'] = result['total_count']
+                    pagination['total_pages'] = (result['total_count'] + limit - 1) // limit
                 
-                return jsonify({
+                response = {
                     'recipes': recipes,
-                    'pagination': {
-                        'page': page,
-                        'limit': limit,
-                        'total': total_count,
-                        'total_pages': total_pages,
-                        'has_next': has_next,
-                        'has_prev': has_prev
-                    },
+                    'pagination': pagination,
                     'filters_applied': filters
-                }), 200
+                }
+                if include_facets:
+                    facets_result = db_service.get_recipe_facets(filters)
+                    if facets_result['success']:
+                        response['facets'] = facets_result['data']
+                
+                return jsonify(response), 200
             else:
                 return jsonify({'error': result['error']}), 400
                 
@@ -396,6 +523,29 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             logger.error(f"Get favorites error: {str(e)}")
             return jsonify({'error': 'Internal server error'}), 500
     
+    @recipe_bp.route('/trending', methods=['GET'])
+    def get_trending_recipes():
+        """Get recipes favorited most recently and most often"""
+        try:
+            limit = request.args.get('limit', 10, type=int)
+            limit = min(max(limit, 1), trending_service.top_n)
+            
+            recipe_index = recommendation_service.catalog.get_index()
+            recipes = []
+            for entry in trending_service.get_trending(limit):
+                row = recipe_index.row_for(entry['recipe_id'])
+                if row is not None:
+                    recipes.append(dict(recipe_index.recipe_summary(row), trending_score=entry['score']))
+            
+            return jsonify({
+                'recipes': recipes,
+                'total_found': len(recipes)
+            }), 200
+                
+        except Exception as e:
+            logger.error(f"Trending recipes error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
     @recipe_bp.route('/favorites/<int:recipe_id>', methods=['POST'])
     def add_favorite(recipe_id):
         """Add recipe to favorites"""
@@ -410,6 +560,8 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             result = db_service.add_favorite(user_id, recipe_id)
             
             if result['success']:
+                favorite_id = result['data'][0].get('favorite_id') if result['data'] else None
+                trending_service.record_favorite(recipe_id, favorite_id)
                 return jsonify({'message': 'Recipe added to favorites'}), 201
             else:
                 return jsonify({'error': result['error']}), 400
@@ -432,6 +584,8 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             result = db_service.remove_favorite(user_id, recipe_id)
             
             if result['success']:
+                if result['data']:
+                    trending_service.record_unfavorite(recipe_id)
                 return jsonify({'message': 'Recipe removed from favorites'}), 200
             else:
                 return jsonify({'error': result['error']}), 400
@@ -499,6 +653,21 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             detected_ingredients = data.get('detected_ingredients', [])
             confidence_threshold = data.get('confidence_threshold', 0.5)
             
+            # Number of recommendations to return (1-50)
+            try:
+                k = min(max(int(data.get('k', 8)), 1), 50)
+            except (TypeError, ValueError):
+                k = 8
+            
+            # Time budget for the whole request; clients may ask for less than the default
+            deadline_seconds = recommendation_service.deadline_seconds
+            try:
+                if data.get('deadline_ms') is not None:
+                    deadline_seconds = min(max(float(data['deadline_ms']), 0) / 1000, deadline_seconds)
+            except (TypeError, ValueError):
+                pass
+            deadline = Deadline(deadline_seconds)
+            
             # Filter ingredients by confidence level
             high_confidence_ingredients = [
                 ingredient for ingredient in detected_ingredients 
@@ -512,18 +681,20 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
                     'confidence_threshold': confidence_threshold
                 }), 200
             
-            # Get user profile for dietary restrictions and preferences (with fallback)
-            dietary_restrictions = []
-            skill_level = 'beginner'
+            # Get user profile settings and allergies (with fallback), loading a cold catalog alongside
+            preferences = recommendation_service.get_user_preferences(user_id, deadline, load_catalog=True)
             
-            try:
-                profile_result = db_service.get_user_profile(user_id)
-                if profile_result and profile_result.get('success') and profile_result.get('data'):
-                    dietary_restrictions = profile_result['data'].get('dietary_restrictions', []) or []
-                    skill_level = profile_result['data'].get('skill_level', 'beginner') or 'beginner'
-            except Exception as e:
-                logger.warning(f"Could not fetch user profile, using defaults: {str(e)}")
-                # Continue with default values
+            # Without the user's allergies and diets recipes cannot be excluded, so fail closed
+            if not preferences['complete']:
+                logger.warning(f"Preferences for user {user_id} unavailable, not recommending unfiltered recipes")
+                return jsonify({
+                    'recommendations': [],
+                    'message': 'Unable to load your allergies and dietary restrictions. Please try again.',
+                    'error': 'User preferences unavailable'
+                }), 503
+            
+            dietary_restrictions = preferences['dietary_restrictions']
+            skill_level = preferences['skill_level']
             
             # Get ingredient names for logging and response
             ingredient_names = []
@@ -534,122 +705,28 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
             
             logger.info(f"Processing recommendations for ingredients: {ingredient_names}")
             
-            # Get all recipes with their ingredients for filtering
-            logger.info("Getting recipes with ingredients for recommendation filtering")
-            
-            # Get recipes with their ingredients included
-            recipes_with_ingredients_result = db_service.get_recipes_with_ingredients(limit=100)
-            
-            if recipes_with_ingredients_result['success'] and recipes_with_ingredients_result['data']:
-                all_recipes = recipes_with_ingredients_result['data'] or []
-                logger.info(f"Found {len(all_recipes)} recipes with ingredients for filtering")
-            else:
-                # Fallback to simple recipes
-                logger.warning("Could not get recipes with ingredients, using simple method")
-                all_recipes_result = db_service.get_all_recipes_simple(1, 50)
-                if all_recipes_result['success']:
-                    all_recipes = all_recipes_result['data'] or []
-                else:
-                    logger.error(f"Failed to get recipes: {all_recipes_result.get('error', 'Unknown error')}")
-                    return jsonify({
-                        'recommendations': [],
-                        'message': 'Unable to fetch recipes at the moment. Please try again later.',
-                        'high_confidence_ingredients': ingredient_names,
-                        'error': 'Database connection issue'
-                    }), 200
-            
-            # Filter recipes that contain the detected ingredients
-            matching_recipes = []
-            detected_ingredient_names_lower = [name.lower().strip() for name in ingredient_names]
-            
-            for recipe in all_recipes:
-                try:
-                    # Get recipe ingredients
-                    recipe_ingredients = []
-                    
-                    # Check if recipe has ingredients data
-                    if 'recipe_ingredients' in recipe and recipe['recipe_ingredients']:
-                        for ri in recipe['recipe_ingredients']:
-                            if ri.get('ingredients') and ri['ingredients'].get('name'):
-                                ingredient_name = ri['ingredients']['name'].lower().strip()
-                                recipe_ingredients.append(ingredient_name)
-                    
-                    # Check if any detected ingredient matches recipe ingredients
-                    matches = []
-                    for detected_ingredient in detected_ingredient_names_lower:
-                        for recipe_ingredient in recipe_ingredients:
-                            if (detected_ingredient in recipe_ingredient or 
-                                recipe_ingredient in detected_ingredient or
-                                detected_ingredient == recipe_ingredient):
-                                matches.append(detected_ingredient)
-                                break
-                    
-                    if matches:
-                        # Calculate match percentage
-                        match_percentage = len(matches) / max(len(detected_ingredient_names_lower), 1)
-                        recipe['ingredient_matches'] = matches
-                        recipe['match_percentage'] = match_percentage
-                        matching_recipes.append(recipe)
-                        logger.info(f"Recipe '{recipe.get('title', '')}' matches ingredients: {matches}")
-                
-                except Exception as e:
-                    logger.warning(f"Error processing recipe {recipe.get('recipe_id', 'unknown')}: {str(e)}")
-                    continue
+            # Select the top k recipes from the whole catalog snapshot (cached per fridge and profile)
+            top_k_result = recommendation_service.recommend(
+                ingredient_names, skill_level, confidence_threshold, dietary_restrictions, k,
+                preferences['allergy_ingredient_ids'], deadline
+            )
+            if not top_k_result['success']:
+                logger.error(f"Failed to get recommendations: {top_k_result['error']}")
+                return jsonify({
+                    'recommendations': [],
+                    'message': 'Unable to fetch recipes at the moment. Please try again later.',
+                    'high_confidence_ingredients': ingredient_names,
+                    'error': 'Database connection issue'
+                }), 200
             
-            recipes = matching_recipes
-            logger.info(f"Found {len(recipes)} recipes that contain detected ingredients")
+            matching_count = top_k_result['matching_count']
+            partial = top_k_result['partial']
+            logger.info(f"Found {matching_count} recipes that contain detected ingredients "
+                        f"({top_k_result['candidates_scored']} scored"
+                        f"{', partial after deadline' if partial else ''})")
                 
-            if recipes:
-                # Score recipes based on ingredient matches
-                scored_recipes = []
-                
-                for recipe in recipes:
-                    try:
-                        # Basic recipe info with safety checks
-                        recipe_title = recipe.get('title', '') or ''
-                        recipe_difficulty = recipe.get('difficulty', 'easy') or 'easy'
-                        match_percentage = recipe.get('match_percentage', 0)
-                        
-                        # Scoring based on ingredient match percentage and difficulty
-                        ingredient_score = match_percentage * 100  # Convert to percentage points
-                        
-                        difficulty_multiplier = 1.0
-                        if skill_level == 'beginner' and recipe_difficulty.lower() == 'easy':
-                            difficulty_multiplier = 1.2
-                        elif skill_level == 'intermediate' and recipe_difficulty.lower() in ['easy', 'medium']:
-                            difficulty_multiplier = 1.1
-                        elif skill_level == 'beginner' and recipe_difficulty.lower() == 'hard':
-                            difficulty_multiplier = 0.8
-                        
-                        final_score = ingredient_score * difficulty_multiplier
-                        
-                        # Prepare the recipe response
-                        recipe_response = {
-                            'recipe_id': recipe.get('recipe_id'),
-                            'title': recipe_title,
-                            'instructions': recipe.get('instructions', ''),
-                            'prep_time_mins': recipe.get('prep_time_mins'),
-                            'cook_time_mins': recipe.get('cook_time_mins'),
-                            'total_time_mins': recipe.get('total_time_mins'),
-                            'servings': recipe.get('servings'),
-                            'difficulty': recipe_difficulty,
-                            'recommendation_score': final_score,
-                            'ingredient_match_percentage': match_percentage,
-                            'matched_ingredients': recipe.get('ingredient_matches', []),
-                            'created_at': recipe.get('created_at')
-                        }
-                        
-                        scored_recipes.append(recipe_response)
-                        
-                    except Exception as e:
-                        logger.warning(f"Error scoring recipe {recipe.get('recipe_id', 'unknown')}: {str(e)}")
-                        continue
-                
-                # Sort by recommendation score (highest first)
-                scored_recipes.sort(key=lambda x: x.get('recommendation_score', 0), reverse=True)
-                
-                # Limit to top recommendations
-                top_recommendations = scored_recipes[:8]
+            if matching_count:
+                top_recommendations = top_k_result['recommendations']
                 
                 logger.info(f"Returning {len(top_recommendations)} filtered recipe recommendations")
                 
@@ -665,18 +742,250 @@ def create_recipe_routes(db_service: SupabaseService, auth_service: AuthService)
                     'dietary_restrictions': dietary_restrictions,
                     'skill_level': skill_level,
                     'total_found': len(top_recommendations),
-                    'total_recipes_checked': len(all_recipes),
-                    'matching_recipes_found': len(recipes)
+                    'total_recipes_checked': top_k_result['total_recipes_checked'],
+                    'matching_recipes_found': matching_count,
+                    'excluded_recipes': top_k_result['excluded_count'],
+                    'cached': top_k_result['cached'],
+                    'partial': partial
                 }), 200
             else:
                 return jsonify({
                     'recommendations': [],
                     'message': 'No matching recipes found',
-                    'high_confidence_ingredients': ingredient_names
+                    'high_confidence_ingredients': ingredient_names,
+                    'partial': partial
                 }), 200
                 
         except Exception as e:
             logger.error(f"Recipe recommendation error: {str(e)}")
             return jsonify({'error': 'Internal server error'}), 500
     
+    @recipe_bp.route('/recommend/batch', methods=['POST'])
+    def recommend_recipes_batch():
+        """Recommend recipes for many ingredient sets, streaming one JSON line per item"""
+        try:
+            # Verify authentication once for the whole batch
+            payload = verify_token_middleware()
+            if not payload:
+                return jsonify({'error': 'Authentication required'}), 401
+            
+            user_id = payload['user_id']
+            data = request.get_json() or {}
+            
+            raw_items = data.get('items', [])
+            if not isinstance(raw_items, list) or not raw_items:
+                return jsonify({'error': 'items must be a non-empty list'}), 400
+            if len(raw_items) > MAX_BATCH_ITEMS:
+                return jsonify({'error': f'At most {MAX_BATCH_ITEMS} items per batch'}), 400
+            for position, raw_item in enumerate(raw_items):
+                item_error = _batch_item_error(raw_item)
+                if item_error:
+                    return jsonify({'error': f'items[{position}]: {item_error}', 'index': position}), 400
+            
+            try:
+                k = min(max(int(data.get('k', 8)), 1), 50)
+            except (TypeError, ValueError):
+                k = 8
+            
+            # Items without their own profile use the caller's
+            preferences = recommendation_service.get_user_preferences(user_id)
+            if not preferences['complete']:
+                return jsonify({'error': 'User preferences unavailable, please try again'}), 503
+            
+            items = []
+            for raw_item in raw_items:
+                if 'ingredients' in raw_item:
+                    confidence_threshold = 0.0
+                    ingredient_names = [format_ingredient_name(name) for name in raw_item['ingredients']]
+                else:
+                    confidence_threshold = raw_item.get('confidence_threshold', 0.5)
+                    ingredient_names = [
+                        ingredient['name'] for ingredient in raw_item.get('detected_ingredients', [])
+                        if ingredient.get('name') and ingredient.get('confidence', 0) >= confidence_threshold
+                    ]
+                items.append({
+                    'ingredient_names': ingredient_names,
+                    'confidence_threshold': confidence_threshold,
+                    'skill_level': raw_item.get('skill_level', preferences['skill_level']),
+                    'dietary_restrictions': raw_item.get('dietary_restrictions', preferences['dietary_restrictions']),
+                    # Extra allergies add to the user's own, never replace them
+                    'allergy_ingredient_ids': sorted(set(preferences['allergy_ingredient_ids']) |
+                                                     set(raw_item.get('allergy_ingredient_ids', [])))
+                })
+            
+            logger.info(f"Processing batch recommendations for {len(items)} ingredient sets")
+            
+            def generate():
+                results = recommendation_service.recommend_batch(items, k)
+                for position, (raw_item, result) in enumerate(zip(raw_items, results)):
+                    line = {'index': position, 'id': raw_item.get('id')}
+                    if result['success']:
+                        line.update({
+                            'recommendations': result['recommendations'],
+                            'total_found': len(result['recommendations']),
+                            'matching_recipes_found': result['matching_count'],
+                            'excluded_recipes': result['excluded_count'],
+                            'cached': result['cached']
+                        })
+                    else:
+                        line['error'] = result['error']
+                    yield json.dumps(line) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+                
+        except Exception as e:
+            logger.error(f"Batch recommendation error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
+    @recipe_bp.route('/recommend/current', methods=['GET'])
+    def get_current_recommendations():
+        """Get recommendations for the user's current fridge, precomputed after each scan"""
+        try:
+            # Verify authentication
+            payload = verify_token_middleware()
+            if not payload:
+                return jsonify({'error': 'Authentication required'}), 401
+            
+            user_id = payload['user_id']
+            
+            result = recommendation_service.get_user_recommendations(user_id)
+            
+            if result['success']:
+                return jsonify({
+                    'recommendations': result['recommendations'],
+                    'ingredients': result['ingredients'],
+                    'skill_level': result['skill_level'],
+                    'dietary_restrictions': result['dietary_restrictions'],
+                    'total_found': len(result['recommendations']),
+                    'total_recipes_checked': result['total_recipes_checked'],
+                    'matching_recipes_found': result['matching_count'],
+                    'excluded_recipes': result['excluded_count'],
+                    'computed_at': result['computed_at'],
+                    'precomputed': result['precomputed']
+                }), 200
+            else:
+                return jsonify({'error': result['error']}), 400
+                
+        except Exception as e:
+            logger.error(f"Current recommendations error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
+    @recipe_bp.route('/near-miss', methods=['POST'])
+    def near_miss_recipes():
+        """Find recipes the user can cook by buying at most a few more ingredients"""
+        try:
+            # Verify authentication
+            payload = verify_token_middleware()
+            if not payload:
+                return jsonify({'error': 'Authentication required'}), 401
+            
+            user_id = payload['user_id']
+            data = request.get_json() or {}
+            
+            try:
+                max_missing = min(max(int(data.get('max_missing', 1)), 0), 10)
+                limit = min(max(int(data.get('limit', 20)), 1), 100)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'max_missing and limit must be integers'}), 400
+            
+            # Use the given ingredients, or the user's fridge contents
+            ingredient_names = [format_ingredient_name(name) for name in data.get('ingredients', [])]
+            if not ingredient_names:
+                fridge_result = db_service.get_user_fridge_contents(user_id)
+                if not fridge_result['success']:
+                    return jsonify({'error': fridge_result['error']}), 400
+                ingredient_names = [item['ingredient_name'] for item in fridge_result['data'] or []]
+            
+            preferences = recommendation_service.get_user_preferences(user_id)
+            if not preferences['complete']:
+                return jsonify({'error': 'User preferences unavailable, please try again'}), 503
+            result = recommendation_service.near_miss(
+                ingredient_names,
+                max_missing,
+                limit,
+                preferences['dietary_restrictions'],
+                preferences['allergy_ingredient_ids']
+            )
+            
+            if result['success']:
+                return jsonify({
+                    'recipes': result['recipes'],
+                    'ingredients': sorted(set(ingredient_names)),
+                    'max_missing': max_missing,
+                    'total_found': result['total_found'],
+                    'total_recipes_checked': result['total_recipes_checked']
+                }), 200
+            else:
+                return jsonify({'error': result['error']}), 503
+                
+        except Exception as e:
+            logger.error(f"Near-miss search error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
+    @recipe_bp.route('/shopping-list', methods=['POST'])
+    def shopping_list():
+        """Suggest the few ingredients to buy that unlock the most new recipes"""
+        try:
+            # Verify authentication
+            payload = verify_token_middleware()
+            if not payload:
+                return jsonify({'error': 'Authentication required'}), 401
+            
+            user_id = payload['user_id']
+            data = request.get_json() or {}
+            
+            try:
+                max_items = min(max(int(data.get('max_items', 5)), 1), 20)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'max_items must be an integer'}), 400
+            
+            # Use the given ingredients, or the user's fridge contents
+            ingredient_names = [format_ingredient_name(name) for name in data.get('ingredients', [])]
+            if not ingredient_names:
+                fridge_result = db_service.get_user_fridge_contents(user_id)
+                if not fridge_result['success']:
+                    return jsonify({'error': fridge_result['error']}), 400
+                ingredient_names = [item['ingredient_name'] for item in fridge_result['data'] or []]
+            
+            preferences = recommendation_service.get_user_preferences(user_id)
+            if not preferences['complete']:
+                return jsonify({'error': 'User preferences unavailable, please try again'}), 503
+            result = recommendation_service.shopping_list(
+                ingredient_names,
+                max_items,
+                preferences['dietary_restrictions'],
+                preferences['allergy_ingredient_ids']
+            )
+            
+            if result['success']:
+                return jsonify({
+                    'items': result['items'],
+                    'ingredients': sorted(set(ingredient_names)),
+                    'max_items': max_items,
+                    'unlocked_count': result['unlocked_count'],
+                    'already_cookable': result['already_cookable'],
+                    'total_recipes_checked': result['total_recipes_checked']
+                }), 200
+            else:
+                return jsonify({'error': result['error']}), 503
+                
+        except Exception as e:
+            logger.error(f"Shopping list error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
+    @recipe_bp.route('/recommend/stats', methods=['GET'])
+    def get_recommendation_stats():
+        """Get recommendation catalog and cache statistics"""
+        try:
+            # Verify authentication
+            payload = verify_token_middleware()
+            if not payload:
+                return jsonify({'error': 'Authentication required'}), 401
+            
+            return jsonify(recommendation_service.get_stats()), 200
+            
+        except Exception as e:
+            logger.error(f"Recommendation stats error: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+    
     return recipe_bp
\ No newline at end of file
@@ -2,11 +2,14 @@
 Scan API Routes
 Handles fridge scanning and ingredient detection
 """
+import asyncio
 from flask import Blueprint, request, jsonify
 from werkzeug.datastructures import FileStorage
 from services.ai_model import AIModelService
 from services.database import SupabaseService
+from services.async_database import AsyncSupabaseService
 from services.auth import AuthService
+from services.recommendation import RecommendationService
 from utils.helpers import save_uploaded_file, generate_scan_filename, format_ingredient_name
 import logging
 import os
@@ -15,7 +18,9 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService, 
-                      auth_service: AuthService, upload_folder: str) -> Blueprint:
+                      auth_service: AuthService, upload_folder: str,
+                      recommendation_service: RecommendationService,
+                      async_db_service: AsyncSupabaseService) -> Blueprint:
     """Create scan routes blueprint"""
     
     scan_bp = Blueprint('scan', __name__, url_prefix='/api/scan')
@@ -30,6 +35,22 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
         payload = auth_service.verify_jwt_token(token)
         return payload
     
+    def create_scan_and_lookup(scan_data, ingredient_names):
+        """
+        Create the scan record and look up every ingredient at once
+        
+        Returns:
+            (create_fridge_scan result, get_ingredient_by_name result per name)
+        """
+        async def run():
+            return await asyncio.gather(
+                async_db_service.create_fridge_scan(scan_data),
+                *[async_db_service.get_ingredient_by_name(name) for name in ingredient_names]
+            )
+        
+        scan_result, *ingredient_results = asyncio.run(run())
+        return scan_result, ingredient_results
+    
     @scan_bp.route('/upload', methods=['POST'])
     def scan_upload():
         """Upload and scan fridge image"""
@@ -77,7 +98,10 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
                 'scanned_at': datetime.utcnow().isoformat()
             }
             
-            scan_result = db_service.create_fridge_scan(scan_data)
+            # Create the scan record and get ingredient IDs from database concurrently
+            scan_result, ingredient_results = create_scan_and_lookup(
+                scan_data, [format_ingredient_name(p['class_name']) for p in predictions]
+            )
             
             if not scan_result['success']:
                 logger.error(f"Failed to create scan record: {scan_result['error']}")
@@ -87,12 +111,7 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
             
             # Process and save detected ingredients
             detected_ingredients = []
-            for prediction in predictions:
-                # Get ingredient ID from database
-                ingredient_result = db_service.get_ingredient_by_name(
-                    format_ingredient_name(prediction['class_name'])
-                )
-                
+            for prediction, ingredient_result in zip(predictions, ingredient_results):
                 if ingredient_result['success'] and ingredient_result['data']:
                     ingredient_id = ingredient_result['data']['ingredient_id']
                     detected_ingredients.append({
@@ -108,7 +127,10 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
                     scan_id, detected_ingredients
                 )
                 
-                if not ingredients_result['success']:
+                if ingredients_result['success']:
+                    # Fridge changed, precompute this user's recommendations
+                    recommendation_service.refresh_user_async(user_id)
+                else:
                     logger.error(f"Failed to save detected ingredients: {ingredients_result['error']}")
             
             # Clean up processed image if it was created
@@ -153,9 +175,10 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
             # Get query parameters
             limit = request.args.get('limit', 20, type=int)
             limit = min(limit, 100)  # Max 100 records
+            cursor = request.args.get('cursor')  # next_cursor of the previous page
             
             # Get scan history
-            result = db_service.get_user_scan_history(user_id, limit)
+            result = db_service.get_user_scan_history(user_id, limit, cursor)
             
             if result['success']:
                 # Format response
@@ -181,7 +204,9 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
                 
                 return jsonify({
                     'scans': scans,
-                    'total': len(scans)
+                    'total': len(scans),
+                    'has_next': result['has_next'],
+                    'next_cursor': result['next_cursor']
                 }), 200
             else:
                 return jsonify({'error': result['error']}), 400
@@ -277,9 +302,13 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
                         'bbox': prediction.get('bbox', None)  # Bounding box for overlay
                     })
                 
+                # Prefetch recommendations once the detected set stops changing
+                detections_stable = recommendation_service.track_live_scan(user_id, detected_ingredients)
+                
                 response_data = {
                     'detected_ingredients': detected_ingredients,
                     'total_detected': len(predictions),
+                    'detections_stable': detections_stable,
                     'timestamp': datetime.utcnow().isoformat()
                 }
                 
@@ -324,7 +353,10 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
                 'scanned_at': datetime.utcnow().isoformat()
             }
             
-            scan_result = db_service.create_fridge_scan(scan_data)
+            # Create the scan record and get ingredient IDs from database concurrently
+            scan_result, ingredient_results = create_scan_and_lookup(
+                scan_data, [ingredient_data['name'] for ingredient_data in ingredients_data]
+            )
             
             if not scan_result['success']:
                 logger.error(f"Failed to create scan record: {scan_result['error']}")
@@ -334,10 +366,7 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
             
             # Process and save detected ingredients
             detected_ingredients = []
-            for ingredient_data in ingredients_data:
-                # Get ingredient ID from database
-                ingredient_result = db_service.get_ingredient_by_name(ingredient_data['name'])
-                
+            for ingredient_data, ingredient_result in zip(ingredients_data, ingredient_results):
                 if ingredient_result['success'] and ingredient_result['data']:
                     ingredient_id = ingredient_result['data']['ingredient_id']
                     detected_ingredients.append({
@@ -354,6 +383,9 @@ def create_scan_routes(ai_service: AIModelService, db_service: SupabaseService,
                 )
                 
                 if ingredients_result['success']:
+                    # Fridge changed, precompute this user's recommendations
+                    recommendation_service.refresh_user_async(user_id)
+                    
                     return jsonify({
                         'message': 'Ingredients saved successfully',
                         'scan_id': scan_id,
@@ -7,12 +7,22 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from config import config
 from services.database import SupabaseService
+from services.async_database import AsyncSupabaseService
 from services.auth import AuthService  
 from services.ai_model import AIModelService
+from services.recipe_catalog import RecipeCatalog
+from services.recommendation import RecommendationService
+from services.similarity import SimilarityService
+from services.collaborative import CollaborativeService
+from services.trending import TrendingService
+from services.autocomplete import AutocompleteService
 from api.auth_routes import create_auth_routes
 from api.scan_routes import create_scan_routes
 from api.recipe_routes import create_recipe_routes
 from utils.helpers import cleanup_old_files
+from utils.cache import ReadThroughCache, TTLCache
+from utils.client_pool import ClientPool
+from utils.shared_cache import SharedCache
 
 # Configure logging
 logging.basicConfig(
@@ -33,18 +43,39 @@ def create_app(config_name='development'):
     # Configure CORS
     CORS(app, origins=app.config['ALLOWED_ORIGINS'])
     
+    def make_cache(max_size, ttl, name):
+        """Cache shared by the node's workers when SHARED_CACHE_PATH is set, else in-process"""
+        if app.config['SHARED_CACHE_PATH']:
+            return SharedCache(app.config['SHARED_CACHE_PATH'], max_size, ttl, name)
+        return TTLCache(max_size, ttl, name)
+    
     # Initialize services
     try:
         # Database service
         db_service = SupabaseService(
             app.config['SUPABASE_URL'],
             app.config['SUPABASE_KEY'],
-            app.config.get('SUPABASE_SERVICE_KEY')  # Pass service key for admin operations
+            app.config.get('SUPABASE_SERVICE_KEY'),  # Pass service key for admin operations
+            app.config['SUPABASE_POOL_SIZE'],
+            ReadThroughCache(
+                make_cache(app.config['DB_CACHE_SIZE'], 300, 'database_reads'),
+                {
+                    'recipe': app.config['DB_CACHE_RECIPE_TTL_SECONDS'],
+                    'ingredients': app.config['DB_CACHE_INGREDIENTS_TTL_SECONDS'],
+                    'user_profile': app.config['DB_CACHE_PROFILE_TTL_SECONDS'],
+                    'user_allergies': app.config['DB_CACHE_ALLERGIES_TTL_SECONDS'],
+                    'user_favorites': app.config['DB_CACHE_FAVORITES_TTL_SECONDS']
+                }
+            )
         )
         
-        # Authentication service
+        # Async variant for running independent queries concurrently
+        async_db_service = AsyncSupabaseService(db_service, app.config['SUPABASE_POOL_SIZE'])
+        
+        # Authentication service, on clients of its own since auth calls change client sessions
         auth_service = AuthService(
-            db_service.supabase,
+            ClientPool(app.config['SUPABASE_URL'], app.config['SUPABASE_KEY'],
+                       app.config['SUPABASE_POOL_SIZE'], name='supabase_auth'),
             app.config['JWT_SECRET_KEY'],
             app.config['JWT_ALGORITHM']
         )
@@ -56,6 +87,67 @@ def create_app(config_name='development'):
             app.config['CONFIDENCE_THRESHOLD']
         )
         
+        # Recipe catalog snapshot for recommendations
+        recipe_catalog = RecipeCatalog(
+            db_service,
+            app.config['RECIPE_CATALOG_REFRESH_SECONDS'],
+            app.config['RECIPE_CATALOG_FULL_REFRESH_SECONDS'],
+            app.config['RECIPE_CATALOG_PAGE_SIZE']
+        )
+        recipe_catalog.refresh_async()
+        
+        # Recommendation service with result cache and precomputed per-user lists
+        recommendation_service = RecommendationService(
+            db_service,
+            recipe_catalog,
+            make_cache(
+                app.config['RECOMMENDATION_CACHE_SIZE'],
+                app.config['RECOMMENDATION_CACHE_TTL_SECONDS'],
+                'recommendations'
+            ),
+            make_cache(
+                app.config['USER_RECOMMENDATIONS_SIZE'],
+                app.config['USER_RECOMMENDATIONS_TTL_SECONDS'],
+                'user_recommendations'
+            ),
+            stable_frames=app.config['LIVE_SCAN_STABLE_FRAMES'],
+            prefetch_confidence=app.config['LIVE_SCAN_PREFETCH_CONFIDENCE'],
+            deadline_seconds=app.config['RECOMMEND_DEADLINE_MS'] / 1000,
+            async_db_service=async_db_service,
+            refresh_all_interval=app.config['USER_RECOMMENDATIONS_REFRESH_SECONDS']
+        )
+        
+        # Similar-recipe index, built offline with `python -m services.similarity`
+        similarity_service = SimilarityService(recipe_catalog, app.config['SIMILARITY_INDEX_PATH'])
+        if similarity_service.index is None:
+            similarity_service.build_async()
+        
+        # "Also favorited" neighbours, updated by `python -m services.collaborative`
+        collaborative_service = CollaborativeService(
+            db_service,
+            recipe_catalog,
+            app.config['COLLABORATIVE_MODEL_PATH'],
+            app.config['COLLABORATIVE_NEIGHBOURS'],
+            app.config['COLLABORATIVE_RELOAD_SECONDS'],
+            app.config['RECIPE_CATALOG_PAGE_SIZE']
+        )
+        
+        # Trending leaderboard, updated as favorites are added and removed
+        trending_service = TrendingService(
+            db_service,
+            app.config['TRENDING_SNAPSHOT_PATH'],
+            app.config['TRENDING_HALF_LIFE_HOURS'],
+            snapshot_interval=app.config['TRENDING_SNAPSHOT_SECONDS']
+        )
+        
+        # Typeahead indexes over recipe titles and ingredient names
+        autocomplete_service = AutocompleteService(
+            recipe_catalog,
+            trending_service,
+            app.config['AUTOCOMPLETE_REFRESH_SECONDS']
+        )
+        autocomplete_service.build_async()
+        
         logger.info("All services initialized successfully")
         
     except Exception as e:
@@ -68,17 +160,28 @@ def create_app(config_name='development'):
     
     # Register blueprints
     app.register_blueprint(
-        create_auth_routes(auth_service, db_service)
+        create_auth_routes(auth_service, db_service, recommendation_service)
     )
     
     app.register_blueprint(
-        create_scan_routes(ai_service, db_service, auth_service, app.config['UPLOAD_FOLDER'])
+        create_scan_routes(ai_service, db_service, auth_service, app.config['UPLOAD_FOLDER'],
+                           recommendation_service, async_db_service)
     )
     
     app.register_blueprint(
-        create_recipe_routes(db_service, auth_service)
+        create_recipe_routes(db_service, auth_service, recommendation_service, similarity_service,
+                             collaborative_service, trending_service, autocomplete_service)
     )
     
+    # Database clients are checked out per request and returned when it ends
+    @app.before_request
+    def begin_database_request():
+        db_service.begin_request()
+    
+    @app.teardown_request
+    def end_database_request(error):
+        db_service.end_request()
+    
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
     def health_check():
@@ -90,6 +193,10 @@ def create_app(config_name='development'):
                 'ai_model': ai_service.is_model_loaded(),
                 'auth': True
             },
+            'recommendations': recommendation_service.get_stats(),
+            'trending': trending_service.get_stats(),
+            'database_pools': db_service.get_pool_stats(),
+            'database_cache': db_service.get_cache_stats(),
             'version': '1.0.0'
         }), 200
     
@@ -18,6 +18,18 @@ class Config:
     SUPABASE_URL = os.getenv('SUPABASE_URL')
     SUPABASE_KEY = os.getenv('SUPABASE_KEY')
     SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
+    # One client per request thread; defaults to the worker's thread count
+    SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', os.getenv('WORKER_THREADS', '8')))
+    # Read-through cache for rarely changing rows; a TTL of 0 turns it off for that method
+    DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', '4096'))
+    DB_CACHE_RECIPE_TTL_SECONDS = int(os.getenv('DB_CACHE_RECIPE_TTL_SECONDS', '600'))
+    DB_CACHE_INGREDIENTS_TTL_SECONDS = int(os.getenv('DB_CACHE_INGREDIENTS_TTL_SECONDS', '3600'))
+    DB_CACHE_PROFILE_TTL_SECONDS = int(os.getenv('DB_CACHE_PROFILE_TTL_SECONDS', '300'))
+    DB_CACHE_ALLERGIES_TTL_SECONDS = int(os.getenv('DB_CACHE_ALLERGIES_TTL_SECONDS', '300'))
+    DB_CACHE_FAVORITES_TTL_SECONDS = int(os.getenv('DB_CACHE_FAVORITES_TTL_SECONDS', '120'))
+    # File shared by every worker on the node for the database and recommendation caches,
+    # e.g. /dev/shm/ingredient_scanner_cache.db; unset keeps a separate cache in each worker
+    SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH') or None
     
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
@@ -34,6 +46,27 @@ class Config:
     CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', '0.5'))
     MAX_PREDICTIONS = int(os.getenv('MAX_PREDICTIONS', '5'))
     
+    # Recommendation Configuration
+    RECIPE_CATALOG_REFRESH_SECONDS = int(os.getenv('RECIPE_CATALOG_REFRESH_SECONDS', '60'))
+    RECIPE_CATALOG_FULL_REFRESH_SECONDS = int(os.getenv('RECIPE_CATALOG_FULL_REFRESH_SECONDS', '3600'))
+    RECIPE_CATALOG_PAGE_SIZE = int(os.getenv('RECIPE_CATALOG_PAGE_SIZE', '1000'))
+    RECOMMENDATION_CACHE_SIZE = int(os.getenv('RECOMMENDATION_CACHE_SIZE', '1024'))
+    RECOMMENDATION_CACHE_TTL_SECONDS = int(os.getenv('RECOMMENDATION_CACHE_TTL_SECONDS', '300'))
+    USER_RECOMMENDATIONS_SIZE = int(os.getenv('USER_RECOMMENDATIONS_SIZE', '10000'))
+    USER_RECOMMENDATIONS_TTL_SECONDS = int(os.getenv('USER_RECOMMENDATIONS_TTL_SECONDS', '86400'))
+    USER_RECOMMENDATIONS_REFRESH_SECONDS = int(os.getenv('USER_RECOMMENDATIONS_REFRESH_SECONDS', '300'))
+    LIVE_SCAN_STABLE_FRAMES = int(os.getenv('LIVE_SCAN_STABLE_FRAMES', '3'))
+    LIVE_SCAN_PREFETCH_CONFIDENCE = float(os.getenv('LIVE_SCAN_PREFETCH_CONFIDENCE', '0.5'))
+    RECOMMEND_DEADLINE_MS = int(os.getenv('RECOMMEND_DEADLINE_MS', '2000'))
+    SIMILARITY_INDEX_PATH = os.path.abspath(os.getenv('SIMILARITY_INDEX_PATH', '../model/similarity_index.npz'))
+    COLLABORATIVE_MODEL_PATH = os.path.abspath(os.getenv('COLLABORATIVE_MODEL_PATH', '../model/favorites_model.npz'))
+    COLLABORATIVE_NEIGHBOURS = int(os.getenv('COLLABORATIVE_NEIGHBOURS', '20'))
+    COLLABORATIVE_RELOAD_SECONDS = int(os.getenv('COLLABORATIVE_RELOAD_SECONDS', '60'))
+    TRENDING_SNAPSHOT_PATH = os.path.abspath(os.getenv('TRENDING_SNAPSHOT_PATH', '../model/trending_snapshot.json'))
+    TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '24'))
+    TRENDING_SNAPSHOT_SECONDS = int(os.getenv('TRENDING_SNAPSHOT_SECONDS', '300'))
+    AUTOCOMPLETE_REFRESH_SECONDS = int(os.getenv('AUTOCOMPLETE_REFRESH_SECONDS', '300'))
+    
     # CORS Configuration
     ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
     
@@ -0,0 +1,55 @@
+"""
+Async Database Service
+Coroutine versions of the SupabaseService methods, so independent queries can run concurrently
+"""
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from services.database import SupabaseService
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AsyncSupabaseService:
+    """
+    Async variant of SupabaseService with the same methods and results
+
+    Every public SupabaseService method is available here as a coroutine that
+    runs the call on a worker thread, so awaiting several of them with
+    asyncio.gather takes about as long as the slowest one. Worker threads run
+    outside any request scope, so each one uses a client of its own.
+    """
+
+    def __init__(self, db_service: SupabaseService, max_workers: int = 8):
+        """
+        Initialize async database service
+
+        Args:
+            db_service: Database service whose methods are wrapped
+            max_workers: Queries that can run at once
+        """
+        self.db_service = db_service
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-db')
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run any blocking call on the worker threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+
+def _coroutine_method(name: str) -> Callable:
+    """Build the coroutine version of a SupabaseService method"""
+    method = getattr(SupabaseService, name)
+
+    @functools.wraps(method)
+    async def call(self, *args, **kwargs):
+        return await self.run(getattr(self.db_service, name), *args, **kwargs)
+
+    return call
+
+
+for _name, _method in inspect.getmembers(SupabaseService, inspect.isfunction):
+    if not _name.startswith('_'):
+        setattr(AsyncSupabaseService, _name, _coroutine_method(_name))
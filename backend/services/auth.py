@@ -5,7 +5,7 @@ Handles user authentication using Supabase Auth
 import jwt
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
-from supabase import Client
+from utils.client_pool import ClientPool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,27 +13,33 @@ logger = logging.getLogger(__name__)
 class AuthService:
     """Service class for authentication operations"""
     
-    def __init__(self, supabase_client: Client, jwt_secret: str, jwt_algorithm: str = 'HS256'):
-        """Initialize authentication service"""
-        self.supabase = supabase_client
+    def __init__(self, client_pool: ClientPool, jwt_secret: str, jwt_algorithm: str = 'HS256'):
+        """
+        Initialize authentication service
+        
+        Auth calls that sign a user in or out change the session of the client
+        they run on, so they use a client of their own that is replaced
+        afterwards; the database service's clients never carry a user session.
+        """
+        self.client_pool = client_pool
         self.jwt_secret = jwt_secret
         self.jwt_algorithm = jwt_algorithm
-        # Store Supabase config for creating new instances when needed
-        self.supabase_url = supabase_client.supabase_url
-        self.supabase_key = supabase_client.supabase_key
+        self.supabase_url = client_pool.supabase_url
+        self.supabase_key = client_pool.supabase_key
     
     def register_user(self, email: str, password: str, 
                           additional_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Register a new user"""
         try:
             # Create user with Supabase Auth
-            response = self.supabase.auth.sign_up({
-                "email": email,
-                "password": password,
-                "options": {
-                    "data": additional_data or {}
-                }
-            })
+            with self.client_pool.borrow(discard=True) as client:
+                response = client.auth.sign_up({
+                    "email": email,
+                    "password": password,
+                    "options": {
+                        "data": additional_data or {}
+                    }
+                })
             
             if response.user:
                 return {
@@ -54,10 +60,11 @@ class AuthService:
     def login_user(self, email: str, password: str) -> Dict[str, Any]:
         """Login user with email and password"""
         try:
-            response = self.supabase.auth.sign_in_with_password({
-                "email": email,
-                "password": password
-            })
+            with self.client_pool.borrow(discard=True) as client:
+                response = client.auth.sign_in_with_password({
+                    "email": email,
+                    "password": password
+                })
             
             if response.user and response.session:
                 # Generate our own JWT token for API access
@@ -82,11 +89,12 @@ class AuthService:
     def logout_user(self, access_token: str) -> Dict[str, Any]:
         """Logout user"""
         try:
-            # Set session from token
-            self.supabase.auth.set_session(access_token, refresh_token=None)
-            
-            # Sign out from Supabase
-            response = self.supabase.auth.sign_out()
+            with self.client_pool.borrow(discard=True) as client:
+                # Set session from token
+                client.auth.set_session(access_token, refresh_token=None)
+                
+                # Sign out from Supabase
+                response = client.auth.sign_out()
             
             return {'success': True}
             
@@ -97,7 +105,8 @@ class AuthService:
     def refresh_token(self, refresh_token: str) -> Dict[str, Any]:
         """Refresh access token"""
         try:
-            response = self.supabase.auth.refresh_session(refresh_token)
+            with self.client_pool.borrow(discard=True) as client:
+                response = client.auth.refresh_session(refresh_token)
             
             if response.session:
                 # Generate new JWT token
@@ -127,7 +136,8 @@ class AuthService:
             
             if user_id:
                 # Get user from Supabase
-                response = self.supabase.auth.get_user(access_token)
+                with self.client_pool.borrow() as client:
+                    response = client.auth.get_user(access_token)
                 
                 if response.user:
                     return {
@@ -161,12 +171,13 @@ class AuthService:
             
             logger.info(f"Sending password reset email to {email} with redirect to {redirect_url}")
             
-            response = self.supabase.auth.reset_password_email(
-                email, 
-                options={
-                    "redirect_to": redirect_url
-                }
-            )
+            with self.client_pool.borrow() as client:
+                response = client.auth.reset_password_email(
+                    email, 
+                    options={
+                        "redirect_to": redirect_url
+                    }
+                )
             
             logger.info(f"Password reset email sent successfully to {email}")
             return {'success': True, 'message': 'Password reset email sent'}
@@ -183,18 +194,19 @@ class AuthService:
             # For password reset, we need to use the token directly with Supabase
             # The reset token is not a JWT - it's a Supabase-specific token
             try:
-                # First, verify the token by setting a temporary session
-                session_response = self.supabase.auth.set_session(reset_token, reset_token)
-                logger.info("Session established with reset token")
-                
-                if not session_response.user:
-                    logger.error("No user found with reset token")
-                    return {'success': False, 'error': 'Invalid or expired reset token'}
-                
-                # Update the password while the session is active
-                update_response = self.supabase.auth.update_user({
-                    "password": new_password
-                })
+                with self.client_pool.borrow(discard=True) as client:
+                    # First, verify the token by setting a temporary session
+                    session_response = client.auth.set_session(reset_token, reset_token)
+                    logger.info("Session established with reset token")
+                    
+                    if not session_response.user:
+                        logger.error("No user found with reset token")
+                        return {'success': False, 'error': 'Invalid or expired reset token'}
+                    
+                    # Update the password while the session is active
+                    update_response = client.auth.update_user({
+                        "password": new_password
+                    })
                 
                 if update_response.user:
                     logger.info(f"Password updated successfully for user: {update_response.user.email}")
@@ -0,0 +1,274 @@
+"""
+Autocomplete Service
+Typeahead suggestions for recipe titles and ingredient names from in-memory prefix indexes
+"""
+import bisect
+import re
+import threading
+import time
+from typing import Dict, List, Any, Optional, Sequence
+import numpy as np
+from services.recipe_catalog import RecipeCatalog
+from services.trending import TrendingService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Prefix ranges longer than this are ranked once and cached instead of scanned per request
+SCAN_LIMIT = 256
+
+# Suggestions kept per cached prefix, and the most a request can ask for
+MAX_SUGGESTIONS = 20
+
+_NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse punctuation and whitespace into single spaces"""
+    return _NON_ALPHANUMERIC.sub(' ', (text or '').lower()).strip()
+
+
+def word_keys(text: str) -> List[str]:
+    """Index keys for a text: its normalised form from the start of every word"""
+    normalized = normalize_text(text)
+    keys = [normalized[m.start():] for m in re.finditer(r'\S+', normalized)]
+    return list(dict.fromkeys(keys))
+
+
+class PrefixIndex:
+    """
+    Sorted array of keys pointing at weighted entries, for prefix lookups best-weight first
+
+    Every entry is indexed under each of its keys (one per word), so a prefix
+    of any word matches. A prefix selects a contiguous range of the sorted
+    keys; short ranges are ranked per request, and ranges longer than
+    SCAN_LIMIT are ranked once and cached until an entry under them changes.
+    """
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self.payloads: List[Dict[str, Any]] = []
+        self._weights = np.zeros(0, dtype=np.float64)
+        self._entry_keys: List[List[str]] = []
+        self._keys: List[str] = []
+        self._entries = np.zeros(0, dtype=np.int32)  # Entry of each key, in key order
+        self._top_cache: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, items: Sequence[tuple]) -> 'PrefixIndex':
+        """Build an index from (payload, text, weight) items"""
+        index = cls()
+        pairs = []
+        for payload, text, weight in items:
+            entry = index._new_entry(payload, text, weight)
+            pairs.extend((key, entry) for key in index._entry_keys[entry])
+        pairs.sort()
+        index._keys = [key for key, _ in pairs]
+        index._entries = np.array([entry for _, entry in pairs], dtype=np.int32)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def add(self, payload: Dict[str, Any], text: str, weight: float = 0.0) -> int:
+        """Add an entry and return its number"""
+        with self._lock:
+            entry = self._new_entry(payload, text, weight)
+            for key in self._entry_keys[entry]:
+                position = bisect.bisect_left(self._keys, key)
+                self._keys.insert(position, key)
+                self._entries = np.insert(self._entries, position, entry)
+                self._invalidate(key)
+            return entry
+
+    def set_weight(self, entry: int, weight: float):
+        """Change the weight of an entry"""
+        with self._lock:
+            self._weights[entry] = weight
+            for key in self._entry_keys[entry]:
+                self._invalidate(key)
+
+    def weight(self, entry: int) -> float:
+        """Get the weight of an entry"""
+        return float(self._weights[entry])
+
+    def top(self, prefix: str, limit: int = 8) -> List[int]:
+        """Get the highest weighted entries with a key starting with prefix, ties in key order"""
+        limit = min(limit, MAX_SUGGESTIONS)
+        with self._lock:
+            start = bisect.bisect_left(self._keys, prefix)
+            end = bisect.bisect_left(self._keys, prefix + '\uffff', start)
+            if end - start <= SCAN_LIMIT:
+                return self._rank(start, end, limit)
+
+            cached = self._top_cache.get(prefix)
+            if cached is None:
+                cached = self._rank(start, end, MAX_SUGGESTIONS)
+                self._top_cache[prefix] = cached
+            return cached[:limit]
+
+    def _new_entry(self, payload: Dict[str, Any], text: str, weight: float) -> int:
+        """Record an entry's payload, weight and keys without indexing them"""
+        entry = len(self.payloads)
+        self.payloads.append(payload)
+        self._entry_keys.append(word_keys(text))
+        if entry == len(self._weights):
+            self._weights = np.concatenate([self._weights, np.zeros(max(entry, 16))])
+        self._weights[entry] = weight
+        return entry
+
+    def _invalidate(self, key: str):
+        """Drop cached rankings for every prefix of a key; the caller must hold the lock"""
+        for length in range(1, len(key) + 1):
+            self._top_cache.pop(key[:length], None)
+
+    def _rank(self, start: int, end: int, limit: int) -> List[int]:
+        """Distinct entries of a key range by weight, highest first; the caller must hold the lock"""
+        entries = self._entries[start:end]
+        weights = self._weights[entries]
+        # An entry can appear once per word, so rank a few extra before de-duplicating
+        candidates = np.arange(len(entries))
+        if len(entries) > 4 * limit:
+            candidates = np.argpartition(-weights, 4 * limit)[:4 * limit]
+        ranked = self._distinct(entries, weights, candidates, limit)
+        if len(ranked) < limit and len(candidates) < len(entries):
+            ranked = self._distinct(entries, weights, np.arange(len(entries)), limit)
+        return ranked
+
+    def _distinct(self, entries: np.ndarray, weights: np.ndarray,
+                  candidates: np.ndarray, limit: int) -> List[int]:
+        """First `limit` distinct entries among candidate positions ordered by weight, then position"""
+        ranked = []
+        seen = set()
+        for position in candidates[np.lexsort((candidates, -weights[candidates]))]:
+            entry = int(entries[position])
+            if entry not in seen:
+                seen.add(entry)
+                ranked.append(entry)
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+
+class AutocompleteService:
+    """Service class for typeahead suggestions"""
+
+    def __init__(self, recipe_catalog: RecipeCatalog, trending_service: TrendingService,
+                 refresh_interval: int = 300):
+        """
+        Initialize autocomplete service; the indexes are built by build()
+
+        Recipe titles are weighted by trending score, ingredient names by the
+        number of recipes using them.
+
+        Args:
+            recipe_catalog: Catalog snapshot the indexes are built from
+            trending_service: Source of recipe popularity
+            refresh_interval: Seconds between rebuilds that pick up edits, deletes and new popularity
+        """
+        self.catalog = recipe_catalog
+        self.trending_service = trending_service
+        self.refresh_interval = refresh_interval
+
+        self.titles = PrefixIndex()
+        self.ingredients = PrefixIndex()
+        self._title_entries: Dict[int, int] = {}
+        self._ingredient_entries: Dict[int, int] = {}
+        self._added: Dict[int, tuple] = {}  # Recipes added since the catalog snapshot
+        self.built_at = 0.0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._build_thread: Optional[threading.Thread] = None
+
+    def build(self):
+        """Build both indexes from the recipe catalog"""
+        with self._build_lock:
+            started = time.perf_counter()
+            recipe_index = self.catalog.get_index()
+            popularity = self.trending_service.get_scores()
+            recipe_counts = np.bincount(recipe_index.matrix.indices, minlength=len(recipe_index.ingredient_ids))
+
+            titles = PrefixIndex.build([
+                ({'recipe_id': recipe['recipe_id'], 'title': recipe.get('title') or ''},
+                 recipe.get('title') or '', popularity.get(recipe['recipe_id'], 0.0))
+                for recipe in recipe_index.recipes
+            ])
+            ingredients = PrefixIndex.build([
+                ({'ingredient_id': ingredient_id, 'name': name}, name, float(count))
+                for ingredient_id, name, count in zip(recipe_index.ingredient_ids,
+                                                       recipe_index.ingredient_names, recipe_counts)
+            ])
+
+            with self._lock:
+                self.titles = titles
+                self.ingredients = ingredients
+                self._title_entries = {payload['recipe_id']: entry for entry, payload in enumerate(titles.payloads)}
+                self._ingredient_entries = {payload['ingredient_id']: entry
+                                            for entry, payload in enumerate(ingredients.payloads)}
+                self.built_at = time.time()
+
+                # Recipes created after the catalog snapshot was taken are added again
+                self._added = {recipe_id: added for recipe_id, added in self._added.items()
+                               if recipe_index.row_for(recipe_id) is None}
+                for recipe_id, (title, ingredients_used) in self._added.items():
+                    self._add_recipe(recipe_id, title, ingredients_used)
+
+            logger.info(f"Autocomplete indexes built: {len(titles)} titles, {len(ingredients)} ingredients "
+                        f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def build_async(self):
+        """Build the indexes in the background unless a build is already running"""
+        with self._lock:
+            if self._build_thread and self._build_thread.is_alive():
+                return
+            self._build_thread = threading.Thread(target=self.build, daemon=True)
+            self._build_thread.start()
+
+    def add_recipe(self, recipe_id: int, title: str, ingredients_used: List[tuple]):
+        """
+        Index a newly created recipe
+
+        Args:
+            recipe_id: New recipe's id
+            title: New recipe's title
+            ingredients_used: (ingredient_id, name) of each of its ingredients
+        """
+        with self._lock:
+            self._added[recipe_id] = (title, ingredients_used)
+            self._add_recipe(recipe_id, title, ingredients_used)
+
+    def suggest(self, query: str, limit: int = 8) -> Dict[str, Any]:
+        """
+        Get title and ingredient suggestions for what the user has typed so far
+
+        Returns:
+            Dict with recipes (recipe_id, title) and ingredients (ingredient_id,
+            name, recipe_count), most popular first
+        """
+        if time.time() - self.built_at >= self.refresh_interval:
+            self.build_async()
+
+        prefix = normalize_text(query)
+        if not prefix:
+            return {'recipes': [], 'ingredients': []}
+
+        titles, ingredients = self.titles, self.ingredients
+        return {
+            'recipes': [dict(titles.payloads[entry]) for entry in titles.top(prefix, limit)],
+            'ingredients': [dict(ingredients.payloads[entry], recipe_count=int(ingredients.weight(entry)))
+                            for entry in ingredients.top(prefix, limit)]
+        }
+
+    def _add_recipe(self, recipe_id: int, title: str, ingredients_used: List[tuple]):
+        """Add a recipe's title and count its ingredients; the caller must hold the lock"""
+        if recipe_id not in self._title_entries:
+            self._title_entries[recipe_id] = self.titles.add({'recipe_id': recipe_id, 'title': title}, title)
+
+        for ingredient_id, name in ingredients_used:
+            entry = self._ingredient_entries.get(ingredient_id)
+            if entry is None:
+                self._ingredient_entries[ingredient_id] = self.ingredients.add(
+                    {'ingredient_id': ingredient_id, 'name': name}, name, 1.0)
+            else:
+                self.ingredients.set_weight(entry, self.ingredients.weight(entry) + 1)
@@ -0,0 +1,311 @@
+"""
+Collaborative Filtering Service
+"Users who favorited this also favorited" neighbours from item-item co-occurrence in user_favorites
+
+The model is built by an offline job that only reads favorites added since its last run:
+
+    python -m services.collaborative            # incremental update of COLLABORATIVE_MODEL_PATH
+    python -m services.collaborative --full     # rebuild, picking up removed favorites
+"""
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Any, Optional
+import numpy as np
+from scipy import sparse
+from services.database import SupabaseService
+from services.recipe_catalog import RecipeCatalog
+import logging
+
+logger = logging.getLogger(__name__)
+
+class FavoritesModel:
+    """Item-item cosine similarity over favorite co-occurrence, keeping the top N neighbours per recipe"""
+
+    def __init__(self, top_n: int = 20):
+        """
+        Initialize an empty model
+
+        Args:
+            top_n: Neighbours kept per recipe
+        """
+        self.top_n = top_n
+        self.last_favorite_id = 0
+        self.item_ids: List[int] = []
+        self._item_by_recipe_id: Dict[int, int] = {}
+        self._user_items: Dict[str, List[int]] = {}
+        self.counts = np.zeros(0, dtype=np.int32)
+        self.cooccurrence = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.neighbour_ids = np.zeros((0, top_n), dtype=np.int64)
+        self.neighbour_scores = np.zeros((0, top_n), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
+
+    def update(self, favorites: List[Dict[str, Any]]) -> int:
+        """
+        Fold new favorites into the co-occurrence counts and refresh affected neighbour lists
+
+        Only rows whose counts changed, and rows pointing at a recipe whose
+        favorite count changed, have their top N recomputed.
+
+        Args:
+            favorites: Rows with favorite_id, user_id and recipe_id, oldest first
+
+        Returns:
+            Number of recipes whose neighbours were recomputed
+        """
+        rows, cols, new_items = [], [], []
+        for favorite in favorites:
+            self.last_favorite_id = max(self.last_favorite_id, favorite['favorite_id'])
+            item = self._item_for(favorite['recipe_id'])
+            user_items = self._user_items.setdefault(favorite['user_id'], [])
+            if item in user_items:
+                continue
+            rows.extend(user_items)
+            cols.extend([item] * len(user_items))
+            user_items.append(item)
+            new_items.append(item)
+
+        if not new_items:
+            return 0
+
+        size = len(self.item_ids)
+        pairs = sparse.coo_matrix(
+            (np.ones(2 * len(rows), dtype=np.int32), (rows + cols, cols + rows)), shape=(size, size)
+        ).tocsr()
+        self.cooccurrence = self._resized(self.cooccurrence, size) + pairs
+        self.counts = np.concatenate([self.counts, np.zeros(size - len(self.counts), dtype=np.int32)])
+        self.counts += np.bincount(new_items, minlength=size).astype(np.int32)
+
+        # Recipes with a new favorite, and every recipe co-favorited with one of them
+        touched = np.unique(new_items)
+        touched = np.union1d(touched, self.cooccurrence[touched].indices)
+        self._refresh_neighbours(touched)
+        return len(touched)
+
+    def neighbours(self, recipe_id: int, limit: Optional[int] = None) -> List[tuple]:
+        """Get (recipe_id, similarity) neighbours of a recipe, most similar first"""
+        item = self._item_by_recipe_id.get(recipe_id)
+        if item is None:
+            return []
+        ids = self.neighbour_ids[item][:limit]
+        scores = self.neighbour_scores[item][:limit]
+        return [(int(rid), float(score)) for rid, score in zip(ids, scores) if rid >= 0]
+
+    def save(self, path: str):
+        """Write the model and its incremental state to disk atomically"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        user_ids = [user_id for user_id, items in self._user_items.items() for _ in items]
+        user_items = [item for items in self._user_items.values() for item in items]
+        temp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            temp_path,
+            top_n=np.array(self.top_n),
+            last_favorite_id=np.array(self.last_favorite_id),
+            item_ids=np.array(self.item_ids, dtype=np.int64),
+            counts=self.counts,
+            neighbour_ids=self.neighbour_ids,
+            neighbour_scores=self.neighbour_scores,
+            cooccurrence_data=self.cooccurrence.data,
+            cooccurrence_indices=self.cooccurrence.indices,
+            cooccurrence_indptr=self.cooccurrence.indptr,
+            favorite_users=np.array(user_ids, dtype=str),
+            favorite_items=np.array(user_items, dtype=np.int32)
+        )
+        os.replace(temp_path, path)
+        logger.info(f"Favorites model saved to {path}: {len(self)} recipes, watermark {self.last_favorite_id}")
+
+    @classmethod
+    def load(cls, path: str, serving_only: bool = False) -> 'FavoritesModel':
+        """
+        Load a model saved with save()
+
+        Args:
+            path: Saved model path
+            serving_only: Skip the co-occurrence and per-user state only the batch job needs
+        """
+        with np.load(path) as data:
+            model = cls(int(data['top_n']))
+            model.last_favorite_id = int(data['last_favorite_id'])
+            model.item_ids = data['item_ids'].tolist()
+            model._item_by_recipe_id = {recipe_id: item for item, recipe_id in enumerate(model.item_ids)}
+            model.neighbour_ids = data['neighbour_ids']
+            model.neighbour_scores = data['neighbour_scores']
+            if serving_only:
+                return model
+
+            size = len(model.item_ids)
+            model.counts = data['counts']
+            model.cooccurrence = sparse.csr_matrix(
+                (data['cooccurrence_data'], data['cooccurrence_indices'], data['cooccurrence_indptr']),
+                shape=(size, size)
+            )
+            for user_id, item in zip(data['favorite_users'].tolist(), data['favorite_items'].tolist()):
+                model._user_items.setdefault(user_id, []).append(item)
+        return model
+
+    def _item_for(self, recipe_id: int) -> int:
+        """Get the row of a recipe, adding one if it is new"""
+        item = self._item_by_recipe_id.get(recipe_id)
+        if item is None:
+            item = len(self.item_ids)
+            self.item_ids.append(recipe_id)
+            self._item_by_recipe_id[recipe_id] = item
+        return item
+
+    def _resized(self, matrix: sparse.csr_matrix, size: int) -> sparse.csr_matrix:
+        """Grow a square CSR matrix to size x size"""
+        if matrix.shape[0] == size:
+            return matrix
+        indptr = np.concatenate([matrix.indptr, np.full(size - matrix.shape[0], matrix.indptr[-1])])
+        return sparse.csr_matrix((matrix.data, matrix.indices, indptr), shape=(size, size))
+
+    def _refresh_neighbours(self, items: np.ndarray):
+        """Recompute the top N neighbours of the given rows"""
+        size = len(self.item_ids)
+        if len(self.neighbour_ids) < size:
+            grow = size - len(self.neighbour_ids)
+            self.neighbour_ids = np.vstack([self.neighbour_ids, np.full((grow, self.top_n), -1, dtype=np.int64)])
+            self.neighbour_scores = np.vstack([self.neighbour_scores, np.zeros((grow, self.top_n), dtype=np.float32)])
+
+        item_ids = np.array(self.item_ids, dtype=np.int64)
+        norms = np.sqrt(self.counts.astype(np.float32))
+        rows = self.cooccurrence[items]
+        for position, item in enumerate(items):
+            start, end = rows.indptr[position], rows.indptr[position + 1]
+            columns = rows.indices[start:end]
+            scores = rows.data[start:end] / (norms[item] * norms[columns])
+            if len(scores) > self.top_n:
+                top = np.argpartition(-scores, self.top_n)[:self.top_n]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind='stable')]
+
+            self.neighbour_ids[item] = -1
+            self.neighbour_scores[item] = 0
+            self.neighbour_ids[item, :len(top)] = item_ids[columns[top]]
+            self.neighbour_scores[item, :len(top)] = scores[top]
+
+
+class CollaborativeService:
+    """Service class for "also favorited" recipes"""
+
+    def __init__(self, db_service: SupabaseService, recipe_catalog: RecipeCatalog,
+                 model_path: str, top_n: int = 20, reload_interval: int = 60, page_size: int = 1000):
+        """
+        Initialize collaborative service and load the batch-built model
+
+        Args:
+            db_service: Database service used by the batch job to page through favorites
+            recipe_catalog: Catalog snapshot used for recipe details
+            model_path: Path of the saved favorites model
+            top_n: Neighbours kept per recipe when building a new model
+            reload_interval: Seconds between checks for a newer model file
+            page_size: Favorites fetched per database round trip
+        """
+        self.db_service = db_service
+        self.catalog = recipe_catalog
+        self.model_path = model_path
+        self.top_n = top_n
+        self.reload_interval = reload_interval
+        self.page_size = page_size
+
+        self.model: Optional[FavoritesModel] = None
+        self._model_mtime = 0.0
+        self._last_reload_check = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> bool:
+        """Load the saved model for serving if there is one"""
+        if not os.path.exists(self.model_path):
+            logger.warning(f"Favorites model not found at {self.model_path}, "
+                           "run 'python -m services.collaborative' to build it")
+            return False
+        try:
+            mtime = os.path.getmtime(self.model_path)
+            self.model = FavoritesModel.load(self.model_path, serving_only=True)
+            self._model_mtime = mtime
+            logger.info(f"Favorites model loaded: {len(self.model)} recipes")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading favorites model: {str(e)}")
+            return False
+
+    def run_batch(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Fold favorites added since the last run into the saved model
+
+        Args:
+            full: Rebuild from every favorite, which also drops removed ones
+
+        Returns:
+            Dict with favorites_processed and recipes_updated
+        """
+        with self._lock:
+            if not full and os.path.exists(self.model_path):
+                model = FavoritesModel.load(self.model_path)
+            else:
+                model = FavoritesModel(self.top_n)
+
+            processed = 0
+            updated = 0
+            while True:
+                result = self.db_service.get_favorites_after(model.last_favorite_id, self.page_size)
+                if not result['success']:
+                    return {'success': False, 'error': result['error']}
+
+                page = result['data'] or []
+                updated += model.update(page)
+                processed += len(page)
+                if len(page) < self.page_size:
+                    break
+
+            model.save(self.model_path)
+            logger.info(f"Favorites batch {'rebuild' if full else 'update'}: "
+                        f"{processed} favorites processed, {updated} recipes updated")
+            return {'success': True, 'favorites_processed': processed, 'recipes_updated': updated}
+
+    def get_also_favorited(self, recipe_id: int, limit: int = 10) -> Dict[str, Any]:
+        """Get recipes most often favorited by the users who favorited this one"""
+        self._maybe_reload()
+        if self.model is None:
+            return {'success': False, 'error': 'Favorites model not available'}
+
+        recipe_index = self.catalog.get_index()
+        recipes = []
+        for neighbour_id, similarity in self.model.neighbours(recipe_id):
+            row = recipe_index.row_for(neighbour_id)
+            if row is None:
+                continue  # Deleted since the model was built
+            recipes.append(dict(recipe_index.recipe_summary(row), similarity=similarity))
+            if len(recipes) == limit:
+                break
+
+        return {'success': True, 'data': recipes}
+
+    def _maybe_reload(self):
+        """Pick up a model file the batch job has rewritten since it was loaded"""
+        now = time.time()
+        if now - self._last_reload_check < self.reload_interval:
+            return
+        self._last_reload_check = now
+        try:
+            if os.path.getmtime(self.model_path) > self._model_mtime:
+                self.load()
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    from config import config
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    settings = config[os.getenv('FLASK_ENV', 'development')]
+    db_service = SupabaseService(settings.SUPABASE_URL, settings.SUPABASE_KEY, settings.SUPABASE_SERVICE_KEY)
+    service = CollaborativeService(db_service, RecipeCatalog(db_service), settings.COLLABORATIVE_MODEL_PATH,
+                                   settings.COLLABORATIVE_NEIGHBOURS)
+    if not service.run_batch(full='--full' in sys.argv[1:])['success']:
+        raise SystemExit(1)
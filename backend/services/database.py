@@ -3,28 +3,90 @@ Supabase Database Service
 Handles all database operations using Supabase client
 """
 import os
+import time
 from typing import Dict, List, Optional, Any
-from supabase import create_client, Client
+from supabase import Client
 from datetime import datetime
+from utils.cache import ReadThroughCache, TTLCache, read_through
+from utils.client_pool import ClientPool
+from utils.pagination import decode_cursor, encode_cursor, keyset_filter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columns fetched for recipe list pages
+RECIPE_LIST_COLUMNS = 'recipe_id, title, prep_time_mins, cook_time_mins, total_time_mins, servings, difficulty, created_at'
+
+# Columns fetched for recipes used by the recommendation index
+RECIPE_WITH_INGREDIENTS_COLUMNS = ('recipe_id, title, prep_time_mins, cook_time_mins, total_time_mins, servings, difficulty, created_at, '
+                                   'recipe_ingredients(ingredient_id, quantity, unit, ingredients(ingredient_id, name, category, common_allergen))')
+
 class SupabaseService:
     """Service class for Supabase database operations"""
     
-    def __init__(self, supabase_url: str, supabase_key: str, service_key: str = None):
-        """Initialize Supabase client"""
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+    def __init__(self, supabase_url: str, supabase_key: str, service_key: str = None, pool_size: int = 8,
+                 read_cache: Optional[ReadThroughCache] = None):
+        """
+        Initialize Supabase client pools
+        
+        Args:
+            supabase_url: Supabase project URL
+            supabase_key: Anon key used for regular queries
+            service_key: Service key for admin operations that bypass RLS
+            pool_size: Clients per pool, normally the worker's thread count
+            read_cache: Cache for rarely changing reads (recipes, ingredients,
+                        profiles, allergies, favorites); None queries every time
+        """
+        self.pool = ClientPool(supabase_url, supabase_key, pool_size)
         
-        # Initialize admin client with service key if provided (for bypassing RLS)
+        # Initialize admin clients with service key if provided (for bypassing RLS)
         if service_key:
-            self.admin_client: Client = create_client(supabase_url, service_key)
-            logger.info("Supabase admin client initialized successfully")
+            self.admin_pool = ClientPool(supabase_url, service_key, pool_size, name='supabase_admin')
+            logger.info("Supabase admin client pool initialized successfully")
         else:
-            self.admin_client = None
+            self.admin_pool = None
+        
+        # Exact row counts are expensive, so list pages share them for a minute
+        self._count_cache = TTLCache(256, 60, name='recipe_counts')
+        self._facet_cache = TTLCache(256, 60, name='recipe_facets')
+        self.read_cache = read_cache
             
-        logger.info("Supabase client initialized successfully")
+        logger.info(f"Supabase client pool initialized successfully (size {pool_size})")
+    
+    @property
+    def supabase(self) -> Client:
+        """Client for the current request, or this thread's own client outside requests"""
+        return self.pool.client()
+    
+    @property
+    def admin_client(self) -> Optional[Client]:
+        """Admin client for the current request, or None without a service key"""
+        return self.admin_pool.client() if self.admin_pool else None
+    
+    def begin_request(self):
+        """Start a request scope; clients used until end_request() are checked out for it alone"""
+        self.pool.begin()
+        if self.admin_pool:
+            self.admin_pool.begin()
+    
+    def end_request(self):
+        """End a request scope and return its clients to the pools"""
+        self.pool.end()
+        if self.admin_pool:
+            self.admin_pool.end()
+    
+    def get_pool_stats(self) -> List[Dict[str, Any]]:
+        """Get client pool statistics"""
+        return [pool.stats() for pool in (self.pool, self.admin_pool) if pool]
+    
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Get read cache statistics, or None without a read cache"""
+        return self.read_cache.stats() if self.read_cache else None
+    
+    def _invalidate(self, namespace: str, *args):
+        """Drop read cache entries made stale by a write"""
+        if self.read_cache:
+            self.read_cache.invalidate(namespace, *args)
     
     # User Management
     def create_user_profile(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -33,11 +95,13 @@ class SupabaseService:
             # Use admin client if available to bypass RLS policies
             client = self.admin_client if self.admin_client else self.supabase
             response = client.table('users').insert(user_data).execute()
+            self._invalidate('user_profile', user_data.get('user_id'))
             return {'success': True, 'data': response.data}
         except Exception as e:
             logger.error(f"Error creating user profile: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @read_through('user_profile')
     def get_user_profile(self, user_id: str) -> Dict[str, Any]:
         """Get user profile by ID"""
         try:
@@ -51,12 +115,14 @@ class SupabaseService:
         """Update user profile"""
         try:
             response = self.supabase.table('users').update(update_data).eq('user_id', user_id).execute()
+            self._invalidate('user_profile', user_id)
             return {'success': True, 'data': response.data}
         except Exception as e:
             logger.error(f"Error updating user profile: {str(e)}")
             return {'success': False, 'error': str(e)}
     
     # Ingredient Management
+    @read_through('ingredients')
     def get_all_ingredients(self) -> Dict[str, Any]:
         """Get all available ingredients"""
         try:
@@ -76,19 +142,19 @@ class SupabaseService:
             return {'success': False, 'error': str(e)}
     
     # Recipe Management
-    def get_recipes(self, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
-        """Get recipes with pagination"""
+    def get_recipes(self, limit: int = 50, offset: int = 0, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get recipes with pagination, newest first; pass the previous page's next_cursor to continue"""
         try:
-            response = (self.supabase.table('recipes')
-                       .select('*, recipe_ingredients(*, ingredients(*))')
-                       .range(offset, offset + limit - 1)
-                       .order('created_at', desc=True)
-                       .execute())
-            return {'success': True, 'data': response.data}
+            query = (self.supabase.table('recipes')
+                    .select('*, recipe_ingredients(*, ingredients(*))'))
+            page = self._keyset_page(query, 'created_at', True, 'recipe_id', limit, cursor, offset)
+            return {'success': True, 'data': page['rows'], 'has_next': page['has_next'],
+                    'next_cursor': page['next_cursor']}
         except Exception as e:
             logger.error(f"Error fetching recipes: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @read_through('recipe')
     def get_recipe_by_id(self, recipe_id: int) -> Dict[str, Any]:
         """Get recipe by ID with ingredients"""
         try:
@@ -116,6 +182,8 @@ class SupabaseService:
             }).execute()
             
             recipe_id = recipe_response.data[0]['recipe_id']
+            self._count_cache.clear()
+            self._facet_cache.clear()
             
             # Insert recipe ingredients
             if 'ingredients' in recipe_data:
@@ -131,6 +199,8 @@ class SupabaseService:
                 if ingredient_inserts:
                     self.supabase.table('recipe_ingredients').insert(ingredient_inserts).execute()
             
+            # A lookup of the new id before it existed may have cached "not found"
+            self._invalidate('recipe', recipe_id)
             return {'success': True, 'data': {'recipe_id': recipe_id}}
         except Exception as e:
             logger.error(f"Error creating recipe: {str(e)}")
@@ -140,10 +210,11 @@ class SupabaseService:
                                           min_match_percentage: float = 0.5) -> Dict[str, Any]:
         """Find recipes based on available ingredients"""
         try:
-            # Use the stored function for recipe matching
+            # Use the stored function for recipe matching (falls back to fridge contents without ingredient_ids)
             response = self.supabase.rpc('find_recipes_by_ingredients', {
                 'user_uuid': user_id,
-                'min_match_percentage': min_match_percentage
+                'min_match_percentage': min_match_percentage,
+                'ingredient_ids': ingredient_ids or None
             }).execute()
             return {'success': True, 'data': response.data}
         except Exception as e:
@@ -158,6 +229,7 @@ class SupabaseService:
                 'user_id': user_id,
                 'recipe_id': recipe_id
             }).execute()
+            self._invalidate('user_favorites', user_id)
             return {'success': True, 'data': response.data}
         except Exception as e:
             logger.error(f"Error adding favorite: {str(e)}")
@@ -171,11 +243,13 @@ class SupabaseService:
                        .eq('user_id', user_id)
                        .eq('recipe_id', recipe_id)
                        .execute())
+            self._invalidate('user_favorites', user_id)
             return {'success': True, 'data': response.data}
         except Exception as e:
             logger.error(f"Error removing favorite: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @read_through('user_favorites')
     def get_user_favorites(self, user_id: str) -> Dict[str, Any]:
         """Get user's favorite recipes with full recipe details"""
         try:
@@ -203,17 +277,34 @@ class SupabaseService:
             logger.error(f"Error checking favorite status: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def get_favorites_after(self, last_favorite_id: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """Get the next page of all users' favorites after a favorite_id watermark - uses admin client to bypass RLS"""
+        try:
+            client = self.admin_client if self.admin_client else self.supabase
+            response = (client.table('user_favorites')
+                       .select('favorite_id, user_id, recipe_id, added_at')
+                       .gt('favorite_id', last_favorite_id)
+                       .order('favorite_id')
+                       .limit(limit)
+                       .execute())
+            return {'success': True, 'data': response.data}
+        except Exception as e:
+            logger.error(f"Error fetching favorites after {last_favorite_id}: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
     # User Allergies
     def add_user_allergy(self, user_id: str, allergy_data: Dict[str, Any]) -> Dict[str, Any]:
         """Add user allergy"""
         try:
             allergy_data['user_id'] = user_id
             response = self.supabase.table('user_allergies').insert(allergy_data).execute()
+            self._invalidate('user_allergies', user_id)
             return {'success': True, 'data': response.data}
         except Exception as e:
             logger.error(f"Error adding user allergy: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @read_through('user_allergies')
     def get_user_allergies(self, user_id: str) -> Dict[str, Any]:
         """Get user's allergies"""
         try:
@@ -234,6 +325,7 @@ class SupabaseService:
                        .eq('user_id', user_id)
                        .eq('allergy_id', allergy_id)
                        .execute())
+            self._invalidate('user_allergies', user_id)
             return {'success': True, 'data': response.data}
         except Exception as e:
             logger.error(f"Error removing user allergy: {str(e)}")
@@ -247,6 +339,8 @@ class SupabaseService:
                        .delete()
                        .eq('user_id', user_id)
                        .execute())
+            for namespace in ('user_profile', 'user_allergies', 'user_favorites'):
+                self._invalidate(namespace, user_id)
             return {'success': True, 'data': response.data}
         except Exception as e:
             logger.error(f"Error deleting user account: {str(e)}")
@@ -294,209 +388,316 @@ class SupabaseService:
             logger.error(f"Error fetching fridge contents: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def get_user_scan_history(self, user_id: str, limit: int = 20) -> Dict[str, Any]:
-        """Get user's scan history"""
+    def get_user_scan_history(self, user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get user's scan history, newest first; pass the previous page's next_cursor to continue"""
         try:
-            response = (self.supabase.table('fridge_scans')
-                       .select('*, detected_ingredients(*, ingredients(*))')
-                       .eq('user_id', user_id)
-                       .order('scanned_at', desc=True)
-                       .limit(limit)
-                       .execute())
-            return {'success': True, 'data': response.data}
+            query = (self.supabase.table('fridge_scans')
+                    .select('*, detected_ingredients(*, ingredients(*))')
+                    .eq('user_id', user_id))
+            page = self._keyset_page(query, 'scanned_at', True, 'scan_id', limit, cursor)
+            return {'success': True, 'data': page['rows'], 'has_next': page['has_next'],
+                    'next_cursor': page['next_cursor']}
         except Exception as e:
             logger.error(f"Error fetching scan history: {str(e)}")
             return {'success': False, 'error': str(e)}
     
     def search_recipes_advanced(self, filters: Dict[str, Any] = None, 
                                sort_by: str = 'title', sort_order: str = 'asc',
-                               page: int = 1, limit: int = 20) -> Dict[str, Any]:
-        """Advanced recipe search with filtering and sorting"""
+                               page: int = 1, limit: int = 20, cursor: Optional[str] = None,
+                               include_count: bool = True) -> Dict[str, Any]:
+        """
+        Advanced recipe search with filtering and sorting
+        
+        Pages continue from cursor (the previous page's next_cursor) when given,
+        otherwise from page. The exact total_count is only computed when
+        include_count is set, and is cached per filter set.
+        
+        sort_by='relevance' with a search term ranks matches with the
+        search_recipes_fulltext function, which also tolerates typos in titles
+        and returns highlights; those pages are offset-based only.
+        """
+        started = time.perf_counter()
+        queries = 0
         try:
             if filters is None:
                 filters = {}
             
-            # Start building the query - only use columns that exist
-            query = (self.supabase.table('recipes')
-                    .select('recipe_id, title, prep_time_mins, cook_time_mins, servings, difficulty, created_at', count='exact'))
-            
-            # Apply text search filter
-            if 'search' in filters and filters['search']:
-                search_term = filters['search']
-                # Search only in title since description column doesn't exist
-                query = query.ilike('title', f'%{search_term}%')
-            
-            # Note: Category filtering disabled as column doesn't exist
-            # if 'category' in filters and filters['category']:
-            #     query = query.eq('category', filters['category'])
-            
-            # Apply difficulty filter
-            if 'difficulty' in filters and filters['difficulty']:
-                query = query.eq('difficulty', filters['difficulty'])
-            
-            # Note: Dietary restrictions filtering disabled as column doesn't exist
-            # if 'dietary_restriction' in filters and filters['dietary_restriction']:
-            #     restriction = filters['dietary_restriction']
-            #     if restriction == 'vegetarian':
-            #         query = query.or_('dietary_restrictions.cs.{vegetarian},dietary_restrictions.cs.{vegan}')
-            #     elif restriction == 'vegan':
-            #         query = query.cs('dietary_restrictions', f'{{{restriction}}}')
-            #     else:
-            #         query = query.cs('dietary_restrictions', f'{{{restriction}}}')
-            
-            # Apply max time filter (prep_time + cook_time)
-            if 'max_total_time' in filters and filters['max_total_time']:
-                max_time = filters['max_total_time']
-                # Use an RPC call or handle this in a more complex way
-                # For now, we'll filter on prep_time only as an approximation
-                query = query.lte('prep_time_mins', max_time)
-            
-            # Apply sorting
-            valid_sort_fields = ['title', 'prep_time_mins', 'cook_time_mins', 'difficulty', 'servings', 'created_at']
-            if sort_by not in valid_sort_fields:
-                sort_by = 'title'
-            
-            desc = sort_order.lower() == 'desc'
-            query = query.order(sort_by, desc=desc)
-            
-            # Apply pagination
-            offset = (page - 1) * limit
-            query = query.range(offset, offset + limit - 1)
+            if sort_by == 'relevance' and filters.get('search'):
+                page_result = self._relevance_page(filters, limit, (page - 1) * limit)
+                queries += 1
+            else:
+                # Start building the query - only use columns that exist
+                query = self._apply_search_filters(self.supabase.table('recipes').select(RECIPE_LIST_COLUMNS), filters)
+                
+                # Apply sorting
+                valid_sort_fields = ['title', 'prep_time_mins', 'cook_time_mins', 'total_time_mins', 'difficulty',
+                                     'servings', 'created_at']
+                if sort_by not in valid_sort_fields:
+                    sort_by = 'title'
+                
+                desc = sort_order.lower() == 'desc'
+                
+                # Execute query for one page
+                page_result = self._keyset_page(query, sort_by, desc, 'recipe_id', limit, cursor, (page - 1) * limit)
+                queries += 1
             
-            # Execute query
-            response = query.execute()
+            # Fetch ingredients for the whole page in one query and group them by recipe
+            ingredients_by_recipe: Dict[int, List[Dict[str, Any]]] = {}
+            if page_result['rows']:
+                recipe_ids = [recipe['recipe_id'] for recipe in page_result['rows']]
+                try:
+                    ingredients_response = (self.supabase.table('recipe_ingredients')
+                                         .select('recipe_id, ingredients(ingredient_id, name)')
+                                         .in_('recipe_id', recipe_ids)
+                                         .execute())
+                    queries += 1
+                    
+                    for ri in ingredients_response.data or []:
+                        if ri.get('ingredients'):
+                            ingredients_by_recipe.setdefault(ri['recipe_id'], []).append({
+                                'ingredient_id': ri['ingredients']['ingredient_id'],
+                                'name': ri['ingredients']['name']
+                            })
+                except Exception as ingredient_error:
+                    logger.warning(f"Could not fetch ingredients for recipes {recipe_ids}: {ingredient_error}")
             
-            # Process the results and fetch ingredients separately
+            # Process the results
             recipes = []
-            if response.data:
-                for recipe in response.data:
-                    # Fetch ingredients for this recipe separately
-                    ingredients = []
-                    try:
-                        ingredients_response = (self.supabase.table('recipe_ingredients')
-                                             .select('ingredients(ingredient_id, name)')
-                                             .eq('recipe_id', recipe['recipe_id'])
-                                             .execute())
-                        
-                        if ingredients_response.data:
-                            for ri in ingredients_response.data:
-                                if ri.get('ingredients'):
-                                    ingredients.append({
-                                        'ingredient_id': ri['ingredients']['ingredient_id'],
-                                        'name': ri['ingredients']['name']
-                                    })
-                    except Exception as ingredient_error:
-                        logger.warning(f"Could not fetch ingredients for recipe {recipe['recipe_id']}: {ingredient_error}")
-                    
-                    # Calculate total time
-                    prep_time = recipe.get('prep_time_mins', 0) or 0
-                    cook_time = recipe.get('cook_time_mins', 0) or 0
-                    total_time = prep_time + cook_time
-                    
-                    processed_recipe = {
-                        'recipe_id': recipe['recipe_id'],
-                        'title': recipe['title'],
-                        'description': f"Delicious {recipe['title'].lower()} recipe",  # Generate description from title
-                        'prep_time_mins': prep_time,
-                        'cook_time_mins': cook_time,
-                        'total_time_mins': total_time,
-                        'servings': recipe.get('servings'),
-                        'difficulty': recipe.get('difficulty', 'easy'),
-                        'category': None,  # Column doesn't exist in current schema  
-                        'dietary_restrictions': [],  # Column doesn't exist in current schema
-                        'ingredients': ingredients,
-                        'created_at': recipe.get('created_at')
+            for recipe in page_result['rows']:
+                ingredients = ingredients_by_recipe.get(recipe['recipe_id'], [])
+                
+                # Calculate total time
+                prep_time = recipe.get('prep_time_mins', 0) or 0
+                cook_time = recipe.get('cook_time_mins', 0) or 0
+                total_time = recipe.get('total_time_mins', prep_time + cook_time)
+                
+                processed_recipe = {
+                    'recipe_id': recipe['recipe_id'],
+                    'title': recipe['title'],
+                    'description': f"Delicious {recipe['title'].lower()} recipe",  # Generate description from title
+                    'prep_time_mins': prep_time,
+                    'cook_time_mins': cook_time,
+                    'total_time_mins': total_time,
+                    'servings': recipe.get('servings'),
+                    'difficulty': recipe.get('difficulty', 'easy'),
+                    'category': None,  # Column doesn't exist in current schema  
+                    'dietary_restrictions': [],  # Column doesn't exist in current schema
+                    'ingredients': ingredients,
+                    'created_at': recipe.get('created_at')
+                }
+                if 'relevance' in recipe:
+                    processed_recipe['relevance'] = recipe['relevance']
+                    processed_recipe['highlights'] = {
+                        'title': recipe.get('title_highlight'),
+                        'instructions': recipe.get('snippet')
                     }
-                    recipes.append(processed_recipe)
+                recipes.append(processed_recipe)
             
-            # Get total count from the response
-            total_count = getattr(response, 'count', len(recipes))
+            # Get the total count only when asked for, from the cache when possible
+            total_count = page_result.get('total_count')
+            if include_count and total_count is None and sort_by != 'relevance':
+                count_query = self._apply_search_filters(
+                    self.supabase.table('recipes').select('recipe_id', count='exact'), filters
+                )
+                total_count, counted = self._cached_count(('search', tuple(sorted(filters.items()))), count_query)
+                queries += counted
+            
+            logger.info(f"Advanced recipe search returned {len(recipes)} recipes with {queries} queries "
+                        f"in {(time.perf_counter() - started) * 1000:.1f}ms")
             
             return {
                 'success': True, 
                 'data': recipes, 
-                'total_count': total_count
+                'total_count': total_count,
+                'has_next': page_result['has_next'],
+                'next_cursor': page_result['next_cursor']
             }
             
         except Exception as e:
-            logger.error(f"Error in advanced recipe search: {str(e)}")
+            logger.error(f"Error in advanced recipe search after {queries} queries "
+                         f"in {(time.perf_counter() - started) * 1000:.1f}ms: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def get_all_recipes_simple(self, page: int = 1, limit: int = 20) -> Dict[str, Any]:
-        """Get all recipes with basic information for debugging"""
+    def get_recipe_facets(self, filters: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Count recipes per difficulty, total-time bucket and ingredient category for a filter set
+        
+        All three facets come from one get_recipe_facets query and are cached per
+        filter combination. Each facet ignores its own filter, so e.g. the
+        difficulty counts still list every difficulty when one is selected.
+        """
         try:
-            offset = (page - 1) * limit
+            filters = filters or {}
+            params = {
+                'search_query': (filters.get('search') or '').strip() or None,
+                'difficulty_filter': filters.get('difficulty') or None,
+                'max_total_time': filters.get('max_total_time') or None
+            }
+            key = tuple(sorted(params.items()))
+            facets = self._facet_cache.get(key)
+            if facets is None:
+                response = self.supabase.rpc('get_recipe_facets', params).execute()
+                facets = {'difficulty': {}, 'total_time': {}, 'ingredient_category': {}}
+                for row in response.data or []:
+                    # NULL values (e.g. a recipe without a difficulty) would mix None into string keys
+                    value = row['value'] if row['value'] is not None else 'unknown'
+                    facets[row['facet']][value] = facets[row['facet']].get(value, 0) + row['recipe_count']
+                self._facet_cache.set(key, facets)
             
-            response = (self.supabase.table('recipes')
-                       .select('recipe_id, title, prep_time_mins, cook_time_mins, servings, difficulty, created_at', count='exact')
-                       .order('created_at', desc=True)
-                       .range(offset, offset + limit - 1)
-                       .execute())
+            return {'success': True, 'data': facets}
+        except Exception as e:
+            logger.error(f"Error counting recipe facets: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def _apply_search_filters(self, query, filters: Dict[str, Any]):
+        """Apply advanced search filters to a recipes query"""
+        # Apply text search filter over title, ingredient names and instructions (GIN indexed)
+        if 'search' in filters and filters['search']:
+            query = query.filter('search_vector', 'wfts(english)', filters['search'])
+        
+        # Note: Category filtering disabled as column doesn't exist
+        # if 'category' in filters and filters['category']:
+        #     query = query.eq('category', filters['category'])
+        
+        # Apply difficulty filter
+        if 'difficulty' in filters and filters['difficulty']:
+            query = query.eq('difficulty', filters['difficulty'])
+        
+        # Note: Dietary restrictions filtering disabled as column doesn't exist
+        # if 'dietary_restriction' in filters and filters['dietary_restriction']:
+        #     restriction = filters['dietary_restriction']
+        #     if restriction == 'vegetarian':
+        #         query = query.or_('dietary_restrictions.cs.{vegetarian},dietary_restrictions.cs.{vegan}')
+        #     elif restriction == 'vegan':
+        #         query = query.cs('dietary_restrictions', f'{{{restriction}}}')
+        #     else:
+        #         query = query.cs('dietary_restrictions', f'{{{restriction}}}')
+        
+        # Apply max time filter on the stored prep_time + cook_time column (indexed)
+        if 'max_total_time' in filters and filters['max_total_time']:
+            query = query.lte('total_time_mins', filters['max_total_time'])
+        
+        return query
+    
+    def get_all_recipes_simple(self, page: int = 1, limit: int = 20, cursor: Optional[str] = None,
+                               include_count: bool = False) -> Dict[str, Any]:
+        """Get all recipes with basic information, newest first; pass the previous page's next_cursor to continue"""
+        try:
+            query = self.supabase.table('recipes').select(RECIPE_LIST_COLUMNS)
+            page_result = self._keyset_page(query, 'created_at', True, 'recipe_id', limit, cursor, (page - 1) * limit)
             
             recipes = []
-            if response.data:
-                for recipe in response.data:
-                    prep_time = recipe.get('prep_time_mins', 0) or 0
-                    cook_time = recipe.get('cook_time_mins', 0) or 0
-                    total_time = prep_time + cook_time
-                    
-                    processed_recipe = {
-                        'recipe_id': recipe['recipe_id'],
-                        'title': recipe['title'],
-                        'description': f"Delicious {recipe['title'].lower()} recipe",  # Generate description from title
-                        'prep_time_mins': prep_time,
-                        'cook_time_mins': cook_time,
-                        'total_time_mins': total_time,
-                        'servings': recipe.get('servings'),
-                        'difficulty': recipe.get('difficulty', 'easy'),
-                        'category': None,  # Column doesn't exist in current schema
-                        'dietary_restrictions': [],  # Column doesn't exist in current schema
-                        'ingredients': [],  # Will be populated separately if needed
-                        'created_at': recipe.get('created_at')
-                    }
-                    recipes.append(processed_recipe)
+            for recipe in page_result['rows']:
+                prep_time = recipe.get('prep_time_mins', 0) or 0
+                cook_time = recipe.get('cook_time_mins', 0) or 0
+                total_time = recipe.get('total_time_mins', prep_time + cook_time)
+                
+                processed_recipe = {
+                    'recipe_id': recipe['recipe_id'],
+                    'title': recipe['title'],
+                    'description': f"Delicious {recipe['title'].lower()} recipe",  # Generate description from title
+                    'prep_time_mins': prep_time,
+                    'cook_time_mins': cook_time,
+                    'total_time_mins': total_time,
+                    'servings': recipe.get('servings'),
+                    'difficulty': recipe.get('difficulty', 'easy'),
+                    'category': None,  # Column doesn't exist in current schema
+                    'dietary_restrictions': [],  # Column doesn't exist in current schema
+                    'ingredients': [],  # Will be populated separately if needed
+                    'created_at': recipe.get('created_at')
+                }
+                recipes.append(processed_recipe)
             
-            total_count = getattr(response, 'count', len(recipes))
+            total_count = None
+            if include_count:
+                count_query = self.supabase.table('recipes').select('recipe_id', count='exact')
+                total_count, _ = self._cached_count(('recipes',), count_query)
             
             return {
                 'success': True, 
                 'data': recipes, 
-                'total_count': total_count
+                'total_count': total_count,
+                'has_next': page_result['has_next'],
+                'next_cursor': page_result['next_cursor']
             }
             
         except Exception as e:
             logger.error(f"Error getting simple recipes: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def _keyset_page(self, query, sort_by: str, desc: bool, id_column: str, limit: int,
+                     cursor: Optional[str] = None, offset: int = 0) -> Dict[str, Any]:
+        """
+        Execute a list query for one page ordered by (sort_by, id_column)
+        
+        With a cursor the page starts right after the cursor's row, so deep pages
+        cost the same as the first; without one it starts at offset. One extra
+        row is fetched to tell whether a next page exists.
+        
+        Returns:
+            Dict with rows, has_next and next_cursor (None on the last page)
+        """
+        if cursor:
+            position = decode_cursor(cursor, sort_by, desc)
+            query = query.or_(keyset_filter(sort_by, desc, position['v'], id_column, position['id']))
+            query = query.order(sort_by, desc=desc).order(id_column).limit(limit + 1)
+        else:
+            query = query.order(sort_by, desc=desc).order(id_column).range(offset, offset + limit)
+        
+        rows = query.execute().data or []
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_next:
+            next_cursor = encode_cursor(sort_by, desc, rows[-1].get(sort_by), rows[-1][id_column])
+        return {'rows': rows, 'has_next': has_next, 'next_cursor': next_cursor}
+    
+    def _relevance_page(self, filters: Dict[str, Any], limit: int, offset: int = 0) -> Dict[str, Any]:
+        """
+        Get one page of search matches, best first, from search_recipes_fulltext
+        
+        Returns:
+            Dict with rows (carrying relevance and highlights), has_next,
+            next_cursor (always None) and total_count
+        """
+        response = self.supabase.rpc('search_recipes_fulltext', {
+            'search_query': filters['search'],
+            'result_limit': limit,
+            'result_offset': offset,
+            'difficulty_filter': filters.get('difficulty') or None,
+            'max_total_time': filters.get('max_total_time') or None
+        }).execute()
+        
+        rows = response.data or []
+        total_count = rows[0]['total_count'] if rows else None
+        if total_count is None and offset == 0:
+            total_count = 0
+        return {
+            'rows': rows,
+            'has_next': total_count is not None and offset + len(rows) < total_count,
+            'next_cursor': None,
+            'total_count': total_count
+        }
+    
+    def _cached_count(self, key: tuple, count_query) -> tuple:
+        """Get an exact row count from the cache, or run count_query; returns (count, queries run)"""
+        count = self._count_cache.get(key)
+        if count is not None:
+            return count, 0
+        count = count_query.limit(1).execute().count or 0
+        self._count_cache.set(key, count)
+        return count, 1
+    
     def get_recipes_with_ingredients(self, limit: int = 100) -> Dict[str, Any]:
         """Get recipes with their ingredients for recommendation filtering"""
         try:
             response = (self.supabase.table('recipes')
-                       .select('recipe_id, title, prep_time_mins, cook_time_mins, servings, difficulty, created_at, recipe_ingredients(ingredient_id, quantity, unit, ingredients(ingredient_id, name, category))')
+                       .select(RECIPE_WITH_INGREDIENTS_COLUMNS)
                        .order('created_at', desc=True)
                        .limit(limit)
                        .execute())
             
-            recipes = []
-            if response.data:
-                for recipe in response.data:
-                    prep_time = recipe.get('prep_time_mins', 0) or 0
-                    cook_time = recipe.get('cook_time_mins', 0) or 0
-                    total_time = prep_time + cook_time
-                    
-                    processed_recipe = {
-                        'recipe_id': recipe['recipe_id'],
-                        'title': recipe['title'],
-                        'instructions': recipe.get('instructions', ''),
-                        'prep_time_mins': prep_time,
-                        'cook_time_mins': cook_time,
-                        'total_time_mins': total_time,
-                        'servings': recipe.get('servings'),
-                        'difficulty': recipe.get('difficulty', 'easy'),
-                        'recipe_ingredients': recipe.get('recipe_ingredients', []),
-                        'created_at': recipe.get('created_at')
-                    }
-                    recipes.append(processed_recipe)
+            recipes = [self._format_recipe_with_ingredients(recipe) for recipe in response.data or []]
             
             return {
                 'success': True, 
@@ -505,4 +706,44 @@ class SupabaseService:
             
         except Exception as e:
             logger.error(f"Error getting recipes with ingredients: {str(e)}")
-            return {'success': False, 'error': str(e)}
\ No newline at end of file
+            return {'success': False, 'error': str(e)}
+    
+    def get_recipes_with_ingredients_after(self, last_recipe_id: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """Get the next page of recipes with ingredients after a recipe_id watermark"""
+        try:
+            response = (self.supabase.table('recipes')
+                       .select(RECIPE_WITH_INGREDIENTS_COLUMNS)
+                       .gt('recipe_id', last_recipe_id)
+                       .order('recipe_id')
+                       .limit(limit)
+                       .execute())
+            
+            recipes = [self._format_recipe_with_ingredients(recipe) for recipe in response.data or []]
+            
+            return {
+                'success': True, 
+                'data': recipes
+            }
+            
+        except Exception as e:
+            logger.error(f"Error getting recipes after {last_recipe_id}: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def _format_recipe_with_ingredients(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a recipe row with embedded ingredients for recommendation filtering"""
+        prep_time = recipe.get('prep_time_mins', 0) or 0
+        cook_time = recipe.get('cook_time_mins', 0) or 0
+        total_time = recipe.get('total_time_mins', prep_time + cook_time)
+        
+        return {
+            'recipe_id': recipe['recipe_id'],
+            'title': recipe['title'],
+            'instructions': recipe.get('instructions', ''),
+            'prep_time_mins': prep_time,
+            'cook_time_mins': cook_time,
+            'total_time_mins': total_time,
+            'servings': recipe.get('servings'),
+            'difficulty': recipe.get('difficulty', 'easy'),
+            'recipe_ingredients': recipe.get('recipe_ingredients', []),
+            'created_at': recipe.get('created_at')
+        }
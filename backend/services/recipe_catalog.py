@@ -0,0 +1,124 @@
+"""
+Recipe Catalog Service
+Keeps a local recommendation index of the whole recipe catalog, refreshed by recipe_id watermark
+"""
+import threading
+import time
+from typing import Optional
+from services.database import SupabaseService
+from services.recipe_index import RecipeIndex
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RecipeCatalog:
+    """Locally held snapshot of every recipe, kept current with incremental refreshes"""
+
+    def __init__(self, db_service: SupabaseService, refresh_interval: int = 60,
+                 full_refresh_interval: int = 3600, page_size: int = 1000):
+        """
+        Initialize the catalog snapshot
+
+        Args:
+            db_service: Database service used to page through recipes
+            refresh_interval: Seconds between incremental refreshes for new recipes
+            full_refresh_interval: Seconds between full rebuilds that pick up edits and deletes
+            page_size: Recipes fetched per database round trip
+        """
+        self.db_service = db_service
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.page_size = page_size
+
+        self.index = RecipeIndex([])
+        self.version = 0
+        self.last_recipe_id = 0
+        self.loaded = False
+        self.last_refresh = 0.0
+        self.last_full_refresh = 0.0
+
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def get_index(self) -> RecipeIndex:
+        """
+        Get the current catalog index
+
+        The first call loads the catalog; after that stale snapshots are refreshed
+        in the background so requests never wait on the database.
+        """
+        if not self.loaded:
+            self.refresh()
+        elif self._is_stale():
+            self.refresh_async()
+        return self.index
+
+    def invalidate(self):
+        """Mark the snapshot stale so the next read picks up new recipes"""
+        self.last_refresh = 0.0
+
+    def refresh_async(self):
+        """Start a background refresh unless one is already running"""
+        with self._thread_lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+            self._refresh_thread.start()
+
+    def refresh(self, full: bool = False) -> bool:
+        """
+        Fetch recipes added since the watermark and append them to the index
+
+        Args:
+            full: Rebuild the index from scratch instead of appending
+
+        Returns:
+            True if the snapshot is usable after the refresh
+        """
+        with self._lock:
+            if self.loaded and not full and not self._is_stale():
+                # Another caller refreshed while we waited for the lock
+                return True
+
+            now = time.time()
+            full = full or not self.loaded or now - self.last_full_refresh >= self.full_refresh_interval
+            watermark = 0 if full else self.last_recipe_id
+
+            new_recipes = []
+            while True:
+                result = self.db_service.get_recipes_with_ingredients_after(watermark, self.page_size)
+                if not result['success']:
+                    logger.error(f"Recipe catalog refresh failed: {result.get('error', 'Unknown error')}")
+                    # Retry on the next read instead of waiting a whole interval
+                    return self.loaded
+
+                page = result['data'] or []
+                new_recipes.extend(page)
+                if page:
+                    watermark = page[-1]['recipe_id']
+                if len(page) < self.page_size:
+                    break
+
+            if full or new_recipes:
+                index = RecipeIndex(new_recipes) if full else self.index.extend(new_recipes)
+                self.version += 1
+                index.version = self.version
+                self.index = index
+                if full:
+                    self.last_full_refresh = now
+
+            self.last_recipe_id = watermark
+            self.last_refresh = now
+            self.loaded = True
+
+            if full or new_recipes:
+                logger.info(f"Recipe catalog {'rebuilt' if full else 'refreshed'}: "
+                            f"{len(new_recipes)} recipes loaded, {len(self.index)} total (version {self.version})")
+            return True
+
+    def _is_stale(self) -> bool:
+        """Check whether an incremental or full refresh is due"""
+        now = time.time()
+        return (now - self.last_refresh >= self.refresh_interval or
+                now - self.last_full_refresh >= self.full_refresh_interval)
@@ -0,0 +1,715 @@
+"""
+Recipe Index
+Sparse recipe x ingredient matrix used for vectorized recommendation scoring
+"""
+from typing import Dict, List, Any, Optional, Sequence
+import hashlib
+import heapq
+import json
+import numpy as np
+from scipy import sparse
+from utils.deadline import Deadline
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Difficulty codes used for the per-recipe difficulty column
+DIFFICULTY_CODES = {'easy': 0, 'medium': 1, 'hard': 2}
+OTHER_DIFFICULTY = 3
+
+# Multiplier applied to the match score for each (skill level, difficulty code)
+SKILL_DIFFICULTY_MULTIPLIERS = {
+    'beginner': np.array([1.2, 1.0, 0.8, 1.0]),
+    'intermediate': np.array([1.1, 1.1, 1.0, 1.0]),
+}
+DEFAULT_DIFFICULTY_MULTIPLIERS = np.ones(4)
+
+# Detections are tracked as bits of a uint64 during top-k selection
+MAX_BITSET_DETECTIONS = 64
+
+# Ingredient categories each dietary restriction rules out
+DIETARY_EXCLUDED_CATEGORIES = {
+    'vegetarian': {'meat', 'poultry', 'fish', 'seafood'},
+    'vegan': {'meat', 'poultry', 'fish', 'seafood', 'dairy', 'egg', 'eggs', 'honey'},
+    'pescatarian': {'meat', 'poultry'},
+    'dairy-free': {'dairy'},
+    'egg-free': {'egg', 'eggs'},
+    'nut-free': {'nut', 'nuts'},
+    'gluten-free': {'grain', 'gluten'},
+}
+
+# Restrictions that rule out every ingredient flagged as a common allergen
+ALLERGEN_FREE_RESTRICTIONS = {'allergen-free', 'allergy-friendly'}
+
+# Bit 63 of a recipe's exclusion bitmask marks common allergens; bits 0-62 are categories
+ALLERGEN_BIT = np.uint64(1 << 63)
+MAX_CATEGORY_BITS = 63
+
+# Candidates scored together between top-k pruning checks
+TOP_K_BLOCK_SIZE = 256
+
+# Set bits in each byte value, used to popcount uint64 arrays
+_BYTE_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+# Recipe fields copied into recommendation responses
+RECIPE_RESPONSE_FIELDS = [
+    'recipe_id', 'title', 'instructions', 'prep_time_mins', 'cook_time_mins',
+    'total_time_mins', 'servings', 'difficulty', 'created_at'
+]
+
+
+def normalize_detected_names(names: Sequence[str]) -> List[str]:
+    """Lowercase, strip and de-duplicate detected ingredient names keeping their order"""
+    seen = set()
+    normalized = []
+    for name in names:
+        key = (name or '').lower().strip()
+        if key and key not in seen:
+            seen.add(key)
+            normalized.append(key)
+    return normalized
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """Count the set bits of each value in a uint64 array"""
+    as_bytes = np.ascontiguousarray(values, dtype=np.uint64).view(np.uint8).reshape(-1, 8)
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=1)
+
+
+def difficulty_multipliers(skill_level: str) -> np.ndarray:
+    """Get the difficulty multiplier table for a skill level"""
+    return SKILL_DIFFICULTY_MULTIPLIERS.get(skill_level, DEFAULT_DIFFICULTY_MULTIPLIERS)
+
+
+class RecipeIndex:
+    """CSR recipe x ingredient matrix with the recipe columns needed for scoring"""
+
+    def __init__(self, recipes: List[Dict[str, Any]], base: Optional['RecipeIndex'] = None):
+        """
+        Build the index from recipes as returned by get_recipes_with_ingredients
+
+        Args:
+            recipes: Recipe dicts with nested recipe_ingredients/ingredients data
+            base: Existing index whose rows come before the new recipes
+        """
+        if base is not None:
+            self.recipes: List[Dict[str, Any]] = list(base.recipes)
+            self.ingredient_ids: List[int] = list(base.ingredient_ids)
+            self.ingredient_names: List[str] = list(base.ingredient_names)
+            self._column_by_id: Dict[int, int] = dict(base._column_by_id)
+            self._column_by_name: Dict[str, int] = dict(base._column_by_name)
+            self._category_bits: Dict[str, int] = dict(base._category_bits)
+            self._column_exclusion_bits: List[int] = list(base._column_exclusion_bits)
+            difficulties = base.difficulty_codes.tolist()
+        else:
+            self.recipes = []
+            self.ingredient_ids = []
+            self.ingredient_names = []
+            self._column_by_id = {}
+            self._column_by_name = {}
+            self._category_bits = {}
+            self._column_exclusion_bits = []
+            difficulties = []
+        self._name_columns: Dict[str, np.ndarray] = {}
+
+        first_row = len(self.recipes)
+        rows, cols = [], []
+        for recipe in recipes:
+            row = len(self.recipes) - first_row
+            row_columns = set()
+            for ri in recipe.get('recipe_ingredients') or []:
+                ingredient = ri.get('ingredients') or {}
+                if not ingredient.get('name'):
+                    continue
+                column = self._column_for(ingredient)
+                if column not in row_columns:
+                    row_columns.add(column)
+                    rows.append(row)
+                    cols.append(column)
+
+            difficulty = (recipe.get('difficulty') or 'easy').lower()
+            difficulties.append(DIFFICULTY_CODES.get(difficulty, OTHER_DIFFICULTY))
+            self.recipes.append({field: recipe.get(field) for field in RECIPE_RESPONSE_FIELDS})
+
+        shape = (len(self.recipes) - first_row, len(self.ingredient_ids))
+        new_rows = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape
+        )
+        if base is not None:
+            old_rows = base.matrix.copy()
+            old_rows.resize((first_row, len(self.ingredient_ids)))
+            self.matrix = sparse.vstack([old_rows, new_rows], format='csr')
+        else:
+            self.matrix = new_rows
+
+        self.recipe_ids = np.array([r['recipe_id'] for r in self.recipes], dtype=np.int64)
+        self.difficulty_codes = np.array(difficulties, dtype=np.int8)
+        self.ingredient_counts = np.diff(self.matrix.indptr).astype(np.int32)
+
+        # Allergen/diet bitmask per ingredient column, OR-ed into one bitmask per recipe
+        self.column_exclusion_bits = np.array(self._column_exclusion_bits, dtype=np.uint64)
+        self.exclusion_bits = np.zeros(len(self.recipes), dtype=np.uint64)
+        non_empty = np.flatnonzero(self.ingredient_counts)
+        if len(non_empty):
+            self.exclusion_bits[non_empty] = np.bitwise_or.reduceat(
+                self.column_exclusion_bits[self.matrix.indices], self.matrix.indptr[non_empty]
+            )
+
+        self.version = 0  # Catalog version this index belongs to, counted per process
+        # Hash of the recipes added so far, in order; equal in every process that loaded the same rows
+        digest = hashlib.blake2b(base.fingerprint.encode() if base is not None else b'', digest_size=16)
+        digest.update(json.dumps(recipes, sort_keys=True, default=str).encode())
+        self.fingerprint = digest.hexdigest()
+        self._row_by_recipe_id: Optional[Dict[int, int]] = None
+        self._postings: Optional[sparse.csc_matrix] = None
+
+        logger.info(f"Recipe index built: {len(self.recipes)} recipes, "
+                    f"{len(self.ingredient_ids)} ingredients, {self.matrix.nnz} entries")
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def row_for(self, recipe_id: int) -> Optional[int]:
+        """Get the matrix row of a recipe, or None if it is not in the index"""
+        if self._row_by_recipe_id is None:
+            self._row_by_recipe_id = {int(rid): row for row, rid in enumerate(self.recipe_ids)}
+        return self._row_by_recipe_id.get(recipe_id)
+
+    def extend(self, recipes: List[Dict[str, Any]]) -> 'RecipeIndex':
+        """Return a new index with the given recipes appended after the existing rows"""
+        return RecipeIndex(recipes, base=self)
+
+    def _column_for(self, ingredient: Dict[str, Any]) -> int:
+        """Get or assign the matrix column for an ingredient"""
+        ingredient_id = ingredient.get('ingredient_id')
+        column = self._column_by_id.get(ingredient_id)
+        if column is None:
+            column = len(self.ingredient_ids)
+            self._column_by_id[ingredient_id] = column
+            self.ingredient_ids.append(ingredient_id)
+            self.ingredient_names.append(ingredient['name'].lower().strip())
+            self._column_by_name.setdefault(self.ingredient_names[-1], column)
+            self._column_exclusion_bits.append(self._exclusion_bits_for(ingredient))
+        return column
+
+    def _exclusion_bits_for(self, ingredient: Dict[str, Any]) -> int:
+        """Bitmask of an ingredient's category and allergen flag"""
+        bits = int(ALLERGEN_BIT) if ingredient.get('common_allergen') else 0
+        category = (ingredient.get('category') or '').lower().strip()
+        if category:
+            bit = self._category_bits.get(category)
+            if bit is None and len(self._category_bits) < MAX_CATEGORY_BITS:
+                bit = self._category_bits[category] = len(self._category_bits)
+            if bit is None:
+                logger.warning(f"No exclusion bit left for ingredient category '{category}'")
+            else:
+                bits |= 1 << bit
+        return bits
+
+    def exclusion_mask(self, dietary_restrictions: Optional[Sequence[str]] = None,
+                       allergy_ingredient_ids: Optional[Sequence[int]] = None) -> Optional[np.ndarray]:
+        """
+        Mark recipes a user must not be recommended
+
+        Args:
+            dietary_restrictions: Restrictions such as vegetarian or vegan
+            allergy_ingredient_ids: Ingredient ids from the user's allergies
+
+        Returns:
+            Boolean array, True for excluded recipes, or None when nothing is excluded
+        """
+        forbidden = 0
+        for restriction in dietary_restrictions or []:
+            restriction = (restriction or '').lower().strip()
+            if restriction in ALLERGEN_FREE_RESTRICTIONS:
+                forbidden |= int(ALLERGEN_BIT)
+            for category in DIETARY_EXCLUDED_CATEGORIES.get(restriction, ()):
+                if category in self._category_bits:
+                    forbidden |= 1 << self._category_bits[category]
+
+        allergy_columns = [self._column_by_id[i] for i in allergy_ingredient_ids or [] if i in self._column_by_id]
+        if not forbidden and not allergy_columns:
+            return None
+
+        excluded = (self.exclusion_bits & np.uint64(forbidden)) != 0
+        postings = self.postings
+        for column in allergy_columns:
+            excluded[postings.indices[postings.indptr[column]:postings.indptr[column + 1]]] = True
+        return excluded
+
+    def canonical_ingredients(self, detected_names: Sequence[str]) -> tuple:
+        """
+        Canonical form of a detected ingredient set, usable as a cache key
+
+        Names that exactly match a catalog ingredient become its ingredient_id;
+        anything else is kept as the normalized name.
+        """
+        ids, unknown = set(), set()
+        for name in normalize_detected_names(detected_names):
+            column = self._column_by_name.get(name)
+            if column is None:
+                unknown.add(name)
+            else:
+                ids.add(self.ingredient_ids[column])
+        return tuple(sorted(ids)), tuple(sorted(unknown))
+
+    def columns_for_name(self, detected_name: str) -> np.ndarray:
+        """Columns whose ingredient name contains, or is contained in, a detected name"""
+        columns = self._name_columns.get(detected_name)
+        if columns is None:
+            columns = np.array([
+                column for column, name in enumerate(self.ingredient_names)
+                if detected_name in name or name in detected_name
+            ], dtype=np.int32)
+            self._name_columns[detected_name] = columns
+        return columns
+
+    def query_vector(self, ingredient_names: Sequence[str]) -> np.ndarray:
+        """Boolean ingredient vector for names that exactly match catalog ingredients"""
+        query = np.zeros(len(self.ingredient_ids), dtype=bool)
+        for name in normalize_detected_names(ingredient_names):
+            column = self._column_by_name.get(name)
+            if column is not None:
+                query[column] = True
+        return query
+
+    @property
+    def postings(self) -> sparse.csc_matrix:
+        """Ingredient posting lists: column j lists the recipes that use ingredient j"""
+        if self._postings is None:
+            self._postings = self.matrix.tocsc()
+        return self._postings
+
+    def detection_matrix(self, detected_names: List[str]) -> sparse.csr_matrix:
+        """Build a detection x ingredient matrix marking which columns each name matches"""
+        rows, cols = [], []
+        for row, name in enumerate(detected_names):
+            columns = self.columns_for_name(name)
+            rows.extend([row] * len(columns))
+            cols.extend(columns.tolist())
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(detected_names), len(self.ingredient_ids))
+        )
+
+    def score(self, detected_names: Sequence[str], skill_level: str = 'beginner') -> Dict[str, Any]:
+        """
+        Score every recipe against one set of detected ingredients
+
+        Args:
+            detected_names: Detected ingredient names
+            skill_level: User skill level used for the difficulty multiplier
+
+        Returns:
+            Dict of per-recipe arrays (match_counts, match_percentage, coverage,
+            multiplier, scores), the number of matching recipes and the
+            recipe x detection match matrix
+        """
+        names = normalize_detected_names(detected_names)
+        detections = self.detection_matrix(names)
+
+        # recipe x detection: which detected names each recipe uses
+        matches = (self.matrix @ detections.T).tocsr()
+        matches.data[:] = 1
+        match_counts = np.diff(matches.indptr).astype(np.int32)
+        match_percentage = match_counts / max(len(names), 1)
+
+        # recipe x 1: how many of the recipe's own ingredients were detected
+        query = np.asarray(detections.sum(axis=0)).ravel() > 0
+        covered = self.matrix @ query.astype(np.float32)
+        coverage = np.divide(covered, self.ingredient_counts,
+                             out=np.zeros(len(self.recipes)), where=self.ingredient_counts > 0)
+
+        multiplier = difficulty_multipliers(skill_level)[self.difficulty_codes]
+
+        return {
+            'detected_names': names,
+            'matches': matches,
+            'match_counts': match_counts,
+            'matching_count': int(np.count_nonzero(match_counts)),
+            'match_percentage': match_percentage,
+            'coverage': coverage,
+            'multiplier': multiplier,
+            'scores': match_percentage * 100 * multiplier
+        }
+
+    def score_batch(self, detected_name_sets: Sequence[Sequence[str]],
+                    skill_levels: Optional[Sequence[str]] = None) -> sparse.csc_matrix:
+        """
+        Score many fridges in one sparse matrix-matrix product
+
+        Args:
+            detected_name_sets: One list of detected names per fridge
+            skill_levels: Skill level per fridge (defaults to beginner)
+
+        Returns:
+            Sparse recipe x fridge score matrix; recipes without matches are absent
+        """
+        name_sets = [normalize_detected_names(names) for names in detected_name_sets]
+        if skill_levels is None:
+            skill_levels = ['beginner'] * len(name_sets)
+
+        all_names = [name for names in name_sets for name in names]
+        owners = np.repeat(np.arange(len(name_sets)), [len(names) for names in name_sets])
+        detections = self.detection_matrix(all_names)
+
+        # recipe x detection hits, collapsed onto their fridge with a segment matrix
+        hits = (self.matrix @ detections.T).tocsr()
+        hits.data[:] = 1
+        segments = sparse.csr_matrix(
+            (np.ones(len(all_names), dtype=np.float32), (np.arange(len(all_names)), owners)),
+            shape=(len(all_names), len(name_sets))
+        )
+        counts = (hits @ segments).tocoo()
+
+        sizes = np.array([max(len(names), 1) for names in name_sets], dtype=np.float64)
+        tables = np.vstack([difficulty_multipliers(level) for level in skill_levels])
+        multiplier = tables[counts.col, self.difficulty_codes[counts.row]]
+        scores = counts.data / sizes[counts.col] * 100 * multiplier
+
+        return sparse.csc_matrix((scores, (counts.row, counts.col)),
+                                 shape=(len(self.recipes), len(name_sets)))
+
+    def top_k(self, detected_names: Sequence[str], skill_level: str = 'beginner',
+              k: int = 8, excluded: Optional[np.ndarray] = None,
+              deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Select the k best recipes without scoring the whole catalog
+
+        Candidates come from the posting lists of the detected ingredients. Each
+        candidate gets an upper bound from the number of detections its posting
+        hits can cover and its difficulty multiplier; candidates are scored in
+        bound order and the walk stops once no bound can beat the heap minimum.
+
+        Args:
+            detected_names: Detected ingredient names
+            skill_level: User skill level used for the difficulty multiplier
+            k: Number of recommendations to return
+            excluded: Optional exclusion mask from exclusion_mask()
+            deadline: Optional deadline; once it passes no further blocks are
+                scored and the ranking so far is returned as partial
+
+        Returns:
+            Dict with the formatted recommendations (best first), the number of
+            matching recipes, how many candidates were scored exactly and
+            whether the walk was cut short by the deadline
+        """
+        names = normalize_detected_names(detected_names)
+        if len(names) > MAX_BITSET_DETECTIONS:
+            result = self.score(names, skill_level)
+            if excluded is not None:
+                result['match_counts'] = np.where(excluded, 0, result['match_counts'])
+                result['matching_count'] = int(np.count_nonzero(result['match_counts']))
+            return {
+                'recommendations': self.top_recommendations(result, k),
+                'matching_count': result['matching_count'],
+                'candidates_scored': result['matching_count'],
+                'partial': False
+            }
+
+        column_bits = self._column_bits(names)
+        query_columns = np.flatnonzero(column_bits)
+
+        # Walk the posting lists of the query columns to find candidates
+        postings = self.postings
+        starts, ends = postings.indptr[query_columns], postings.indptr[query_columns + 1]
+        posting_rows = np.concatenate(
+            [postings.indices[start:end] for start, end in zip(starts, ends)]
+        ) if len(query_columns) else np.zeros(0, dtype=np.int32)
+        detections_per_column = popcount(column_bits[query_columns])
+        posting_weights = np.repeat(detections_per_column, ends - starts)
+
+        candidates, positions = np.unique(posting_rows, return_inverse=True)
+        reachable = np.bincount(positions, weights=posting_weights, minlength=len(candidates))
+        if excluded is not None:
+            allowed = ~excluded[candidates]
+            candidates, reachable = candidates[allowed], reachable[allowed]
+        multiplier = difficulty_multipliers(skill_level)[self.difficulty_codes[candidates]]
+        detected_count = max(len(names), 1)
+        upper_bounds = np.minimum(reachable, detected_count) / detected_count * 100 * multiplier
+
+        # Score candidates a block at a time in bound order, keeping the best k in a heap
+        heap: List[tuple] = []
+        scored = 0
+        partial = False
+        indptr, indices = self.matrix.indptr, self.matrix.indices
+        order = np.argsort(-upper_bounds, kind='stable')
+        for block_start in range(0, len(order), TOP_K_BLOCK_SIZE):
+            if block_start and deadline is not None and deadline.expired():
+                partial = True
+                break
+            block = order[block_start:block_start + TOP_K_BLOCK_SIZE]
+            if len(heap) == k:
+                # Drop candidates whose bound cannot beat the current k-th score
+                block = block[upper_bounds[block] >= heap[0][0]]
+                if not len(block):
+                    break
+
+            rows = candidates[block]
+            block_matrix = self.matrix[rows]
+            row_bits = np.bitwise_or.reduceat(column_bits[block_matrix.indices], block_matrix.indptr[:-1])
+            scores = popcount(row_bits) / detected_count * 100 * multiplier[block]
+            scored += len(block)
+
+            for row, score, bits in zip(rows.tolist(), scores.tolist(), row_bits.tolist()):
+                entry = (score, -row, bits)
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+
+        query_mask = column_bits > 0
+        recommendations = []
+        for score, negative_row, row_bits in sorted(heap, reverse=True):
+            row = -negative_row
+            row_columns = indices[indptr[row]:indptr[row + 1]]
+            matched = [name for bit, name in enumerate(names) if row_bits >> bit & 1]
+            recommendations.append(self._recommendation(
+                row, score, len(matched) / detected_count,
+                np.count_nonzero(query_mask[row_columns]) / max(len(row_columns), 1), matched
+            ))
+
+        return {
+            'recommendations': recommendations,
+            'matching_count': len(candidates),
+            'candidates_scored': scored,
+            'partial': partial
+        }
+
+    def top_k_batch(self, detected_name_sets: Sequence[Sequence[str]],
+                    skill_levels: Sequence[str], k: int = 8,
+                    excluded: Optional[Sequence[Optional[np.ndarray]]] = None) -> List[Dict[str, Any]]:
+        """
+        Select the k best recipes for many fridges from one score_batch() pass
+
+        Args:
+            detected_name_sets: One list of detected names per fridge
+            skill_levels: Skill level per fridge
+            k: Number of recommendations per fridge
+            excluded: Optional exclusion mask per fridge
+
+        Returns:
+            One top_k()-shaped result per fridge, in input order
+        """
+        name_sets = [normalize_detected_names(names) for names in detected_name_sets]
+        scores = self.score_batch(name_sets, skill_levels)
+        indptr, indices = self.matrix.indptr, self.matrix.indices
+
+        results = []
+        for fridge, names in enumerate(name_sets):
+            fridge_excluded = excluded[fridge] if excluded is not None else None
+            if len(names) > MAX_BITSET_DETECTIONS:
+                results.append(self.top_k(names, skill_levels[fridge], k, fridge_excluded))
+                continue
+
+            start, end = scores.indptr[fridge], scores.indptr[fridge + 1]
+            rows, row_scores = scores.indices[start:end], scores.data[start:end]
+            if fridge_excluded is not None:
+                allowed = ~fridge_excluded[rows]
+                rows, row_scores = rows[allowed], row_scores[allowed]
+
+            # Same order as top_k(): score descending, then lowest row first
+            best = np.lexsort((rows, -row_scores))[:k]
+            column_bits = self._column_bits(names)
+            query_mask = column_bits > 0
+            detected_count = max(len(names), 1)
+            recommendations = []
+            for row, score in zip(rows[best].tolist(), row_scores[best].tolist()):
+                row_columns = indices[indptr[row]:indptr[row + 1]]
+                row_bits = int(np.bitwise_or.reduce(column_bits[row_columns]))
+                matched = [name for bit, name in enumerate(names) if row_bits >> bit & 1]
+                recommendations.append(self._recommendation(
+                    row, score, len(matched) / detected_count,
+                    np.count_nonzero(query_mask[row_columns]) / max(len(row_columns), 1), matched
+                ))
+
+            results.append({
+                'recommendations': recommendations,
+                'matching_count': len(rows),
+                'candidates_scored': len(rows),
+                'partial': False
+            })
+
+        return results
+
+    def _column_bits(self, names: Sequence[str]) -> np.ndarray:
+        """Bit i of the result at column j is set when detected name i matches ingredient j"""
+        column_bits = np.zeros(len(self.ingredient_ids), dtype=np.uint64)
+        for bit, name in enumerate(names):
+            column_bits[self.columns_for_name(name)] |= np.uint64(1 << bit)
+        return column_bits
+
+    def near_miss(self, ingredient_names: Sequence[str], max_missing: int = 1,
+                  limit: int = 20, excluded: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Find recipes missing at most max_missing ingredients from what is on hand
+
+        Args:
+            ingredient_names: Ingredients on hand (exact catalog names)
+            max_missing: Largest number of missing ingredients allowed
+            limit: Maximum number of recipes to return
+            excluded: Boolean mask of recipes that must not be returned
+
+        Returns:
+            Dict with recipes (fewest missing first, each with its missing list)
+            and the total number of recipes within reach
+        """
+        query = self.query_vector(ingredient_names)
+        have = (self.matrix @ query.astype(np.float32)).astype(np.int32)
+        missing = self.ingredient_counts - have
+
+        allowed = self.ingredient_counts > 0
+        if excluded is not None:
+            allowed &= ~excluded
+        within_reach = np.flatnonzero(allowed & (missing <= max_missing))
+        have_share = have[within_reach] / self.ingredient_counts[within_reach]
+        order = within_reach[np.lexsort((-have_share, missing[within_reach]))]
+
+        recipes = []
+        indptr, indices = self.matrix.indptr, self.matrix.indices
+        for row in order[:limit]:
+            row_columns = indices[indptr[row]:indptr[row + 1]]
+            recipes.append(dict(
+                self.recipe_summary(row),
+                match_percentage=float(have[row] / self.ingredient_counts[row]),
+                missing_count=int(missing[row]),
+                missing_ingredients=[self.ingredient_names[c] for c in row_columns if not query[c]]
+            ))
+
+        return {
+            'recipes': recipes,
+            'total_found': len(within_reach)
+        }
+
+    def shopping_list(self, ingredient_names: Sequence[str], max_items: int = 5,
+                      excluded: Optional[np.ndarray] = None,
+                      recipes_per_item: int = 10) -> Dict[str, Any]:
+        """
+        Pick up to max_items ingredients to buy that unlock the most recipes
+
+        Greedy weighted set cover: each recipe still within reach of the budget
+        is worth 1/missing to every ingredient it lacks, so an ingredient's gain
+        is the progress it makes towards unlocking recipes (a recipe it completes
+        counts fully). After each pick only the recipes containing the picked
+        ingredient, and those that fell out of budget, change weight, and their
+        weight deltas are pushed into the gains instead of recomputing them.
+
+        Args:
+            ingredient_names: Ingredients on hand (exact catalog names)
+            max_items: Largest number of ingredients to buy
+            excluded: Boolean mask of recipes that must not be unlocked
+            recipes_per_item: Unlocked recipes listed with each item
+
+        Returns:
+            Dict with items (in purchase order, each with the recipes it unlocks),
+            unlocked_count, already_cookable and candidates_considered
+        """
+        query = self.query_vector(ingredient_names)
+        have = (self.matrix @ query.astype(np.float32)).astype(np.int32)
+        missing = self.ingredient_counts - have
+        allowed = self.ingredient_counts > 0
+        if excluded is not None:
+            allowed &= ~excluded
+
+        already_cookable = int(np.count_nonzero(allowed & (missing == 0)))
+        rows = np.flatnonzero(allowed & (missing > 0) & (missing <= max_items))
+
+        # Candidate recipes restricted to the ingredients not on hand
+        needed = sparse.csr_matrix(self.matrix[rows].multiply((~query).astype(np.float32)[np.newaxis, :]))
+        needed.eliminate_zeros()
+        by_column = needed.tocsc()
+
+        remaining = missing[rows].astype(np.float32)
+        weights = 1 / remaining
+        gains = np.asarray(needed.T @ weights).ravel()
+        picked = np.zeros(len(self.ingredient_ids), dtype=bool)
+
+        items = []
+        unlocked_count = 0
+        for step in range(max_items):
+            budget = max_items - step - 1  # Purchases left after this one
+            gains[picked] = 0
+            column = int(np.argmax(gains)) if len(gains) else 0
+            if not len(gains) or gains[column] <= 1e-6:
+                break
+            picked[column] = True
+
+            affected = by_column.indices[by_column.indptr[column]:by_column.indptr[column + 1]]
+            affected = affected[weights[affected] > 0]
+            remaining[affected] -= 1
+            unlocked = affected[remaining[affected] == 0]
+
+            # Recipes touched by this pick, plus those now needing more than the budget left
+            out_of_budget = np.flatnonzero((weights > 0) & (remaining > budget) & (remaining > 0))
+            changed = np.union1d(affected, out_of_budget)
+            new_weights = np.where((remaining[changed] > 0) & (remaining[changed] <= budget),
+                                   1 / np.maximum(remaining[changed], 1), 0).astype(np.float32)
+            gains += np.asarray(needed[changed].T @ (new_weights - weights[changed])).ravel()
+            weights[changed] = new_weights
+
+            unlocked_count += len(unlocked)
+            items.append({
+                'ingredient_id': self.ingredient_ids[column],
+                'name': self.ingredient_names[column],
+                'unlocks_count': len(unlocked),
+                'unlocks': [self.recipe_summary(rows[i]) for i in unlocked[:recipes_per_item]]
+            })
+
+        return {
+            'items': items,
+            'unlocked_count': unlocked_count,
+            'already_cookable': already_cookable,
+            'candidates_considered': len(rows)
+        }
+
+    def recipe_summary(self, row: int) -> Dict[str, Any]:
+        """Get the list-view fields of the recipe at a row"""
+        recipe = self.recipes[row]
+        return {
+            'recipe_id': recipe['recipe_id'],
+            'title': recipe.get('title') or '',
+            'prep_time_mins': recipe.get('prep_time_mins'),
+            'cook_time_mins': recipe.get('cook_time_mins'),
+            'total_time_mins': recipe.get('total_time_mins'),
+            'servings': recipe.get('servings'),
+            'difficulty': recipe.get('difficulty') or 'easy'
+        }
+
+    def matched_names(self, result: Dict[str, Any], row: int) -> List[str]:
+        """Detected names matched by one recipe row of a score result"""
+        matches = result['matches']
+        detections = np.sort(matches.indices[matches.indptr[row]:matches.indptr[row + 1]])
+        return [result['detected_names'][d] for d in detections]
+
+    def format_recommendation(self, result: Dict[str, Any], row: int) -> Dict[str, Any]:
+        """Build the recommendation response for one recipe row of a score result"""
+        return self._recommendation(
+            row, result['scores'][row], result['match_percentage'][row],
+            result['coverage'][row], self.matched_names(result, row)
+        )
+
+    def _recommendation(self, row: int, score: float, match_percentage: float,
+                        coverage: float, matched: List[str]) -> Dict[str, Any]:
+        """Build the recommendation response for one recipe row"""
+        recipe = self.recipes[row]
+        return {
+            'recipe_id': recipe['recipe_id'],
+            'title': recipe.get('title') or '',
+            'instructions': recipe.get('instructions') or '',
+            'prep_time_mins': recipe.get('prep_time_mins'),
+            'cook_time_mins': recipe.get('cook_time_mins'),
+            'total_time_mins': recipe.get('total_time_mins'),
+            'servings': recipe.get('servings'),
+            'difficulty': recipe.get('difficulty') or 'easy',
+            'recommendation_score': float(score),
+            'ingredient_match_percentage': float(match_percentage),
+            'ingredient_coverage': float(coverage),
+            'matched_ingredients': matched,
+            'created_at': recipe.get('created_at')
+        }
+
+    def top_recommendations(self, result: Dict[str, Any], limit: int = 8) -> List[Dict[str, Any]]:
+        """Format the highest scoring matching recipes of a score result, best first"""
+        matching = np.flatnonzero(result['match_counts'] > 0)
+        order = matching[np.argsort(-result['scores'][matching], kind='stable')]
+        return [self.format_recommendation(result, row) for row in order[:limit]]
@@ -0,0 +1,472 @@
+"""
+Recommendation Service
+Scores the recipe catalog snapshot against detected ingredients, with a result cache,
+per-user recommendations precomputed in the background and prefetching for live scans
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Any, Optional
+from services.database import SupabaseService
+from services.async_database import AsyncSupabaseService
+from services.recipe_catalog import RecipeCatalog
+from services.recipe_index import RecipeIndex, normalize_detected_names
+from utils.cache import TTLCache
+from utils.deadline import Deadline
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Batch items scored per sparse matrix product; results stream out after each chunk
+BATCH_CHUNK_SIZE = 256
+
+class RecommendationService:
+    """Service class for recipe recommendations"""
+
+    def __init__(self, db_service: SupabaseService, recipe_catalog: RecipeCatalog,
+                 cache: TTLCache, user_recommendations: TTLCache, max_workers: int = 2,
+                 stable_frames: int = 3, prefetch_confidence: float = 0.5,
+                 deadline_seconds: float = 2.0, async_db_service: Optional[AsyncSupabaseService] = None,
+                 refresh_all_interval: float = 300):
+        """
+        Initialize recommendation service
+
+        Args:
+            db_service: Database service for fridge contents and user preferences
+            recipe_catalog: Catalog snapshot to score against
+            cache: Result cache keyed by canonical ingredients and profile
+            user_recommendations: Store for each user's precomputed fridge recommendations
+            max_workers: Background threads used for precomputation
+            stable_frames: Live-scan frames a detected set must stay unchanged before prefetching
+            prefetch_confidence: Confidence threshold live-scan prefetches filter with
+            deadline_seconds: Default time budget of a /recommend request
+            async_db_service: Async database service used to run independent queries concurrently
+            refresh_all_interval: Least seconds between recomputes of every precomputed user
+        """
+        self.db_service = db_service
+        self.async_db_service = async_db_service or AsyncSupabaseService(db_service)
+        self.catalog = recipe_catalog
+        self.cache = cache
+        self.user_recommendations = user_recommendations
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='recommendations')
+        self._pending_users = set()
+        self._pending_lock = threading.Lock()
+        self.refresh_all_interval = refresh_all_interval
+        self._refresh_all_scheduled = False
+        self._last_refresh_all = float('-inf')
+
+        self.stable_frames = stable_frames
+        self.prefetch_confidence = prefetch_confidence
+        self._live_scans = TTLCache(user_recommendations.max_size, 300, name='live_scans')
+        self._live_scan_lock = threading.Lock()
+
+        self.deadline_seconds = deadline_seconds
+
+    def get_user_preferences(self, user_id: str, deadline: Optional[Deadline] = None,
+                             load_catalog: bool = False) -> Dict[str, Any]:
+        """
+        Get the profile settings and allergies used to personalise recommendations
+
+        When the profile or allergies cannot be fetched, or are not fetched
+        before the deadline, complete is False: the user's dietary and allergy
+        exclusions are unknown, so callers must not recommend recipes from the
+        returned defaults.
+
+        Args:
+            user_id: User to personalise for
+            deadline: Optional time budget for the queries
+            load_catalog: Also load the recipe catalog if it has never been loaded,
+                          alongside the queries instead of after them
+        """
+        return asyncio.run(self._fetch_user_context(user_id, deadline, load_catalog))[0]
+
+    async def _fetch_user_context(self, user_id: str, deadline: Optional[Deadline] = None,
+                                  load_catalog: bool = False, fridge: bool = False) -> tuple:
+        """
+        Fetch preferences and, optionally, fridge contents with all queries running at once
+
+        Returns:
+            (preferences, fridge contents result or None)
+        """
+        preferences = {
+            'skill_level': 'beginner',
+            'dietary_restrictions': [],
+            'allergy_ingredient_ids': [],
+            'complete': True
+        }
+
+        calls = [
+            self.async_db_service.get_user_profile(user_id),
+            self.async_db_service.get_user_allergies(user_id)
+        ]
+        if fridge:
+            calls.append(self.async_db_service.get_user_fridge_contents(user_id))
+        if load_catalog and not self.catalog.loaded:
+            # Only the first load blocks; later refreshes run in the background
+            calls.append(self.async_db_service.run(self.catalog.get_index))
+        if deadline is not None:
+            calls = [asyncio.wait_for(call, deadline.remaining()) for call in calls]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        profile_result, allergies_result = results[0], results[1]
+
+        if isinstance(profile_result, asyncio.TimeoutError):
+            logger.warning("User profile not fetched before the deadline")
+            preferences['complete'] = False
+        elif isinstance(profile_result, Exception):
+            logger.warning(f"Could not fetch user profile: {str(profile_result)}")
+            preferences['complete'] = False
+        elif not profile_result.get('success'):
+            logger.warning(f"Could not fetch user profile: {profile_result.get('error')}")
+            preferences['complete'] = False
+        elif profile_result.get('data'):
+            preferences['dietary_restrictions'] = profile_result['data'].get('dietary_restrictions', []) or []
+            preferences['skill_level'] = profile_result['data'].get('skill_level', 'beginner') or 'beginner'
+
+        if isinstance(allergies_result, asyncio.TimeoutError):
+            logger.warning("User allergies not fetched before the deadline")
+            preferences['complete'] = False
+        elif isinstance(allergies_result, Exception):
+            logger.warning(f"Could not fetch user allergies: {str(allergies_result)}")
+            preferences['complete'] = False
+        elif allergies_result['success']:
+            preferences['allergy_ingredient_ids'] = [
+                allergy['ingredient_id'] for allergy in allergies_result['data'] or []
+                if allergy.get('ingredient_id') is not None
+            ]
+        else:
+            logger.warning(f"Could not fetch user allergies: {allergies_result['error']}")
+            preferences['complete'] = False
+
+        fridge_result = None
+        if fridge:
+            fridge_result = results[2]
+            if isinstance(fridge_result, Exception):
+                fridge_result = {'success': False, 'error': str(fridge_result)}
+        return preferences, fridge_result
+
+    def recommend(self, ingredient_names: List[str], skill_level: str = 'beginner',
+                  confidence_threshold: float = 0.5,
+                  dietary_restrictions: Optional[List[str]] = None,
+                  k: int = 8, allergy_ingredient_ids: Optional[List[int]] = None,
+                  deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Recommend the top k recipes for a set of detected ingredients
+
+        With a deadline, a first catalog load that does not finish in time gives
+        an empty ranking and scoring stops early with the best ranking so far;
+        either way the result is marked partial and not cached.
+
+        Args:
+            ingredient_names: Names of ingredients that passed the confidence threshold
+            skill_level: User skill level
+            confidence_threshold: Threshold the names were filtered with
+            dietary_restrictions: User dietary restrictions, used to exclude recipes
+            k: Number of recommendations
+            allergy_ingredient_ids: Ingredients from the user's allergies, used to exclude recipes
+            deadline: Optional time budget for loading the catalog and scoring
+
+        Returns:
+            Dict with recommendations, matching_count, candidates_scored,
+            excluded_count, total_recipes_checked, partial and whether the
+            result came from the cache
+        """
+        if deadline is not None and not self.catalog.loaded:
+            # Only the first load blocks; later refreshes run in the background
+            index, on_time = deadline.call(self.catalog.get_index)
+            if not on_time:
+                logger.warning("Recipe catalog not loaded before the deadline, returning an empty partial ranking")
+                return {
+                    'success': True,
+                    'recommendations': [],
+                    'matching_count': 0,
+                    'candidates_scored': 0,
+                    'excluded_count': 0,
+                    'total_recipes_checked': 0,
+                    'partial': True,
+                    'cached': False
+                }
+        else:
+            index = self.catalog.get_index()
+        if not self.catalog.loaded:
+            return {'success': False, 'error': 'Recipe catalog unavailable'}
+
+        names = sorted(normalize_detected_names(ingredient_names))
+        cache_key = self._cache_key(index, names, skill_level, confidence_threshold,
+                                    dietary_restrictions, allergy_ingredient_ids, k)
+
+        result = self.cache.get(cache_key)
+        if result is not None:
+            return dict(result, cached=True)
+
+        excluded = index.exclusion_mask(dietary_restrictions, allergy_ingredient_ids)
+        result = index.top_k(names, skill_level, k, excluded, deadline)
+        result['excluded_count'] = int(excluded.sum()) if excluded is not None else 0
+        result['success'] = True
+        result['total_recipes_checked'] = len(index)
+        if not result['partial']:
+            self.cache.set(cache_key, result)
+        return dict(result, cached=False)
+
+    def recommend_batch(self, items: List[Dict[str, Any]], k: int = 8) -> Iterator[Dict[str, Any]]:
+        """
+        Recommend recipes for many ingredient sets against one catalog snapshot
+
+        Items already in the result cache are answered from it; the rest are
+        scored BATCH_CHUNK_SIZE at a time with one sparse product per chunk.
+
+        Args:
+            items: Dicts with ingredient_names, skill_level, confidence_threshold,
+                dietary_restrictions and allergy_ingredient_ids
+            k: Number of recommendations per item
+
+        Yields:
+            One recommend()-shaped result per item, in input order
+        """
+        index = self.catalog.get_index()
+        if not self.catalog.loaded:
+            for _ in items:
+                yield {'success': False, 'error': 'Recipe catalog unavailable'}
+            return
+
+        for chunk_start in range(0, len(items), BATCH_CHUNK_SIZE):
+            chunk = items[chunk_start:chunk_start + BATCH_CHUNK_SIZE]
+            names = [sorted(normalize_detected_names(item['ingredient_names'])) for item in chunk]
+            keys = [self._cache_key(index, item_names, item['skill_level'], item['confidence_threshold'],
+                                    item['dietary_restrictions'], item['allergy_ingredient_ids'], k)
+                    for item_names, item in zip(names, chunk)]
+            results = [self.cache.get(key) for key in keys]
+
+            misses = [position for position, result in enumerate(results) if result is None]
+            masks = {}
+            excluded = []
+            for position in misses:
+                mask_key = keys[position][3:5]
+                if mask_key not in masks:
+                    masks[mask_key] = index.exclusion_mask(chunk[position]['dietary_restrictions'],
+                                                           chunk[position]['allergy_ingredient_ids'])
+                excluded.append(masks[mask_key])
+
+            scored = index.top_k_batch([names[p] for p in misses],
+                                       [chunk[p]['skill_level'] for p in misses], k, excluded)
+            for position, result, mask in zip(misses, scored, excluded):
+                result['excluded_count'] = int(mask.sum()) if mask is not None else 0
+                result['success'] = True
+                result['total_recipes_checked'] = len(index)
+                self.cache.set(keys[position], result)
+
+            scored_results = dict(zip(misses, scored))
+            for position, result in enumerate(results):
+                if result is not None:
+                    yield dict(result, cached=True)
+                else:
+                    yield dict(scored_results[position], cached=False)
+
+    def near_miss(self, ingredient_names: List[str], max_missing: int = 1, limit: int = 20,
+                  dietary_restrictions: Optional[List[str]] = None,
+                  allergy_ingredient_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Find recipes that need at most max_missing more ingredients"""
+        index = self.catalog.get_index()
+        if not self.catalog.loaded:
+            return {'success': False, 'error': 'Recipe catalog unavailable'}
+
+        excluded = index.exclusion_mask(dietary_restrictions, allergy_ingredient_ids)
+        result = index.near_miss(ingredient_names, max_missing, limit, excluded)
+        result['success'] = True
+        result['total_recipes_checked'] = len(index)
+        return result
+
+    def shopping_list(self, ingredient_names: List[str], max_items: int = 5,
+                      dietary_restrictions: Optional[List[str]] = None,
+                      allergy_ingredient_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Suggest up to max_items ingredients to buy that unlock the most recipes"""
+        index = self.catalog.get_index()
+        if not self.catalog.loaded:
+            return {'success': False, 'error': 'Recipe catalog unavailable'}
+
+        excluded = index.exclusion_mask(dietary_restrictions, allergy_ingredient_ids)
+        result = index.shopping_list(ingredient_names, max_items, excluded)
+        result['success'] = True
+        result['total_recipes_checked'] = len(index)
+        return result
+
+    def get_user_recommendations(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get recommendations for the user's current fridge contents
+
+        Served from the precomputed list when there is one, otherwise computed now.
+        """
+        result = self.user_recommendations.get(user_id)
+        if result is not None:
+            return dict(result, precomputed=True)
+
+        result = self._compute_user_recommendations(user_id)
+        return dict(result, precomputed=False)
+
+    def refresh_user_async(self, user_id: str):
+        """Recompute a user's precomputed recommendations in the background, e.g. after a scan"""
+        with self._pending_lock:
+            if user_id in self._pending_users:
+                return
+            self._pending_users.add(user_id)
+        self._executor.submit(self._refresh_user, user_id)
+
+    def invalidate_user(self, user_id: str, recompute: bool = True):
+        """
+        Drop a user's precomputed recommendations, e.g. after their profile or allergies change
+
+        A recompute already running for the user, in this or another process
+        sharing the store, is not stored, since it may have read the old profile.
+
+        Args:
+            user_id: User whose preferences changed
+            recompute: Recompute the list in the background instead of on the next read
+        """
+        self.user_recommendations.bump_version(user_id)
+        self.user_recommendations.delete(user_id)
+        if recompute:
+            self.refresh_user_async(user_id)
+
+    def track_live_scan(self, user_id: str, detected_ingredients: List[Dict[str, Any]]) -> bool:
+        """
+        Record one live-scan frame and prefetch recommendations once detections settle
+
+        When the set of confident detections has been the same for stable_frames
+        frames in a row, recommendations for it are scored in the background so
+        the client's following /recommend call is served from the cache.
+
+        Args:
+            user_id: User running the live scan
+            detected_ingredients: Detections for this frame (name and confidence)
+
+        Returns:
+            True if the detected set is currently stable
+        """
+        detected = frozenset(normalize_detected_names([
+            ingredient['name'] for ingredient in detected_ingredients
+            if ingredient.get('confidence', 0) >= self.prefetch_confidence
+        ]))
+
+        with self._live_scan_lock:
+            state = self._live_scans.get(user_id)
+            if state is None:
+                state = {'frames': deque(maxlen=self.stable_frames), 'prefetched': None}
+                self._live_scans.set(user_id, state)
+            state['frames'].append(detected)
+
+            stable = (len(state['frames']) == self.stable_frames and
+                      all(frame == detected for frame in state['frames']))
+            if not stable or not detected or state['prefetched'] == detected:
+                return stable
+            state['prefetched'] = detected
+
+        logger.info(f"Live scan stable for user {user_id}, prefetching recommendations for {sorted(detected)}")
+        self._executor.submit(self._prefetch, user_id, list(detected))
+        return True
+
+    def invalidate(self):
+        """Drop cached results and refresh the catalog, e.g. after a recipe is created"""
+        self.catalog.invalidate()
+        self.cache.clear()
+        self._schedule_refresh_all()
+
+    def _schedule_refresh_all(self):
+        """Queue one recompute of every precomputed user, at most once per refresh_all_interval"""
+        with self._pending_lock:
+            if self._refresh_all_scheduled:
+                return
+            self._refresh_all_scheduled = True
+            delay = max(self._last_refresh_all + self.refresh_all_interval - time.monotonic(), 0.0)
+        timer = threading.Timer(delay, self._executor.submit, args=(self._refresh_all_users,))
+        timer.daemon = True
+        timer.start()
+
+    def _cache_key(self, index: RecipeIndex, names: List[str], skill_level: str, confidence_threshold: float,
+                   dietary_restrictions: Optional[List[str]], allergy_ingredient_ids: Optional[List[int]],
+                   k: int) -> tuple:
+        """Result cache key: canonical ingredients, profile, catalog fingerprint and k"""
+        return (
+            index.canonical_ingredients(names),
+            skill_level,
+            confidence_threshold,
+            tuple(sorted(dietary_restrictions or [])),
+            tuple(sorted(set(allergy_ingredient_ids or []))),
+            index.fingerprint,
+            k
+        )
+
+    def _refresh_user(self, user_id: str):
+        """Background task recomputing one user's recommendations"""
+        try:
+            with self._pending_lock:
+                self._pending_users.discard(user_id)
+            self._compute_user_recommendations(user_id)
+        except Exception as e:
+            logger.error(f"Error precomputing recommendations for user {user_id}: {str(e)}")
+
+    def _prefetch(self, user_id: str, ingredient_names: List[str]):
+        """Background task warming the result cache with the defaults /recommend uses"""
+        try:
+            preferences = self.get_user_preferences(user_id)
+            if not preferences['complete']:
+                return
+            self.recommend(
+                ingredient_names, preferences['skill_level'], self.prefetch_confidence,
+                preferences['dietary_restrictions'], 8, preferences['allergy_ingredient_ids']
+            )
+        except Exception as e:
+            logger.error(f"Error prefetching recommendations for user {user_id}: {str(e)}")
+
+    def _refresh_all_users(self):
+        """Background task recomputing every precomputed user against the refreshed catalog"""
+        # Invalidations from here on schedule another run, since this one may miss their recipes
+        with self._pending_lock:
+            self._refresh_all_scheduled = False
+            self._last_refresh_all = time.monotonic()
+        try:
+            self.catalog.refresh()
+            user_ids = self.user_recommendations.keys()
+            for user_id in user_ids:
+                self._compute_user_recommendations(user_id)
+            logger.info(f"Recomputed precomputed recommendations for {len(user_ids)} users")
+        except Exception as e:
+            logger.error(f"Error recomputing precomputed recommendations: {str(e)}")
+
+    def _compute_user_recommendations(self, user_id: str, k: int = 8) -> Dict[str, Any]:
+        """Score the user's fridge contents and store the result"""
+        version = self.user_recommendations.version(user_id)
+        preferences, fridge_result = asyncio.run(self._fetch_user_context(user_id, fridge=True))
+        if not preferences['complete']:
+            return {'success': False, 'error': 'User allergies or dietary restrictions unavailable'}
+        if not fridge_result['success']:
+            return {'success': False, 'error': fridge_result['error']}
+
+        ingredient_names = normalize_detected_names(
+            [item['ingredient_name'] for item in fridge_result['data'] or []]
+        )
+        result = self.recommend(
+            ingredient_names, preferences['skill_level'], 0.0,
+            preferences['dietary_restrictions'], k, preferences['allergy_ingredient_ids']
+        )
+        if not result['success']:
+            return result
+
+        result = dict(result, ingredients=ingredient_names, skill_level=preferences['skill_level'],
+                      dietary_restrictions=preferences['dietary_restrictions'],
+                      computed_at=datetime.utcnow().isoformat())
+        self.user_recommendations.set_if_version(user_id, result, user_id, version)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get catalog and cache statistics"""
+        return {
+            'catalog': {
+                'loaded': self.catalog.loaded,
+                'version': self.catalog.version,
+                'recipes': len(self.catalog.index)
+            },
+            'cache': self.cache.stats(),
+            'user_recommendations': self.user_recommendations.stats()
+        }
@@ -0,0 +1,247 @@
+"""
+Recipe Similarity Service
+Approximate nearest-neighbour search over TF-IDF weighted ingredient vectors
+
+The index is built offline and loaded at startup:
+
+    python -m services.similarity            # writes SIMILARITY_INDEX_PATH
+"""
+import os
+import threading
+from typing import Dict, List, Any, Optional
+import numpy as np
+from scipy import sparse
+from services.recipe_catalog import RecipeCatalog
+from services.recipe_index import RecipeIndex
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SimilarityIndex:
+    """Random-projection LSH index over L2-normalised TF-IDF ingredient vectors"""
+
+    def __init__(self, recipe_ids: np.ndarray, ingredient_ids: np.ndarray, idf: np.ndarray,
+                 vectors: sparse.csr_matrix, planes: np.ndarray):
+        """
+        Initialize the index and hash every recipe into its buckets
+
+        Args:
+            recipe_ids: Recipe id of each vector row
+            ingredient_ids: Ingredient id of each vector column
+            idf: Inverse document frequency of each column
+            vectors: Normalised TF-IDF vectors, one row per recipe
+            planes: Random hyperplanes, shape (tables, ingredients, bits)
+        """
+        self.recipe_ids = recipe_ids
+        self.ingredient_ids = ingredient_ids
+        self.idf = idf
+        self.vectors = vectors
+        self.planes = planes
+        self._row_by_recipe_id = {int(rid): row for row, rid in enumerate(recipe_ids)}
+        self._column_by_ingredient_id = {int(iid): col for col, iid in enumerate(ingredient_ids)}
+        self._bit_values = 1 << np.arange(planes.shape[2], dtype=np.int64)
+
+        # Per table: bucket codes sorted, with the rows in that order
+        codes = self._hash(vectors)
+        self._orders = np.argsort(codes, axis=0, kind='stable').T
+        self._sorted_codes = np.take_along_axis(codes, self._orders.T, axis=0).T
+
+    @classmethod
+    def build(cls, recipe_index: RecipeIndex, tables: int = 24, bits: int = 10,
+              seed: int = 42) -> 'SimilarityIndex':
+        """Build the index from a catalog recipe index"""
+        matrix = recipe_index.matrix
+        document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        idf = (np.log((1 + matrix.shape[0]) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        vectors = sparse.csr_matrix(matrix.multiply(idf[np.newaxis, :]), dtype=np.float32)
+        norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+        vectors = sparse.csr_matrix(sparse.diags(1 / np.maximum(norms, 1e-12)) @ vectors, dtype=np.float32)
+
+        planes = np.random.default_rng(seed).standard_normal(
+            (tables, matrix.shape[1], bits)).astype(np.float32)
+        logger.info(f"Similarity index built: {matrix.shape[0]} recipes, {tables} tables x {bits} bits")
+        return cls(recipe_index.recipe_ids.copy(), np.array(recipe_index.ingredient_ids, dtype=np.int64),
+                   idf, vectors, planes)
+
+    @classmethod
+    def load(cls, path: str) -> 'SimilarityIndex':
+        """Load an index saved with save()"""
+        with np.load(path) as data:
+            vectors = sparse.csr_matrix(
+                (data['vector_data'], data['vector_indices'], data['vector_indptr']),
+                shape=tuple(data['vector_shape'])
+            )
+            return cls(data['recipe_ids'], data['ingredient_ids'], data['idf'], vectors, data['planes'])
+
+    def save(self, path: str):
+        """Write the index to disk atomically"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            temp_path,
+            recipe_ids=self.recipe_ids,
+            ingredient_ids=self.ingredient_ids,
+            idf=self.idf,
+            planes=self.planes,
+            vector_data=self.vectors.data,
+            vector_indices=self.vectors.indices,
+            vector_indptr=self.vectors.indptr,
+            vector_shape=np.array(self.vectors.shape)
+        )
+        os.replace(temp_path, path)
+        logger.info(f"Similarity index saved to {path}")
+
+    def __len__(self) -> int:
+        return len(self.recipe_ids)
+
+    def vector_for(self, recipe_id: int, ingredient_ids: Optional[List[int]] = None) -> Optional[sparse.csr_matrix]:
+        """
+        Get a recipe's vector, building it from ingredient_ids for recipes added after the build
+        """
+        row = self._row_by_recipe_id.get(recipe_id)
+        if row is not None:
+            return self.vectors[row]
+        if not ingredient_ids:
+            return None
+
+        columns = sorted({self._column_by_ingredient_id[i] for i in ingredient_ids
+                          if i in self._column_by_ingredient_id})
+        if not columns:
+            return None
+        weights = self.idf[columns]
+        weights = weights / np.linalg.norm(weights)
+        return sparse.csr_matrix((weights, ([0] * len(columns), columns)), shape=(1, self.vectors.shape[1]))
+
+    def similar(self, vector: sparse.csr_matrix, k: int = 10,
+                exclude_recipe_id: Optional[int] = None) -> List[tuple]:
+        """
+        Find the recipes closest to a vector
+
+        Candidates are the recipes sharing an LSH bucket with the query in any
+        table, or a bucket one bit away (multi-probe); they are then ranked by
+        exact cosine similarity.
+
+        Returns:
+            List of (recipe_id, similarity), most similar first
+        """
+        codes = self._hash(vector)[0]
+        probes = np.concatenate([codes[:, np.newaxis], codes[:, np.newaxis] ^ self._bit_values], axis=1)
+        candidates = self._bucket_rows(probes)
+
+        if exclude_recipe_id is not None:
+            candidates = candidates[self.recipe_ids[candidates] != exclude_recipe_id]
+        if not len(candidates):
+            return []
+
+        similarities = (self.vectors[candidates] @ vector.T).toarray().ravel()
+        if len(similarities) > k:
+            top = np.argpartition(-similarities, k)[:k]
+            top = top[np.argsort(-similarities[top], kind='stable')]
+        else:
+            top = np.argsort(-similarities, kind='stable')
+        return [(int(self.recipe_ids[candidates[i]]), float(similarities[i]))
+                for i in top if similarities[i] > 0]
+
+    def _hash(self, vectors: sparse.csr_matrix) -> np.ndarray:
+        """Bucket code of each row in each table, shape (rows, tables)"""
+        codes = np.empty((vectors.shape[0], self.planes.shape[0]), dtype=np.int64)
+        for table, planes in enumerate(self.planes):
+            signs = np.asarray(vectors @ planes) > 0
+            codes[:, table] = signs @ self._bit_values
+        return codes
+
+    def _bucket_rows(self, probes: np.ndarray) -> np.ndarray:
+        """Rows in any of the probed buckets; probes has one row of bucket codes per table"""
+        selected = np.zeros(len(self.recipe_ids), dtype=bool)
+        for table, table_codes in enumerate(probes):
+            sorted_codes = self._sorted_codes[table]
+            starts = np.searchsorted(sorted_codes, table_codes, side='left')
+            ends = np.searchsorted(sorted_codes, table_codes, side='right')
+            for start, end in zip(starts, ends):
+                selected[self._orders[table][start:end]] = True
+        return np.flatnonzero(selected)
+
+
+class SimilarityService:
+    """Service class for "recipes like this one" queries"""
+
+    def __init__(self, recipe_catalog: RecipeCatalog, index_path: str):
+        """
+        Initialize similarity service and load the offline-built index
+
+        Args:
+            recipe_catalog: Catalog snapshot used for recipe details
+            index_path: Path of the saved similarity index
+        """
+        self.catalog = recipe_catalog
+        self.index_path = index_path
+        self.index: Optional[SimilarityIndex] = None
+        self._build_lock = threading.Lock()
+        self.load()
+
+    def load(self) -> bool:
+        """Load the saved index if there is one"""
+        if not os.path.exists(self.index_path):
+            logger.warning(f"Similarity index not found at {self.index_path}, "
+                           "run 'python -m services.similarity' to build it")
+            return False
+        try:
+            self.index = SimilarityIndex.load(self.index_path)
+            logger.info(f"Similarity index loaded: {len(self.index)} recipes")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading similarity index: {str(e)}")
+            return False
+
+    def build(self, save: bool = True) -> bool:
+        """Build the index from a fully refreshed catalog and optionally save it"""
+        with self._build_lock:
+            if not self.catalog.refresh(full=True):
+                logger.error("Cannot build similarity index: recipe catalog unavailable")
+                return False
+            self.index = SimilarityIndex.build(self.catalog.index)
+            if save:
+                self.index.save(self.index_path)
+            return True
+
+    def build_async(self):
+        """Build the index in the background, e.g. when no saved index exists"""
+        threading.Thread(target=self.build, daemon=True).start()
+
+    def get_similar_recipes(self, recipe_id: int, k: int = 10) -> Dict[str, Any]:
+        """Get the k recipes whose ingredients are most like the given recipe's"""
+        if self.index is None:
+            return {'success': False, 'error': 'Similarity index not available'}
+
+        recipe_index = self.catalog.get_index()
+        row = recipe_index.row_for(recipe_id)
+        ingredient_ids = None
+        if row is not None:
+            columns = recipe_index.matrix.indices[recipe_index.matrix.indptr[row]:recipe_index.matrix.indptr[row + 1]]
+            ingredient_ids = [recipe_index.ingredient_ids[c] for c in columns]
+
+        vector = self.index.vector_for(recipe_id, ingredient_ids)
+        if vector is None:
+            return {'success': False, 'error': 'Recipe not found'}
+
+        similar = []
+        for similar_id, similarity in self.index.similar(vector, k, exclude_recipe_id=recipe_id):
+            similar_row = recipe_index.row_for(similar_id)
+            if similar_row is None:
+                continue  # Deleted since the index was built
+            similar.append(dict(recipe_index.recipe_summary(similar_row), similarity=similarity))
+
+        return {'success': True, 'data': similar}
+
+
+if __name__ == '__main__':
+    from config import config
+    from services.database import SupabaseService
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    settings = config[os.getenv('FLASK_ENV', 'development')]
+    db_service = SupabaseService(settings.SUPABASE_URL, settings.SUPABASE_KEY, settings.SUPABASE_SERVICE_KEY)
+    catalog = RecipeCatalog(db_service, page_size=settings.RECIPE_CATALOG_PAGE_SIZE)
+    if not SimilarityService(catalog, settings.SIMILARITY_INDEX_PATH).build(save=True):
+        raise SystemExit(1)
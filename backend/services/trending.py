@@ -0,0 +1,334 @@
+"""
+Trending Recipes Service
+Time-decayed favorite counters updated in place, with a top-N leaderboard and periodic snapshots
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from services.database import SupabaseService
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Rescale stored scores once the landmark weight grows past e^RESCALE_EXPONENT
+RESCALE_EXPONENT = 50.0
+
+class TrendingService:
+    """
+    In-memory leaderboard of recipes by exponentially decayed favorite count
+
+    Scores are stored relative to a landmark time t0: a favorite at time t adds
+    exp(decay * (t - t0)), so every score decays at the same rate and stored
+    values can be compared directly without touching them as time passes.
+
+    The leaderboard keeps up to 2 * top_n entries plus an upper bound on every
+    score outside it. Entries scoring at least that bound are known to be the
+    true leaders, so reads are a slice; the board is only rebuilt from all
+    counters when removals leave fewer than top_n known leaders.
+
+    Several worker processes can share one snapshot file. Each snapshot adds
+    only the favorites this process recorded since its last one to the file,
+    under a file lock, and then adopts the merged counters, so every worker's
+    board catches up with the others once per snapshot_interval.
+    """
+
+    def __init__(self, db_service: SupabaseService, snapshot_path: str,
+                 half_life_hours: float = 24, top_n: int = 50, snapshot_interval: int = 300):
+        """
+        Initialize trending service from the last snapshot, or from favorites history
+
+        Args:
+            db_service: Database service used to seed counters when there is no snapshot
+            snapshot_path: JSON file counters are periodically written to
+            half_life_hours: Hours for a favorite's weight to halve
+            top_n: Largest leaderboard size served
+            snapshot_interval: Seconds between snapshots while counters change
+        """
+        self.db_service = db_service
+        self.snapshot_path = snapshot_path
+        self.decay = math.log(2) / (half_life_hours * 3600)
+        self.top_n = top_n
+        self.snapshot_interval = snapshot_interval
+
+        self.scores: Dict[int, float] = {}
+        self._increments: Dict[int, float] = {}  # Live changes not yet merged into the snapshot file
+        self.landmark = time.time()
+        self._board: List[tuple] = []  # (score, recipe_id), highest first
+        self._outside_bound = 0.0  # No score outside the board exceeds this
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        # Live events held back while seeding, as (recipe_id, favorite_id or None for removals, timestamp)
+        self._seeding = False
+        self._held_events: List[tuple] = []
+
+        if not self.load():
+            self._seeding = True
+            threading.Thread(target=self.seed, daemon=True).start()
+        self._schedule_snapshot()
+
+    def record_favorite(self, recipe_id: int, favorite_id: Optional[int] = None,
+                        timestamp: Optional[float] = None):
+        """
+        Count a new favorite
+
+        Args:
+            recipe_id: Favorited recipe
+            favorite_id: Id of the new user_favorites row, so seeding does not count it twice
+            timestamp: When it was added, defaulting to now
+        """
+        with self._lock:
+            if self._seeding:
+                self._held_events.append((recipe_id, favorite_id, timestamp or time.time()))
+                return
+            self._record(recipe_id, self._weight(timestamp or time.time()))
+
+    def record_unfavorite(self, recipe_id: int):
+        """Take back the current weight of one favorite, never going below zero"""
+        with self._lock:
+            if self._seeding:
+                self._held_events.append((recipe_id, None, None))
+                return
+            self._record_unfavorite(recipe_id)
+
+    def get_trending(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get the top recipes with their current decayed scores, highest first"""
+        limit = min(limit, self.top_n)
+        with self._lock:
+            if sum(1 for score, _ in self._board[:limit] if score >= self._outside_bound) < min(limit, len(self.scores)):
+                self._rebuild_board()
+            scale = math.exp(-self.decay * (time.time() - self.landmark))
+            return [{'recipe_id': recipe_id, 'score': score * scale}
+                    for score, recipe_id in self._board[:limit] if score > 0]
+
+    def get_scores(self) -> Dict[int, float]:
+        """Get every recipe's current decayed score"""
+        with self._lock:
+            scale = math.exp(-self.decay * (time.time() - self.landmark))
+            return {recipe_id: score * scale for recipe_id, score in self.scores.items()}
+
+    def seed(self):
+        """
+        Rebuild counters from every favorite's added_at, e.g. on first start
+
+        Favorites recorded live meanwhile are held back and applied at the end,
+        except those with an id the seed already read.
+        """
+        watermark = 0
+        seeded = 0
+        try:
+            while True:
+                result = self.db_service.get_favorites_after(watermark)
+                if not result['success']:
+                    logger.error(f"Could not seed trending counters: {result['error']}")
+                    return
+                page = result['data'] or []
+                with self._lock:
+                    for favorite in page:
+                        added_at = favorite.get('added_at')
+                        timestamp = datetime.fromisoformat(added_at).timestamp() if added_at else None
+                        self._add(favorite['recipe_id'], self._weight(timestamp or time.time()))
+                    if not page:
+                        self._apply_held_events(watermark)
+                        break
+                seeded += len(page)
+                watermark = page[-1]['favorite_id']
+            logger.info(f"Trending counters seeded from {seeded} favorites")
+        finally:
+            with self._lock:
+                if self._seeding:
+                    # Seeding failed; count held events on top of whatever was seeded
+                    self._apply_held_events(watermark)
+
+    def load(self) -> bool:
+        """Load counters from the last snapshot if there is one"""
+        try:
+            snapshot = self._read_snapshot()
+            if snapshot is None:
+                return False
+            with self._lock:
+                self.landmark = snapshot['landmark']
+                self.scores = snapshot['scores']
+                self._rebuild_board()
+            logger.info(f"Trending counters loaded: {len(self.scores)} recipes")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading trending snapshot: {str(e)}")
+            return False
+
+    def snapshot(self):
+        """
+        Merge this process's changes into the snapshot file and adopt the merged counters
+
+        When there is no file yet, all counters are written. Otherwise only the
+        changes recorded here since the last snapshot are added to the file, so
+        other workers' counts are kept rather than overwritten.
+        """
+        with self._lock:
+            if not self._dirty or self._seeding:
+                return
+            increments, landmark = self._increments, self.landmark
+            counters = dict(self.scores)
+            self._increments = {}
+            self._dirty = False
+
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+            with self._snapshot_file_lock():
+                merged = self._read_snapshot()
+                if merged is None:
+                    merged = {'landmark': landmark, 'scores': counters}
+                else:
+                    merged = self._merge(merged, increments, landmark)
+                temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+                with open(temp_path, 'w') as f:
+                    json.dump(merged, f)
+                os.replace(temp_path, self.snapshot_path)
+        except Exception as e:
+            logger.error(f"Error writing trending snapshot: {str(e)}")
+            with self._lock:
+                for recipe_id, delta in self._rescale(increments, landmark, self.landmark).items():
+                    self._increments[recipe_id] = self._increments.get(recipe_id, 0.0) + delta
+                self._dirty = True
+            return
+
+        with self._lock:
+            # Adopt every worker's counts, keeping what was recorded here during the merge
+            pending, pending_landmark = self._increments, self.landmark
+            adopted = self._merge(merged, pending, pending_landmark)
+            self.landmark = adopted['landmark']
+            self.scores = adopted['scores']
+            self._increments = self._rescale(pending, pending_landmark, self.landmark)
+            self._rebuild_board()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get leaderboard statistics"""
+        with self._lock:
+            return {
+                'recipes': len(self.scores),
+                'board_size': len(self._board),
+                'half_life_hours': math.log(2) / self.decay / 3600
+            }
+
+    def _read_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Read the snapshot file with integer recipe ids, or None if there is none"""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path) as f:
+            snapshot = json.load(f)
+        return {'landmark': snapshot['landmark'],
+                'scores': {int(recipe_id): score for recipe_id, score in snapshot['scores'].items()}}
+
+    @contextmanager
+    def _snapshot_file_lock(self):
+        """Hold an exclusive lock shared by every process using the snapshot file"""
+        with open(f"{self.snapshot_path}.lock", 'a+') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _rescale(self, scores: Dict[int, float], landmark: float, new_landmark: float) -> Dict[int, float]:
+        """Express scores stored relative to one landmark relative to another"""
+        scale = math.exp(self.decay * (landmark - new_landmark))
+        return {recipe_id: score * scale for recipe_id, score in scores.items()}
+
+    def _merge(self, snapshot: Dict[str, Any], increments: Dict[int, float], landmark: float) -> Dict[str, Any]:
+        """Add increments stored relative to landmark to a snapshot, at the later of the two landmarks"""
+        new_landmark = max(snapshot['landmark'], landmark)
+        scores = self._rescale(snapshot['scores'], snapshot['landmark'], new_landmark)
+        for recipe_id, delta in self._rescale(increments, landmark, new_landmark).items():
+            scores[recipe_id] = max(scores.get(recipe_id, 0.0) + delta, 0.0)
+        return {'landmark': new_landmark, 'scores': scores}
+
+    def _schedule_snapshot(self):
+        """Snapshot every snapshot_interval seconds on a daemon timer"""
+        def run():
+            self.snapshot()
+            self._schedule_snapshot()
+
+        timer = threading.Timer(self.snapshot_interval, run)
+        timer.daemon = True
+        timer.start()
+
+    def _weight(self, timestamp: float) -> float:
+        """Stored weight of one favorite at a time, rescaling every score first if it got too large"""
+        exponent = self.decay * (timestamp - self.landmark)
+        if exponent > RESCALE_EXPONENT:
+            scale = math.exp(-exponent)
+            self.scores = {recipe_id: score * scale for recipe_id, score in self.scores.items()}
+            self._board = [(score * scale, recipe_id) for score, recipe_id in self._board]
+            self._outside_bound *= scale
+            self._increments = {recipe_id: delta * scale for recipe_id, delta in self._increments.items()}
+            self.landmark = timestamp
+            exponent = 0.0
+        return math.exp(exponent)
+
+    def _record(self, recipe_id: int, delta: float):
+        """Apply a live change and remember it for the next snapshot merge; the caller must hold the lock"""
+        self._add(recipe_id, delta)
+        self._increments[recipe_id] = self._increments.get(recipe_id, 0.0) + delta
+
+    def _record_unfavorite(self, recipe_id: int):
+        """Take back one favorite's current weight; the caller must hold the lock"""
+        score = self.scores.get(recipe_id)
+        if score is not None:
+            self._record(recipe_id, -min(self._weight(time.time()), score))
+
+    def _apply_held_events(self, watermark: int):
+        """Apply events held back while seeding, skipping favorites the seed counted; the caller must hold the lock"""
+        for recipe_id, favorite_id, timestamp in self._held_events:
+            if timestamp is None:
+                self._record_unfavorite(recipe_id)
+            elif favorite_id is None or favorite_id > watermark:
+                self._record(recipe_id, self._weight(timestamp))
+        self._held_events = []
+        self._seeding = False
+
+    def _add(self, recipe_id: int, delta: float):
+        """Change a counter and keep the leaderboard invariant; the caller must hold the lock"""
+        score = self.scores.get(recipe_id, 0.0) + delta
+        self.scores[recipe_id] = score
+        self._dirty = True
+
+        position = next((i for i, (_, board_id) in enumerate(self._board) if board_id == recipe_id), None)
+        if position is not None:
+            del self._board[position]
+            if score < self._outside_bound:
+                # Something outside the board may now be ahead of it
+                return
+        elif self._board and len(self._board) >= 2 * self.top_n and score <= self._board[-1][0]:
+            self._outside_bound = max(self._outside_bound, score)
+            return
+
+        self._board.append((score, recipe_id))
+        self._board.sort(reverse=True)
+        if len(self._board) > 2 * self.top_n:
+            evicted_score, _ = self._board.pop()
+            self._outside_bound = max(self._outside_bound, evicted_score)
+
+    def _rebuild_board(self):
+        """Rebuild the leaderboard from every counter; the caller must hold the lock"""
+        ranked = sorted(((score, recipe_id) for recipe_id, score in self.scores.items()), reverse=True)
+        self._board = ranked[:2 * self.top_n]
+        self._outside_bound = ranked[2 * self.top_n][0] if len(ranked) > 2 * self.top_n else 0.0
@@ -0,0 +1,33 @@
+"""
+Batch recommendation request tests
+Validation of /recommend/batch items before any of them is scored
+"""
+import pytest
+from api.recipe_routes import _batch_item_error
+
+
+@pytest.mark.parametrize('item', [
+    {},
+    {'ingredients': ['tomato', 'basil'], 'skill_level': 'beginner'},
+    {'detected_ingredients': [{'name': 'tomato', 'confidence': 0.9}, {'name': 'egg'}], 'confidence_threshold': 1},
+    {'ingredients': [], 'dietary_restrictions': ['vegan'], 'allergy_ingredient_ids': [3, 7]},
+])
+def test_valid_items(item):
+    assert _batch_item_error(item) is None
+
+
+@pytest.mark.parametrize('item, error', [
+    (['tomato'], 'must be an object'),
+    ({'ingredients': 'tomato'}, 'ingredients must be a list of names'),
+    ({'ingredients': ['tomato', 3]}, 'ingredients must be a list of names'),
+    ({'detected_ingredients': ['tomato']}, 'detected_ingredients must be a list of objects'),
+    ({'detected_ingredients': [{'name': 5}]}, 'detected ingredient names must be strings'),
+    ({'detected_ingredients': [{'name': 'egg', 'confidence': '0.9'}]}, 'detected ingredient confidences must be numbers'),
+    ({'detected_ingredients': [], 'confidence_threshold': True}, 'confidence_threshold must be a number'),
+    ({'ingredients': [], 'skill_level': 2}, 'skill_level must be a string'),
+    ({'ingredients': [], 'dietary_restrictions': 'vegan'}, 'dietary_restrictions must be a list of strings'),
+    ({'ingredients': [], 'allergy_ingredient_ids': ['3']}, 'allergy_ingredient_ids must be a list of ingredient ids'),
+    ({'ingredients': [], 'allergy_ingredient_ids': [True]}, 'allergy_ingredient_ids must be a list of ingredient ids'),
+])
+def test_invalid_items(item, error):
+    assert _batch_item_error(item) == error
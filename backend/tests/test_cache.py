@@ -0,0 +1,274 @@
+"""
+Cache tests
+TTLCache eviction and expiry, ReadThroughCache invalidation, and SharedCache across instances
+"""
+import threading
+import pytest
+from utils import cache as cache_module
+from utils.cache import TTLCache, ReadThroughCache, read_through
+from utils.shared_cache import SharedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', fake)
+    return fake
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=3, ttl=60)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    cache.get('a')
+
+    cache.set('d', 'D')
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['A', 'C', 'D']
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_cache_replaces_without_evicting():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+
+    cache.set('a', 3)
+
+    assert (cache.get('a'), cache.get('b')) == (3, 2)
+    assert cache.stats()['evictions'] == 0
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set('short', 1, ttl=5)
+    cache.set('long', 2)
+
+    clock.now += 10
+
+    assert cache.get('short', 'missing') == 'missing'
+    assert cache.get('long') == 2
+    assert len(cache) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (1, 1, 0.5)
+
+
+def test_ttl_cache_tracks_memory():
+    cache = TTLCache(max_size=10)
+    cache.set('a', list(range(100)))
+    cache.set('b', 'x')
+    assert cache.stats()['memory_bytes'] > 0
+
+    cache.set('a', [])
+    cache.delete('b')
+    cache.delete('missing')
+    assert cache.stats()['memory_bytes'] == cache_module.estimate_size([])
+
+    cache.clear()
+    assert cache.stats()['memory_bytes'] == 0
+    assert len(cache) == 0
+
+
+def test_ttl_cache_keys_are_least_recently_used_first():
+    cache = TTLCache(max_size=3, ttl=60)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    cache.get('a')
+
+    cache.set('d', 'D')
+
+    assert cache.keys() == ['c', 'a', 'd']
+
+
+def test_ttl_cache_set_if_version_drops_stale_writes():
+    cache = TTLCache(max_size=10, ttl=60)
+    version = cache.version('u1')
+
+    cache.bump_version('u1')
+
+    assert not cache.set_if_version('u1', 'stale', 'u1', version)
+    assert cache.get('u1') is None
+    assert cache.set_if_version('u1', 'fresh', 'u1', cache.version('u1'))
+    assert cache.get('u1') == 'fresh'
+
+
+def make_read_cache(ttls=None):
+    return ReadThroughCache(TTLCache(max_size=100, ttl=60), ttls)
+
+
+def test_read_through_caches_only_successes():
+    read_cache = make_read_cache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'success': len(calls) > 1, 'data': len(calls)}
+
+    assert read_cache.get_or_load('recipe', (1,), loader)['data'] == 1
+    assert read_cache.get_or_load('recipe', (1,), loader)['data'] == 2
+    assert read_cache.get_or_load('recipe', (1,), loader)['data'] == 2
+    assert len(calls) == 2
+
+
+def test_read_through_returns_copies():
+    read_cache = make_read_cache()
+    first = read_cache.get_or_load('recipe', (1,), lambda: {'success': True, 'data': {'tags': ['a']}})
+
+    first['data']['tags'].append('b')
+
+    assert read_cache.get_or_load('recipe', (1,), lambda: {'success': False})['data']['tags'] == ['a']
+
+
+def test_read_through_zero_ttl_disables_namespace():
+    read_cache = make_read_cache({'profile': 0})
+    calls = []
+
+    for _ in range(3):
+        read_cache.get_or_load('profile', ('u1',), lambda: calls.append(1) or {'success': True})
+
+    assert len(calls) == 3
+
+
+def test_read_through_invalidates_entry_or_namespace():
+    read_cache = make_read_cache()
+    for args in [(1,), (2,)]:
+        read_cache.get_or_load('recipe', args, lambda: {'success': True})
+    read_cache.get_or_load('facets', (), lambda: {'success': True})
+
+    read_cache.invalidate('recipe', 1)
+    assert sorted(read_cache.cache.keys()) == [('facets',), ('recipe', 2)]
+
+    read_cache.invalidate('recipe')
+    assert read_cache.cache.keys() == [('facets',)]
+
+
+def test_read_through_drops_load_that_raced_an_invalidation():
+    read_cache = make_read_cache()
+
+    def stale_loader():
+        # A write lands while this read is still talking to the database
+        read_cache.invalidate('recipe', 1)
+        return {'success': True, 'data': 'stale'}
+
+    assert read_cache.get_or_load('recipe', (1,), stale_loader)['data'] == 'stale'
+    assert read_cache.get_or_load('recipe', (1,), lambda: {'success': True, 'data': 'fresh'})['data'] == 'fresh'
+    assert read_cache.get_or_load('recipe', (1,), lambda: {'success': True, 'data': 'later'})['data'] == 'fresh'
+
+
+def test_read_through_concurrent_invalidation_keeps_fresh_value():
+    read_cache = make_read_cache()
+    loading, written = threading.Event(), threading.Event()
+    database = {'value': 'old'}
+
+    def slow_loader():
+        value = database['value']
+        loading.set()
+        written.wait(5)
+        return {'success': True, 'data': value}
+
+    reader = threading.Thread(target=read_cache.get_or_load, args=('recipe', (1,), slow_loader))
+    reader.start()
+    loading.wait(5)
+    database['value'] = 'new'
+    read_cache.invalidate('recipe', 1)
+    written.set()
+    reader.join(5)
+
+    assert read_cache.get_or_load('recipe', (1,), lambda: {'success': True, 'data': database['value']})['data'] == 'new'
+
+
+def test_read_through_decorator_uses_service_cache():
+    class Service:
+        def __init__(self, read_cache):
+            self.read_cache = read_cache
+            self.calls = 0
+
+        @read_through('recipe')
+        def get_recipe(self, recipe_id):
+            self.calls += 1
+            return {'success': True, 'data': recipe_id}
+
+    cached, uncached = Service(make_read_cache()), Service(None)
+    for service in (cached, uncached):
+        service.get_recipe(1)
+        service.get_recipe(1)
+
+    assert (cached.calls, uncached.calls) == (1, 2)
+
+
+def test_shared_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    writer = SharedCache(path, max_size=10, ttl=60, name='reads')
+    reader = SharedCache(path, max_size=10, ttl=60, name='reads')
+    other = SharedCache(path, max_size=10, ttl=60, name='other')
+
+    writer.set(('recipe', frozenset({'b', 'a', 'c'})), {'data': [1, 2]})
+
+    assert reader.get(('recipe', frozenset({'c', 'a', 'b'}))) == {'data': [1, 2]}
+    assert other.get(('recipe', frozenset({'a', 'b', 'c'}))) is None
+
+    reader.delete(('recipe', frozenset({'a', 'b', 'c'})))
+    assert writer.get(('recipe', frozenset({'a', 'b', 'c'}))) is None
+
+
+def test_shared_cache_evicts_and_expires(tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path / 'cache.sqlite'), max_size=2, ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr('utils.shared_cache.time.time', lambda: now[0])
+    cache.set('a', 1)
+    now[0] += 2
+    cache.set('b', 2, ttl=5)
+    now[0] += 2
+    cache.get('a')
+
+    now[0] += 2
+    cache.set('c', 3)
+
+    assert sorted(cache.keys()) == ['a', 'c']
+    assert cache.stats()['evictions'] == 1
+
+    now[0] += 100
+    assert cache.get('a') is None
+    assert len(cache) == 1
+
+
+def test_shared_cache_versions_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    loader = SharedCache(path, max_size=10, ttl=60, name='users')
+    writer = SharedCache(path, max_size=10, ttl=60, name='users')
+    other = SharedCache(path, max_size=10, ttl=60, name='other')
+    version = loader.version('u1')
+
+    writer.bump_version('u1')
+    writer.bump_version('u1')
+
+    assert loader.version('u1') == 2
+    assert other.version('u1') == 0
+    assert not loader.set_if_version('u1', 'stale', 'u1', version)
+    assert writer.get('u1') is None
+    assert loader.set_if_version('u1', 'fresh', 'u1', 2)
+    assert writer.get('u1') == 'fresh'
+
+
+def test_read_through_over_shared_cache_drops_load_invalidated_elsewhere(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    first = ReadThroughCache(SharedCache(path, max_size=10, ttl=60, name='reads'))
+    second = ReadThroughCache(SharedCache(path, max_size=10, ttl=60, name='reads'))
+
+    def stale_loader():
+        # Another worker writes and invalidates while this one is reading
+        second.invalidate('recipe', 1)
+        return {'success': True, 'data': 'stale'}
+
+    assert first.get_or_load('recipe', (1,), stale_loader)['data'] == 'stale'
+    assert second.get_or_load('recipe', (1,), lambda: {'success': True, 'data': 'fresh'})['data'] == 'fresh'
+    assert first.get_or_load('recipe', (1,), lambda: {'success': True, 'data': 'later'})['data'] == 'fresh'
@@ -0,0 +1,29 @@
+"""
+Deadline tests
+Blocking calls abandoned when their time budget runs out
+"""
+import threading
+from utils.deadline import Deadline
+
+
+def test_call_returns_result_in_time():
+    assert Deadline(5).call(lambda value: value * 2, 21) == (42, True)
+
+
+def test_call_gives_up_on_slow_calls():
+    release = threading.Event()
+    deadline = Deadline(0.05)
+
+    result = deadline.call(release.wait, 5, default='late')
+
+    release.set()
+    assert result == ('late', False)
+    assert deadline.expired()
+    assert deadline.remaining() == 0.0
+
+
+def test_call_after_expiry_does_not_start_the_call():
+    calls = []
+
+    assert Deadline(0).call(calls.append, 1) == (None, False)
+    assert calls == []
@@ -0,0 +1,118 @@
+"""
+Keyset pagination tests
+Cursor round trips and keyset filters evaluated against PostgreSQL ordering, NULLs included
+"""
+import pytest
+from utils.pagination import encode_cursor, decode_cursor, keyset_filter
+
+ROWS = [
+    {'recipe_id': 1, 'title': 'b', 'total_time_mins': 30},
+    {'recipe_id': 2, 'title': None, 'total_time_mins': None},
+    {'recipe_id': 3, 'title': 'a,b', 'total_time_mins': 30},
+    {'recipe_id': 4, 'title': 'say "hi"', 'total_time_mins': 5},
+    {'recipe_id': 5, 'title': None, 'total_time_mins': 45},
+    {'recipe_id': 6, 'title': 'back\\slash', 'total_time_mins': None},
+    {'recipe_id': 7, 'title': 'b', 'total_time_mins': 5},
+    {'recipe_id': 8, 'title': 'and(x', 'total_time_mins': 12},
+]
+
+
+def split_terms(text):
+    """Split a PostgREST filter list on top-level commas, respecting quotes and parentheses"""
+    terms, current, depth, quoted, escaped = [], '', 0, False, False
+    for char in text:
+        if escaped:
+            escaped = False
+        elif char == '\\' and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and char == ',' and depth == 0:
+            terms.append(current)
+            current = ''
+            continue
+        current += char
+    terms.append(current)
+    return terms
+
+
+def parse_value(text):
+    if text.startswith('"'):
+        return text[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+    return float(text) if '.' in text else int(text)
+
+
+def matches(term, row):
+    """Evaluate one filter term the way PostgreSQL would, where comparisons with NULL are false"""
+    if term.startswith('and('):
+        return all(matches(part, row) for part in split_terms(term[4:-1]))
+    column, rest = term.split('.', 1)
+    if rest == 'is.null':
+        return row[column] is None
+    if rest == 'not.is.null':
+        return row[column] is not None
+    op, text = rest.split('.', 1)
+    value = row[column]
+    if value is None:
+        return False
+    expected = parse_value(text)
+    return {'gt': value > expected, 'lt': value < expected, 'eq': value == expected}[op]
+
+
+def postgres_order(rows, sort_by, desc):
+    """Sort rows like ORDER BY sort_by [DESC], recipe_id with default NULL placement"""
+    present = sorted((row for row in rows if row[sort_by] is not None),
+                     key=lambda row: row['recipe_id'])
+    present.sort(key=lambda row: row[sort_by], reverse=desc)
+    nulls = sorted((row for row in rows if row[sort_by] is None), key=lambda row: row['recipe_id'])
+    return nulls + present if desc else present + nulls
+
+
+@pytest.mark.parametrize('sort_by', ['title', 'total_time_mins'])
+@pytest.mark.parametrize('desc', [False, True])
+def test_keyset_filter_resumes_after_every_row(sort_by, desc):
+    ordered = postgres_order(ROWS, sort_by, desc)
+    for position, last in enumerate(ordered):
+        cursor = decode_cursor(encode_cursor(sort_by, desc, last[sort_by], last['recipe_id']), sort_by, desc)
+        filters = split_terms(keyset_filter(sort_by, desc, cursor['v'], 'recipe_id', cursor['id']))
+
+        remaining = [row for row in ordered if any(matches(term, row) for term in filters)]
+
+        assert [row['recipe_id'] for row in remaining] == [row['recipe_id'] for row in ordered[position + 1:]]
+
+
+@pytest.mark.parametrize('value', [None, 0, 12.5, '', 'a,b', 'say "hi"', 'back\\slash', 'ünïcode'])
+@pytest.mark.parametrize('desc', [False, True])
+def test_cursor_round_trip(value, desc):
+    token = encode_cursor('title', desc, value, 42)
+
+    cursor = decode_cursor(token, 'title', desc)
+
+    assert cursor['v'] == value
+    assert cursor['id'] == 42
+    assert '=' not in token
+
+
+@pytest.mark.parametrize('sort_by, desc', [('created_at', False), ('title', True)])
+def test_cursor_rejects_other_sort_order(sort_by, desc):
+    token = encode_cursor('title', False, 'a', 1)
+
+    with pytest.raises(ValueError):
+        decode_cursor(token, sort_by, desc)
+
+
+@pytest.mark.parametrize('token', ['', 'not a cursor', 'e30', encode_cursor('title', False, 'a', 1)[:-3]])
+def test_cursor_rejects_malformed_tokens(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token, 'title', False)
+
+
+def test_cursor_rejects_non_integer_id():
+    token = encode_cursor('title', False, 'a', '1')
+
+    with pytest.raises(ValueError):
+        decode_cursor(token, 'title', False)
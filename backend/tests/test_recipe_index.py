@@ -0,0 +1,437 @@
+"""
+Recipe index tests
+Vectorized scoring checked against brute force over the raw recipe dicts
+"""
+import random
+import numpy as np
+import pytest
+from services.recipe_index import (
+    RecipeIndex, DIETARY_EXCLUDED_CATEGORIES, TOP_K_BLOCK_SIZE, difficulty_multipliers, DIFFICULTY_CODES,
+    OTHER_DIFFICULTY
+)
+from utils.deadline import Deadline
+
+CATEGORIES = ['vegetable', 'fruit', 'meat', 'poultry', 'fish', 'dairy', 'egg', 'grain', 'spice', None]
+DIFFICULTIES = ['easy', 'medium', 'hard', 'expert', None]
+SKILL_LEVELS = ['beginner', 'intermediate', 'advanced']
+
+
+def make_catalog(seed, recipe_count=400, ingredient_count=60):
+    """Random recipes shaped like get_recipes_with_ingredients rows"""
+    rng = random.Random(seed)
+    ingredients = [{
+        'ingredient_id': 1000 + i,
+        'name': f'ingredient {i}',
+        'category': rng.choice(CATEGORIES),
+        'common_allergen': rng.random() < 0.15
+    } for i in range(ingredient_count)]
+    recipes = [{
+        'recipe_id': 1 + i,
+        'title': f'Recipe {i}',
+        'difficulty': rng.choice(DIFFICULTIES),
+        'recipe_ingredients': [{'ingredients': ingredient}
+                               for ingredient in rng.sample(ingredients, rng.randint(0, 8))]
+    } for i in range(recipe_count)]
+    return recipes, ingredients
+
+
+def random_names(rng, ingredients, low=1, high=10):
+    return [ingredient['name'] for ingredient in rng.sample(ingredients, rng.randint(low, high))]
+
+
+def recipe_names(recipe):
+    return {ri['ingredients']['name'] for ri in recipe['recipe_ingredients']}
+
+
+def brute_force_excluded(recipe, diets, allergy_ids):
+    """Whether a user with these restrictions must not get this recipe"""
+    forbidden = set()
+    for diet in diets:
+        forbidden |= DIETARY_EXCLUDED_CATEGORIES.get(diet, set())
+    for ri in recipe['recipe_ingredients']:
+        ingredient = ri['ingredients']
+        if ingredient['ingredient_id'] in allergy_ids or ingredient['category'] in forbidden:
+            return True
+        if 'allergen-free' in diets and ingredient['common_allergen']:
+            return True
+    return False
+
+
+def name_matches(detected, name):
+    return detected in name or name in detected
+
+
+def brute_force_scores(recipes, names, skill_level):
+    """(matched names, coverage, score) of every recipe, computed one recipe at a time"""
+    multipliers = difficulty_multipliers(skill_level)
+    results = []
+    for recipe in recipes:
+        own = recipe_names(recipe)
+        matched = [name for name in names if any(name_matches(name, own_name) for own_name in own)]
+        covered = [own_name for own_name in own if any(name_matches(name, own_name) for name in names)]
+        code = DIFFICULTY_CODES.get((recipe['difficulty'] or 'easy').lower(), OTHER_DIFFICULTY)
+        results.append((matched, len(covered) / len(own) if own else 0.0,
+                        len(matched) / len(names) * 100 * multipliers[code]))
+    return results
+
+
+def brute_force_top_k(recipes, names, skill_level, k, excluded=None):
+    """Best k matching recipes by score, then catalog order, and the number of matching recipes"""
+    ranked = [(-score, row, recipes[row]['recipe_id'], score, matched)
+              for row, (matched, _, score) in enumerate(brute_force_scores(recipes, names, skill_level))
+              if matched and (excluded is None or not excluded[row])]
+    ranked.sort()
+    return [(recipe_id, score, matched) for _, _, recipe_id, score, matched in ranked[:k]], len(ranked)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('skill_level', SKILL_LEVELS)
+def test_score_matches_brute_force(seed, skill_level):
+    recipes, ingredients = make_catalog(seed)
+    index = RecipeIndex(recipes)
+    names = random_names(random.Random(seed), ingredients)
+
+    result = index.score(names, skill_level)
+
+    expected = brute_force_scores(recipes, names, skill_level)
+    assert result['match_counts'].tolist() == [len(matched) for matched, _, _ in expected]
+    assert result['coverage'].tolist() == pytest.approx([coverage for _, coverage, _ in expected])
+    assert result['scores'].tolist() == pytest.approx([score for _, _, score in expected])
+    assert result['matching_count'] == sum(1 for matched, _, _ in expected if matched)
+    for row, (matched, _, _) in enumerate(expected):
+        assert index.matched_names(result, row) == matched
+
+
+def test_score_normalizes_and_matches_substrings():
+    recipes, _ = make_catalog(7)
+    index = RecipeIndex(recipes)
+    # 'ingredient 1' is also contained in 'ingredient 10' ... 'ingredient 19'
+    names = ['ingredient 1', ' Ingredient 22', 'ingredient 22', 'unknown thing', '']
+
+    result = index.score(names)
+
+    normalized = ['ingredient 1', 'ingredient 22', 'unknown thing']
+    assert result['detected_names'] == normalized
+    assert result['scores'].tolist() == pytest.approx(
+        [score for _, _, score in brute_force_scores(recipes, normalized, 'beginner')])
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_score_batch_matches_score(seed):
+    recipes, ingredients = make_catalog(seed)
+    index = RecipeIndex(recipes)
+    rng = random.Random(seed)
+    name_sets = [random_names(rng, ingredients) for _ in range(6)] + [[]]
+    skill_levels = [rng.choice(SKILL_LEVELS) for _ in name_sets]
+
+    batch = index.score_batch(name_sets, skill_levels).toarray()
+
+    for column, (names, skill_level) in enumerate(zip(name_sets, skill_levels)):
+        assert batch[:, column].tolist() == pytest.approx(index.score(names, skill_level)['scores'].tolist())
+
+
+def test_top_recommendations_orders_by_score_then_catalog_order():
+    recipes, ingredients = make_catalog(3)
+    index = RecipeIndex(recipes)
+    names = random_names(random.Random(3), ingredients, 8, 12)
+
+    recommendations = index.top_recommendations(index.score(names, 'beginner'), 20)
+
+    expected, _ = brute_force_top_k(recipes, names, 'beginner', 20)
+    assert [(r['recipe_id'], r['matched_ingredients']) for r in recommendations] == \
+        [(recipe_id, matched) for recipe_id, _, matched in expected]
+    assert [r['recommendation_score'] for r in recommendations] == \
+        pytest.approx([score for _, score, _ in expected])
+
+
+def test_empty_catalog_scores_nothing():
+    index = RecipeIndex([])
+
+    result = index.score(['tomato'])
+
+    assert result['matching_count'] == 0
+    assert index.top_recommendations(result) == []
+    assert index.score_batch([['tomato']]).shape == (0, 1)
+
+
+def test_extend_matches_full_build():
+    recipes, ingredients = make_catalog(8)
+    names = random_names(random.Random(8), ingredients)
+
+    extended = RecipeIndex(recipes[:150]).extend(recipes[150:300]).extend(recipes[300:])
+
+    full = RecipeIndex(recipes)
+    assert extended.recipe_ids.tolist() == full.recipe_ids.tolist()
+    assert (extended.matrix != full.matrix).nnz == 0
+    assert extended.score(names)['scores'].tolist() == full.score(names)['scores'].tolist()
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('skill_level', SKILL_LEVELS)
+def test_top_k_matches_brute_force(seed, skill_level):
+    recipes, ingredients = make_catalog(seed)
+    index = RecipeIndex(recipes)
+    rng = random.Random(seed)
+    for k in (1, 5, 8, 50):
+        names = random_names(rng, ingredients)
+        expected, matching = brute_force_top_k(recipes, names, skill_level, k)
+
+        result = index.top_k(names, skill_level, k)
+
+        assert [(r['recipe_id'], r['matched_ingredients']) for r in result['recommendations']] == \
+            [(recipe_id, matched) for recipe_id, _, matched in expected]
+        assert [r['recommendation_score'] for r in result['recommendations']] == \
+            pytest.approx([score for _, score, _ in expected])
+        assert result['matching_count'] == matching
+        assert result['candidates_scored'] <= matching
+
+
+def test_top_k_reports_the_same_recommendations_as_full_scoring():
+    recipes, ingredients = make_catalog(11)
+    index = RecipeIndex(recipes)
+    # Substring matches make several detections land on the same columns
+    names = ['ingredient 1', 'ingredient 2'] + [ingredient['name'] for ingredient in ingredients[5:15]]
+
+    expected = index.top_recommendations(index.score(names, 'intermediate'), 8)
+
+    recommendations = index.top_k(names, 'intermediate', 8)['recommendations']
+    assert [(r['recipe_id'], r['matched_ingredients']) for r in recommendations] == \
+        [(r['recipe_id'], r['matched_ingredients']) for r in expected]
+    for field in ('recommendation_score', 'ingredient_match_percentage', 'ingredient_coverage'):
+        assert [r[field] for r in recommendations] == pytest.approx([r[field] for r in expected])
+
+
+def test_top_k_falls_back_to_full_scoring_past_64_detections():
+    recipes, ingredients = make_catalog(12, ingredient_count=80)
+    index = RecipeIndex(recipes)
+    names = [ingredient['name'] for ingredient in ingredients[:70]]
+
+    result = index.top_k(names, 'beginner', 10)
+
+    expected, matching = brute_force_top_k(recipes, names, 'beginner', 10)
+    assert [r['recipe_id'] for r in result['recommendations']] == [recipe_id for recipe_id, _, _ in expected]
+    assert result['matching_count'] == matching
+
+
+def test_canonical_ingredients_ignore_order_case_and_duplicates():
+    recipes, ingredients = make_catalog(9)
+    index = RecipeIndex(recipes)
+    first, second = ingredients[3]['name'], ingredients[17]['name']
+
+    key = index.canonical_ingredients([second, 'Mystery Herb', first.upper(), f' {second} '])
+
+    assert key == index.canonical_ingredients(['mystery herb', first, second])
+    assert key == (tuple(sorted([ingredients[3]['ingredient_id'], ingredients[17]['ingredient_id']])),
+                   ('mystery herb',))
+    assert index.canonical_ingredients([]) == ((), ())
+
+
+def brute_force_near_miss(recipes, on_hand, max_missing):
+    """Recipes missing at most max_missing ingredients, fewest missing then largest share on hand first"""
+    found = []
+    for row, recipe in enumerate(recipes):
+        own = recipe_names(recipe)
+        missing = own - on_hand
+        if own and len(missing) <= max_missing:
+            found.append((len(missing), -(len(own) - len(missing)) / len(own), row, recipe['recipe_id'], missing))
+    found.sort()
+    return [(recipe_id, missing) for _, _, _, recipe_id, missing in found]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('max_missing', [0, 1, 3])
+def test_near_miss_matches_brute_force(seed, max_missing):
+    recipes, ingredients = make_catalog(seed, recipe_count=300, ingredient_count=30)
+    index = RecipeIndex(recipes)
+    on_hand = set(random_names(random.Random(seed), ingredients, 10, 20))
+
+    result = index.near_miss(sorted(on_hand), max_missing, limit=1000)
+
+    expected = brute_force_near_miss(recipes, on_hand, max_missing)
+    assert [(r['recipe_id'], set(r['missing_ingredients'])) for r in result['recipes']] == expected
+    assert [r['missing_count'] for r in result['recipes']] == [len(missing) for _, missing in expected]
+    assert result['total_found'] == len(expected)
+
+
+def test_near_miss_limit_keeps_the_closest_recipes():
+    recipes, ingredients = make_catalog(6, recipe_count=300, ingredient_count=30)
+    index = RecipeIndex(recipes)
+    on_hand = {ingredient['name'] for ingredient in ingredients[:15]}
+
+    result = index.near_miss(sorted(on_hand), 2, limit=5)
+
+    expected = brute_force_near_miss(recipes, on_hand, 2)
+    assert [r['recipe_id'] for r in result['recipes']] == [recipe_id for recipe_id, _ in expected[:5]]
+    assert result['total_found'] == len(expected)
+
+
+def test_near_miss_skips_excluded_recipes():
+    recipes, ingredients = make_catalog(4, recipe_count=300, ingredient_count=30)
+    index = RecipeIndex(recipes)
+    on_hand = set(random_names(random.Random(4), ingredients, 10, 20))
+    excluded = index.exclusion_mask(['vegetarian'], [ingredients[0]['ingredient_id']])
+
+    result = index.near_miss(sorted(on_hand), 2, limit=1000, excluded=excluded)
+
+    excluded_ids = {recipe['recipe_id'] for row, recipe in enumerate(recipes) if excluded[row]}
+    expected = [(recipe_id, missing) for recipe_id, missing in brute_force_near_miss(recipes, on_hand, 2)
+                if recipe_id not in excluded_ids]
+    assert excluded_ids and len(expected) < len(brute_force_near_miss(recipes, on_hand, 2))
+    assert [r['recipe_id'] for r in result['recipes']] == [recipe_id for recipe_id, _ in expected]
+    assert result['total_found'] == len(expected)
+
+
+@pytest.mark.parametrize('diets', [
+    ['vegetarian'], ['vegan'], ['pescatarian'], ['gluten-free', 'dairy-free'], ['allergen-free'], ['Vegetarian ']
+])
+def test_exclusion_mask_matches_brute_force(diets):
+    recipes, ingredients = make_catalog(1)
+    index = RecipeIndex(recipes)
+    allergy_ids = {ingredients[2]['ingredient_id'], ingredients[9]['ingredient_id']}
+    normalized = [diet.lower().strip() for diet in diets]
+
+    excluded = index.exclusion_mask(diets, sorted(allergy_ids))
+
+    assert excluded.tolist() == [brute_force_excluded(recipe, normalized, allergy_ids) for recipe in recipes]
+
+
+def test_exclusion_mask_allergies_only():
+    recipes, ingredients = make_catalog(2)
+    index = RecipeIndex(recipes)
+    allergy_ids = {ingredients[4]['ingredient_id']}
+
+    excluded = index.exclusion_mask([], [ingredients[4]['ingredient_id'], 999999])
+
+    assert excluded.tolist() == [brute_force_excluded(recipe, [], allergy_ids) for recipe in recipes]
+
+
+def test_exclusion_mask_none_when_nothing_excluded():
+    recipes, _ = make_catalog(2)
+    index = RecipeIndex(recipes)
+
+    assert index.exclusion_mask() is None
+    assert index.exclusion_mask(['no-such-diet', None], [999999]) is None
+
+
+@pytest.mark.parametrize('name_count', [12, 70])
+def test_top_k_skips_excluded_recipes(name_count):
+    recipes, ingredients = make_catalog(3, ingredient_count=80)
+    index = RecipeIndex(recipes)
+    excluded = index.exclusion_mask(['vegetarian'], [ingredients[0]['ingredient_id']])
+    names = [ingredient['name'] for ingredient in ingredients[:name_count]]
+    expected, matching = brute_force_top_k(recipes, names, 'beginner', 20, excluded)
+
+    result = index.top_k(names, 'beginner', 20, excluded)
+
+    assert [r['recipe_id'] for r in result['recommendations']] == [recipe_id for recipe_id, _, _ in expected]
+    assert result['matching_count'] == matching
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('max_items', [1, 3, 5])
+def test_shopping_list_unlocks_are_exact(seed, max_items):
+    recipes, ingredients = make_catalog(seed, recipe_count=200, ingredient_count=30)
+    index = RecipeIndex(recipes)
+    on_hand = set(random_names(random.Random(seed), ingredients, 12, 12))
+    excluded = index.exclusion_mask(['vegetarian'])
+
+    result = index.shopping_list(sorted(on_hand), max_items, excluded, recipes_per_item=1000)
+
+    allowed = [row for row, recipe in enumerate(recipes)
+               if recipe['recipe_ingredients'] and not excluded[row]]
+    assert result['already_cookable'] == sum(1 for row in allowed if recipe_names(recipes[row]) <= on_hand)
+    assert result['candidates_considered'] == sum(
+        1 for row in allowed if 0 < len(recipe_names(recipes[row]) - on_hand) <= max_items)
+    assert len(result['items']) <= max_items
+
+    # Each item unlocks exactly the recipes it completes, given everything bought before it
+    have = set(on_hand)
+    for item in result['items']:
+        assert item['name'] not in have
+        before = {row for row in allowed if recipe_names(recipes[row]) <= have}
+        have.add(item['name'])
+        after = {row for row in allowed if recipe_names(recipes[row]) <= have}
+        assert sorted(r['recipe_id'] for r in item['unlocks']) == \
+            sorted(recipes[row]['recipe_id'] for row in after - before)
+        assert item['unlocks_count'] == len(after - before)
+    assert result['unlocked_count'] == sum(item['unlocks_count'] for item in result['items'])
+
+
+def test_shopping_list_first_pick_is_best_single_item():
+    recipes, ingredients = make_catalog(4, recipe_count=200, ingredient_count=30)
+    index = RecipeIndex(recipes)
+    on_hand = {ingredient['name'] for ingredient in ingredients[:15]}
+
+    result = index.shopping_list(sorted(on_hand), 1)
+
+    # With one purchase allowed, only recipes missing exactly one ingredient count
+    unlocks = {}
+    for recipe in recipes:
+        missing = recipe_names(recipe) - on_hand
+        if len(missing) == 1:
+            name = missing.pop()
+            unlocks[name] = unlocks.get(name, 0) + 1
+    assert result['items'][0]['unlocks_count'] == max(unlocks.values())
+    assert result['unlocked_count'] == max(unlocks.values())
+
+
+def test_shopping_list_empty_when_nothing_in_reach():
+    recipes, ingredients = make_catalog(5, recipe_count=50)
+    index = RecipeIndex(recipes)
+    excluded = np.ones(len(recipes), dtype=bool)
+
+    result = index.shopping_list([ingredients[0]['name']], 3, excluded)
+
+    assert result == {'items': [], 'unlocked_count': 0, 'already_cookable': 0, 'candidates_considered': 0}
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_top_k_batch_matches_top_k(seed):
+    recipes, ingredients = make_catalog(seed, ingredient_count=80)
+    index = RecipeIndex(recipes)
+    rng = random.Random(seed)
+    name_sets = [random_names(rng, ingredients) for _ in range(5)] + [[], random_names(rng, ingredients, 70, 70)]
+    skill_levels = [rng.choice(SKILL_LEVELS) for _ in name_sets]
+    excluded = [None, index.exclusion_mask(['vegan']), None, index.exclusion_mask(['vegetarian']), None, None,
+                index.exclusion_mask(['allergen-free'])]
+
+    results = index.top_k_batch(name_sets, skill_levels, 10, excluded)
+
+    for names, skill_level, fridge_excluded, result in zip(name_sets, skill_levels, excluded, results):
+        expected = index.top_k(names, skill_level, 10, fridge_excluded)
+        assert [(r['recipe_id'], r['matched_ingredients']) for r in result['recommendations']] == \
+            [(r['recipe_id'], r['matched_ingredients']) for r in expected['recommendations']]
+        for field in ('recommendation_score', 'ingredient_coverage'):
+            assert [r[field] for r in result['recommendations']] == \
+                pytest.approx([r[field] for r in expected['recommendations']])
+        assert result['matching_count'] == expected['matching_count']
+
+
+def test_top_k_stops_at_an_expired_deadline():
+    recipes, ingredients = make_catalog(13, recipe_count=2000)
+    index = RecipeIndex(recipes)
+    names = [ingredient['name'] for ingredient in ingredients[:20]]
+    complete = index.top_k(names, 'beginner', 1000)
+
+    partial = index.top_k(names, 'beginner', 1000, deadline=Deadline(0))
+
+    assert not complete['partial'] and partial['partial']
+    assert partial['candidates_scored'] == TOP_K_BLOCK_SIZE < complete['candidates_scored']
+    assert index.top_k(names, 'beginner', 1000, deadline=Deadline(60)) == complete
+
+
+def test_fingerprint_identifies_catalog_contents():
+    recipes, _ = make_catalog(14)
+    fingerprint = RecipeIndex(recipes).fingerprint
+
+    # Another process loading the same rows, in one go or by the same increments, agrees
+    assert RecipeIndex(recipes).fingerprint == fingerprint
+    assert RecipeIndex(recipes[:100]).extend(recipes[100:]).fingerprint == \
+        RecipeIndex(recipes[:100]).extend(recipes[100:]).fingerprint
+
+    edited = [dict(recipe) for recipe in recipes]
+    edited[150]['title'] = 'Renamed'
+    assert RecipeIndex(edited).fingerprint != fingerprint
+    assert RecipeIndex(recipes[:-1]).fingerprint != fingerprint
+    assert RecipeIndex(recipes[:100]).extend(recipes[100:]).fingerprint != \
+        RecipeIndex(recipes[:100]).extend(edited[100:]).fingerprint
@@ -0,0 +1,197 @@
+"""
+Trending service tests
+Leaderboard invariants under random changes, seeding from favorites history and snapshot merges
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+import pytest
+from services.trending import TrendingService
+
+
+class FakeFavorites:
+    """Stands in for SupabaseService.get_favorites_after, two favorites per page, optionally blocking"""
+
+    def __init__(self, favorites=None, block=False):
+        self.favorites = favorites or []
+        self.release = threading.Event()
+        self.started = threading.Event()
+        if not block:
+            self.release.set()
+
+    def get_favorites_after(self, favorite_id):
+        self.started.set()
+        self.release.wait(5)
+        page = [f for f in self.favorites if f['favorite_id'] > favorite_id][:2]
+        return {'success': True, 'data': page}
+
+
+def write_snapshot(path, landmark, scores=None):
+    with open(path, 'w') as f:
+        json.dump({'landmark': landmark, 'scores': scores or {}}, f)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / 'trending.json')
+    write_snapshot(path, time.time())
+    return path
+
+
+def make_service(path, db=None, top_n=3):
+    return TrendingService(db or FakeFavorites(), path, top_n=top_n, snapshot_interval=3600)
+
+
+def assert_board_invariants(service):
+    board = service._board
+    assert board == sorted(board, reverse=True)
+    assert len(board) <= 2 * service.top_n
+    assert len({recipe_id for _, recipe_id in board}) == len(board)
+    on_board = set()
+    for score, recipe_id in board:
+        assert score == service.scores[recipe_id]
+        on_board.add(recipe_id)
+    for recipe_id, score in service.scores.items():
+        if recipe_id not in on_board:
+            assert score <= service._outside_bound
+
+
+def brute_force_trending(service, limit):
+    ranked = sorted(((score, recipe_id) for recipe_id, score in service.scores.items() if score > 0), reverse=True)
+    return [recipe_id for _, recipe_id in ranked[:limit]]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_board_invariants_hold_under_random_changes(snapshot_path, seed):
+    service = make_service(snapshot_path)
+    rng = random.Random(seed)
+    for _ in range(500):
+        recipe_id = rng.randint(1, 25)
+        if rng.random() < 0.35 and recipe_id in service.scores:
+            delta = -min(rng.random() * 2, service.scores[recipe_id])
+        else:
+            delta = rng.random()
+        with service._lock:
+            service._add(recipe_id, delta)
+            assert_board_invariants(service)
+
+        limit = rng.randint(1, service.top_n)
+        assert [r['recipe_id'] for r in service.get_trending(limit)] == brute_force_trending(service, limit)
+        assert_board_invariants(service)
+
+
+def test_trending_limit_is_capped_and_decayed(snapshot_path):
+    service = make_service(snapshot_path, top_n=2)
+    for recipe_id in range(1, 6):
+        for _ in range(recipe_id):
+            service.record_favorite(recipe_id, timestamp=service.landmark)
+
+    trending = service.get_trending(10)
+
+    assert [r['recipe_id'] for r in trending] == [5, 4]
+    assert all(r['score'] <= r['recipe_id'] for r in trending)
+
+
+def test_unfavorite_never_goes_below_zero(snapshot_path):
+    service = make_service(snapshot_path)
+    service.record_favorite(1, timestamp=service.landmark - 3600 * 48)
+
+    service.record_unfavorite(1)
+    service.record_unfavorite(1)
+    service.record_unfavorite(2)
+
+    assert service.scores == {1: 0.0}
+    assert service.get_trending() == []
+
+
+def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+
+
+def test_seed_counts_every_favorite(tmp_path):
+    added_at = datetime.fromtimestamp(time.time() - 3600, timezone.utc).isoformat()
+    db = FakeFavorites([{'favorite_id': i, 'recipe_id': 1 + i % 2, 'added_at': added_at} for i in range(1, 6)])
+    service = make_service(str(tmp_path / 'trending.json'), db)
+    weight = service._weight(datetime.fromisoformat(added_at).timestamp())
+
+    wait_for(lambda: sum(service.scores.values()) >= 5 * weight * 0.999)
+
+    assert service.scores == pytest.approx({1: 2 * weight, 2: 3 * weight})
+    assert weight == pytest.approx(2 ** (-1 / 24), rel=1e-3)
+
+
+def test_snapshot_round_trip(snapshot_path):
+    service = make_service(snapshot_path)
+    for recipe_id in (1, 1, 2):
+        service.record_favorite(recipe_id, timestamp=service.landmark)
+
+    service.snapshot()
+
+    restored = make_service(snapshot_path)
+    assert restored.landmark == service.landmark
+    assert restored.scores == service.scores
+    assert [r['recipe_id'] for r in restored.get_trending()] == [1, 2]
+
+
+def test_seed_does_not_double_count_live_favorites(tmp_path):
+    added_at = datetime.fromtimestamp(time.time() - 3600, timezone.utc).isoformat()
+    db = FakeFavorites([{'favorite_id': i, 'recipe_id': 1, 'added_at': added_at} for i in (1, 2, 3)], block=True)
+    service = make_service(str(tmp_path / 'trending.json'), db)
+    db.started.wait(5)
+
+    timestamp = service.landmark
+    service.record_favorite(1, favorite_id=3, timestamp=timestamp)  # Also read by the seed
+    service.record_favorite(1, favorite_id=4, timestamp=timestamp)  # Added after the seed's last page
+    service.record_favorite(2, timestamp=timestamp)
+    service.record_unfavorite(2)
+    db.release.set()
+    wait_for(lambda: not service._seeding)
+
+    weight = service._weight(datetime.fromisoformat(added_at).timestamp())
+    assert not service._seeding
+    assert service.scores == pytest.approx({1: 3 * weight + 1, 2: 0})
+
+
+def test_snapshot_merges_workers(snapshot_path):
+    first, second = make_service(snapshot_path), make_service(snapshot_path)
+    landmark = first.landmark
+    for _ in range(3):
+        first.record_favorite(1, timestamp=landmark)
+    for _ in range(2):
+        second.record_favorite(1, timestamp=landmark)
+    second.record_favorite(2, timestamp=landmark)
+
+    first.snapshot()
+    second.snapshot()
+
+    assert second.scores == pytest.approx({1: 5, 2: 1})
+    with open(snapshot_path) as f:
+        assert json.load(f)['scores'] == pytest.approx({'1': 5, '2': 1})
+
+    # The first worker catches up at its next snapshot, without losing its own new favorite
+    first.record_favorite(3, timestamp=landmark)
+    first.snapshot()
+    assert first.scores == pytest.approx({1: 5, 2: 1, 3: 1})
+    assert [r['recipe_id'] for r in first.get_trending(3)] == [1, 3, 2]
+    assert_board_invariants(first)
+
+
+def test_snapshot_merges_across_landmarks(snapshot_path):
+    first, second = make_service(snapshot_path), make_service(snapshot_path)
+    second.record_favorite(1, timestamp=second.landmark)
+    # A favorite far enough ahead moves the second worker's landmark forward
+    later = second.landmark + 3600 * 24 * 90
+    second.record_favorite(2, timestamp=later)
+    first.record_favorite(1, timestamp=first.landmark)
+
+    second.snapshot()
+    first.snapshot()
+
+    assert first.landmark == second.landmark == later
+    assert first.scores[2] == pytest.approx(1)
+    assert first.scores[1] == pytest.approx(2 * 2 ** -90, rel=1e-6)
@@ -0,0 +1,222 @@
+"""
+In-process caching utilities
+"""
+import copy
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """Roughly estimate the memory used by a value and the containers inside it"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    elif hasattr(value, 'nbytes'):
+        size += int(value.nbytes)
+    return size
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after a time-to-live
+
+    Besides entries, the cache keeps an invalidation version per key, which
+    is never evicted. A loader reads the version before loading and stores
+    with set_if_version(), so a value loaded before an invalidation is
+    dropped instead of overwriting fresher data.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300, name: str = 'cache'):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of entries before least recently used ones are evicted
+            ttl: Default seconds an entry stays valid
+            name: Name used in logs and stats
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._versions: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self._memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or default if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries when full"""
+        size = estimate_size(value)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at, size)
+
+    def version(self, version_key: Hashable) -> int:
+        """Get the invalidation version of a key, 0 if it was never invalidated"""
+        with self._lock:
+            return self._versions.get(version_key, 0)
+
+    def bump_version(self, version_key: Hashable):
+        """Invalidate a key's version, so loads that read the old version are not stored"""
+        with self._lock:
+            self._versions[version_key] = self._versions.get(version_key, 0) + 1
+
+    def set_if_version(self, key: Hashable, value: Any, version_key: Hashable, version: int,
+                       ttl: Optional[float] = None) -> bool:
+        """Store a value only if version_key is still at the version read before loading it"""
+        size = estimate_size(value)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if self._versions.get(version_key, 0) != version:
+                return False
+            self._store(key, value, expires_at, size)
+            return True
+
+    def delete(self, key: Hashable):
+        """Remove one entry if present"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._memory = 0
+        logger.info(f"Cache '{self.name}' cleared")
+
+    def keys(self) -> List[Hashable]:
+        """Get the keys currently held, least recently used first"""
+        with self._lock:
+            return list(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit ratio, size and memory usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_bytes': self._memory
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: Hashable, value: Any, expires_at: float, size: int):
+        """Add or replace an entry and evict past max_size; the caller must hold the lock"""
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires_at, size)
+        self._memory += size
+
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        """Remove an entry; the caller must hold the lock"""
+        _, _, size = self._entries.pop(key)
+        self._memory -= size
+
+
+class ReadThroughCache:
+    """
+    Cache of service read results, with a time-to-live per namespace
+
+    Methods decorated with read_through() are served from here, keyed by
+    namespace and arguments; only successful results are stored. Write methods
+    call invalidate() for the entries they make stale, and a load that started
+    before an invalidation in its namespace is not stored. The namespace
+    versions live in the entry store, so this also holds for invalidations
+    made by other processes sharing it. Callers get copies, so changing a
+    result never changes what later callers see.
+    """
+
+    def __init__(self, cache: TTLCache, ttls: Optional[Dict[str, float]] = None):
+        """
+        Initialize the read cache
+
+        Args:
+            cache: Entry store, which also bounds size and evicts least recently used entries
+            ttls: Seconds entries stay valid per namespace; others use the store's default
+        """
+        self.cache = cache
+        self.ttls = ttls or {}
+
+    def get_or_load(self, namespace: str, args: tuple, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Get a cached result, or call loader and cache its result if successful"""
+        key = (namespace,) + tuple(args)
+        result = self.cache.get(key)
+        if result is None:
+            version = self.cache.version(namespace)
+            result = loader()
+            if result.get('success') and self.ttls.get(namespace) != 0:
+                self.cache.set_if_version(key, result, namespace, version, self.ttls.get(namespace))
+        return copy.deepcopy(result)
+
+    def invalidate(self, namespace: str, *args):
+        """Drop the entry for these arguments, or the whole namespace when none are given"""
+        self.cache.bump_version(namespace)
+        if args:
+            self.cache.delete((namespace,) + args)
+        else:
+            for key in self.cache.keys():
+                if key[0] == namespace:
+                    self.cache.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the entry store's statistics"""
+        return dict(self.cache.stats(), namespace_ttls=self.ttls)
+
+
+def read_through(namespace: str) -> Callable:
+    """Serve a service method's results from the service's read_cache, when it has one"""
+    def decorate(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def call(self, *args):
+            if self.read_cache is None:
+                return method(self, *args)
+            return self.read_cache.get_or_load(namespace, args, lambda: method(self, *args))
+        return call
+    return decorate
@@ -0,0 +1,155 @@
+"""
+Supabase client pool
+Reusable Supabase clients checked out per request, so concurrent requests never share client state
+"""
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict
+from supabase import create_client, Client
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ClientPool:
+    """
+    Fixed-size pool of Supabase clients
+
+    Each client keeps its own keep-alive HTTP connections, so reusing clients
+    avoids a new TLS handshake per request. Within a request scope (see
+    scope()) the first use checks a client out and binds it to the thread
+    until the scope ends. Threads outside any scope, such as background jobs,
+    get a private client of their own instead of drawing from the pool.
+    """
+
+    def __init__(self, supabase_url: str, supabase_key: str, size: int = 8,
+                 checkout_timeout: float = 30.0, name: str = 'supabase'):
+        """
+        Initialize the pool; clients are created on first checkout
+
+        Args:
+            supabase_url: Supabase project URL
+            supabase_key: API key every client authenticates with
+            size: Most clients checked out at once, normally the worker's thread count
+            checkout_timeout: Seconds to wait for a free client before giving up
+            name: Name used in logs and stats
+        """
+        self.supabase_url = supabase_url
+        self.supabase_key = supabase_key
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.name = name
+
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._waits = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def client(self) -> Client:
+        """Get the client bound to this thread, checking one out if a scope is open"""
+        local = self._local
+        client = getattr(local, 'client', None)
+        if client is None:
+            if getattr(local, 'depth', 0):
+                client = self.checkout()
+                local.pooled = True
+            else:
+                client = create_client(self.supabase_url, self.supabase_key)
+                local.pooled = False
+            local.client = client
+        return client
+
+    @contextmanager
+    def scope(self):
+        """Bind at most one pooled client to this thread until the block ends"""
+        self.begin()
+        try:
+            yield
+        finally:
+            self.end()
+
+    def begin(self):
+        """Open a request scope on this thread"""
+        self._local.depth = getattr(self._local, 'depth', 0) + 1
+
+    def end(self):
+        """Close a request scope, returning its client to the pool when the outermost one ends"""
+        local = self._local
+        local.depth = max(getattr(local, 'depth', 0) - 1, 0)
+        if local.depth == 0 and getattr(local, 'pooled', False):
+            self.checkin(local.client)
+            local.client = None
+            local.pooled = False
+
+    @contextmanager
+    def borrow(self, discard: bool = False):
+        """
+        Check out a client for one block
+
+        Args:
+            discard: Replace the client afterwards instead of returning it, for
+                     calls that change its auth session, which must not leak
+                     into its next user
+        """
+        client = self.checkout()
+        try:
+            yield client
+        finally:
+            self.checkin(client, discard=discard)
+
+    def checkout(self) -> Client:
+        """
+        Take a client from the pool, creating one while under size
+
+        Raises:
+            RuntimeError: If no client is free within checkout_timeout
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                self._waits += 1
+                create = False
+        if create:
+            try:
+                return create_client(self.supabase_url, self.supabase_key)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            raise RuntimeError(f"No {self.name} client free after {self.checkout_timeout}s "
+                               f"(pool size {self.size})")
+
+    def checkin(self, client: Client, discard: bool = False):
+        """Return a client to the pool, or replace it with a fresh one"""
+        if discard:
+            try:
+                client = create_client(self.supabase_url, self.supabase_key)
+            except Exception as e:
+                logger.error(f"Could not replace {self.name} client: {str(e)}")
+                with self._lock:
+                    self._created -= 1
+                return
+        self._idle.put(client)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'size': self.size,
+                'created': self._created,
+                'idle': self._idle.qsize(),
+                'waits': self._waits
+            }
@@ -0,0 +1,58 @@
+"""
+Request deadlines
+Time budgets carried through blocking calls and long computations
+"""
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Blocking calls run here so the caller can stop waiting when its deadline passes
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='deadline')
+
+class Deadline:
+    """Point in time by which a request must answer"""
+
+    def __init__(self, seconds: float):
+        """
+        Start a deadline
+
+        Args:
+            seconds: Time budget from now
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        """Check whether the budget is used up"""
+        return time.monotonic() >= self.expires_at
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Start a blocking call in the background, to be collected with wait()"""
+        return _executor.submit(fn, *args, **kwargs)
+
+    def wait(self, future: Future, default: Any = None) -> tuple:
+        """
+        Wait for a submitted call until the deadline
+
+        Returns:
+            (result, True) if it finished in time, otherwise (default, False);
+            a late call keeps running and its result is discarded
+        """
+        try:
+            return future.result(timeout=self.remaining()), True
+        except TimeoutError:
+            return default, False
+
+    def call(self, fn: Callable, *args, default: Any = None, **kwargs) -> tuple:
+        """Run a blocking call, giving up on it when the deadline passes"""
+        if self.expired():
+            return default, False
+        return self.wait(self.submit(fn, *args, **kwargs), default)
+
@@ -0,0 +1,56 @@
+"""
+Keyset pagination utilities
+Opaque continuation tokens over (sort key, id) and the PostgREST filters that resume after them
+"""
+import base64
+import json
+from typing import Any, Dict, Optional
+
+def encode_cursor(sort_by: str, desc: bool, value: Any, last_id: int) -> str:
+    """Build the continuation token for the page after a row"""
+    payload = json.dumps({'s': sort_by, 'd': desc, 'v': value, 'id': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token: str, sort_by: str, desc: bool) -> Dict[str, Any]:
+    """
+    Read a continuation token
+
+    Raises:
+        ValueError: If the token is malformed or was issued for another sort order
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        valid = cursor['s'] == sort_by and cursor['d'] == desc and isinstance(cursor['id'], int)
+    except (ValueError, TypeError, KeyError):
+        valid = False
+    if not valid:
+        raise ValueError('Invalid cursor')
+    return cursor
+
+def _quote(value: Any) -> str:
+    """Format a value for a PostgREST filter"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+def keyset_filter(sort_by: str, desc: bool, value: Optional[Any], id_column: str, last_id: int) -> str:
+    """
+    PostgREST or-filter selecting the rows after (value, last_id)
+
+    Rows are ordered by sort_by (PostgreSQL default null placement: last when
+    ascending, first when descending) and then by id_column ascending.
+    """
+    after_id = f'{id_column}.gt.{last_id}'
+    if value is None:
+        if desc:
+            return f'and({sort_by}.is.null,{after_id}),{sort_by}.not.is.null'
+        return f'and({sort_by}.is.null,{after_id})'
+
+    quoted = _quote(value)
+    beyond = f'{sort_by}.{"lt" if desc else "gt"}.{quoted}'
+    tied = f'and({sort_by}.eq.{quoted},{after_id})'
+    if desc:
+        return f'{beyond},{tied}'
+    return f'{beyond},{tied},{sort_by}.is.null'
@@ -0,0 +1,268 @@
+"""
+Shared cache backend
+Cache entries kept in a SQLite file, so every worker process on a node shares one warm cache
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional
+from utils.cache import TTLCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache_entries (
+    cache_name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    key_data BLOB NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (cache_name, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed ON cache_entries(cache_name, accessed_at);
+CREATE TABLE IF NOT EXISTS cache_versions (
+    cache_name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (cache_name, key)
+) WITHOUT ROWID;
+'''
+
+# Bytes of the file mapped into memory, so reads of hot entries skip read() calls
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Reads refresh an entry's last access at most this often, to keep reads from turning into writes
+ACCESS_RESOLUTION_SECONDS = 1.0
+
+
+def _canonical_key(key: Hashable) -> str:
+    """Text form of a key that is identical in every process"""
+    # str hashes are salted per process, so set order is too; sort sets before writing them out
+    if isinstance(key, (set, frozenset)):
+        return 'frozenset(' + repr(sorted(_canonical_key(item) for item in key)) + ')'
+    if isinstance(key, tuple):
+        return '(' + ', '.join(_canonical_key(item) for item in key) + ',)'
+    return repr(key)
+
+
+class SharedCache(TTLCache):
+    """
+    TTLCache whose entries live in a SQLite file shared between processes
+
+    Each write is a single SQLite transaction, so readers in other processes
+    see either the old entry or the new one, never a partial write. The file
+    is best placed on a memory-backed filesystem such as /dev/shm. Entries
+    past max_size are evicted least recently used first, and expired entries
+    are dropped when they are read or when the cache is full. Invalidation
+    versions are kept in the file too, in a table that is never evicted, so a
+    load in one process is not stored after another process invalidated it.
+    Several caches can share one file under different names. Hit and miss
+    counts are per process; entry counts and memory are for the shared file.
+    """
+
+    def __init__(self, path: str, max_size: int = 1024, ttl: float = 300, name: str = 'cache'):
+        """
+        Initialize the cache, creating the file if needed
+
+        Args:
+            path: SQLite file shared by the processes
+            max_size: Maximum number of entries before least recently used ones are evicted
+            ttl: Default seconds an entry stays valid
+            name: Name of this cache within the file, also used in logs and stats
+        """
+        super().__init__(max_size, ttl, name)
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or default if it is missing or expired"""
+        text_key = _canonical_key(key)
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                'SELECT value, expires_at, accessed_at FROM cache_entries WHERE cache_name = ? AND key = ?',
+                (self.name, text_key)).fetchone()
+            if row is not None and row[1] <= now:
+                with connection:
+                    connection.execute('DELETE FROM cache_entries WHERE cache_name = ? AND key = ? AND expires_at <= ?',
+                                       (self.name, text_key, now))
+                row = None
+            if row is None:
+                self._count(hit=False)
+                return default
+
+            value = pickle.loads(row[0])
+            if now - row[2] >= ACCESS_RESOLUTION_SECONDS:
+                with connection:
+                    connection.execute('UPDATE cache_entries SET accessed_at = ? WHERE cache_name = ? AND key = ?',
+                                       (now, self.name, text_key))
+        except Exception as e:
+            logger.warning(f"Shared cache '{self.name}' read failed: {str(e)}")
+            self._count(hit=False)
+            return default
+
+        self._count(hit=True)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries when full"""
+        self._write(key, value, ttl)
+
+    def version(self, version_key: Hashable) -> int:
+        """Get the invalidation version of a key, 0 if it was never invalidated"""
+        try:
+            row = self._connection().execute(
+                'SELECT version FROM cache_versions WHERE cache_name = ? AND key = ?',
+                (self.name, _canonical_key(version_key))).fetchone()
+            return row[0] if row else 0
+        except Exception as e:
+            logger.warning(f"Shared cache '{self.name}' version read failed: {str(e)}")
+            return 0
+
+    def bump_version(self, version_key: Hashable):
+        """Invalidate a key's version in every process, so loads that read the old version are not stored"""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    'INSERT INTO cache_versions (cache_name, key, version) VALUES (?, ?, 1) '
+                    'ON CONFLICT (cache_name, key) DO UPDATE SET version = version + 1',
+                    (self.name, _canonical_key(version_key)))
+        except Exception as e:
+            logger.warning(f"Shared cache '{self.name}' version update failed: {str(e)}")
+
+    def set_if_version(self, key: Hashable, value: Any, version_key: Hashable, version: int,
+                       ttl: Optional[float] = None) -> bool:
+        """Store a value only if version_key is still at the version read before loading it"""
+        return self._write(key, value, ttl, (_canonical_key(version_key), version))
+
+    def delete(self, key: Hashable):
+        """Remove one entry if present, in every process"""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute('DELETE FROM cache_entries WHERE cache_name = ? AND key = ?',
+                                   (self.name, _canonical_key(key)))
+        except Exception as e:
+            logger.warning(f"Shared cache '{self.name}' delete failed: {str(e)}")
+
+    def clear(self):
+        """Remove every entry, in every process"""
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute('DELETE FROM cache_entries WHERE cache_name = ?', (self.name,))
+            logger.info(f"Cache '{self.name}' cleared")
+        except Exception as e:
+            logger.warning(f"Shared cache '{self.name}' clear failed: {str(e)}")
+
+    def keys(self) -> List[Hashable]:
+        """Get the keys currently held, least recently used first"""
+        try:
+            rows = self._connection().execute(
+                'SELECT key_data FROM cache_entries WHERE cache_name = ? AND expires_at > ? ORDER BY accessed_at',
+                (self.name, time.time())).fetchall()
+            return [pickle.loads(row[0]) for row in rows]
+        except Exception as e:
+            logger.warning(f"Shared cache '{self.name}' key listing failed: {str(e)}")
+            return []
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit ratio, size and memory usage"""
+        try:
+            entries, memory = self._connection().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE cache_name = ?',
+                (self.name,)).fetchone()
+        except Exception as e:
+            logger.warning(f"Shared cache '{self.name}' stats failed: {str(e)}")
+            entries, memory = 0, 0
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': entries,
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_bytes': memory,
+                'path': self.path
+            }
+
+    def __len__(self) -> int:
+        return self.stats()['entries']
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection, reopened after a fork since connections cannot cross processes"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+            connection.isolation_level = 'IMMEDIATE'
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _write(self, key: Hashable, value: Any, ttl: Optional[float], expected_version: Optional[tuple] = None) -> bool:
+        """Store a value in one transaction, first checking (version key, version) when given"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            key_data = pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL)
+            connection = self._connection()
+            with connection:
+                if expected_version is not None:
+                    # Checked inside the write transaction, so no invalidation can land between check and write
+                    version_key, version = expected_version
+                    row = connection.execute('SELECT version FROM cache_versions WHERE cache_name = ? AND key = ?',
+                                             (self.name, version_key)).fetchone()
+                    if (row[0] if row else 0) != version:
+                        return False
+                connection.execute(
+                    'INSERT OR REPLACE INTO cache_entries '
+                    '(cache_name, key, key_data, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (self.name, _canonical_key(key), key_data, data, len(data), expires_at, now))
+                self._evict(connection, now)
+            return True
+        except Exception as e:
+            logger.warning(f"Shared cache '{self.name}' write failed: {str(e)}")
+            return False
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        """Drop expired entries, then least recently used ones, while over max_size; runs inside a write"""
+        excess = connection.execute('SELECT COUNT(*) FROM cache_entries WHERE cache_name = ?',
+                                    (self.name,)).fetchone()[0] - self.max_size
+        if excess <= 0:
+            return
+
+        removed = connection.execute('DELETE FROM cache_entries WHERE cache_name = ? AND expires_at <= ?',
+                                     (self.name, now)).rowcount
+        if excess > removed:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE cache_name = ? AND key IN '
+                '(SELECT key FROM cache_entries WHERE cache_name = ? ORDER BY accessed_at LIMIT ?)',
+                (self.name, self.name, excess - removed))
+            with self._lock:
+                self.evictions += excess - removed
+
+    def _count(self, hit: bool):
+        """Count a lookup in this process's stats"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
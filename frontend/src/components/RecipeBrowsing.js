@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import styled from 'styled-components';
 import { 
@@ -102,6 +102,53 @@ const SearchIcon = styled(FiSearch)`
   font-size: 1.125rem;
 `;
 
+const SuggestionsList = styled.ul`
+  position: absolute;
+  top: calc(100% + 0.25rem);
+  left: 0;
+  right: 0;
+  z-index: 10;
+  margin: 0;
+  padding: 0.5rem 0;
+  list-style: none;
+  background: white;
+  border: 1px solid #e2e8f0;
+  border-radius: 12px;
+  box-shadow: 0 8px 30px rgba(0, 0, 0, 0.12);
+  max-height: 320px;
+  overflow-y: auto;
+`;
+
+const SuggestionGroupLabel = styled.li`
+  padding: 0.25rem 1rem;
+  font-size: 0.75rem;
+  font-weight: 600;
+  color: #a0aec0;
+  text-transform: uppercase;
+`;
+
+const SuggestionItem = styled.li`
+  display: flex;
+  align-items: center;
+  justify-content: space-between;
+  gap: 0.5rem;
+  padding: 0.5rem 1rem;
+  font-size: 0.875rem;
+  color: #2d3748;
+  cursor: pointer;
+  background: ${props => props.active ? '#edf2f7' : 'transparent'};
+  
+  &:hover {
+    background: #edf2f7;
+  }
+  
+  .count {
+    color: #a0aec0;
+    font-size: 0.75rem;
+    white-space: nowrap;
+  }
+`;
+
 const SearchButton = styled.button`
   display: flex;
   align-items: center;
@@ -230,6 +277,13 @@ const RecipeCard = styled(motion.div)`
     transform: translateY(-4px);
     box-shadow: 0 8px 30px rgba(0, 0, 0, 0.15);
   }
+
+  mark {
+    background: #fefcbf;
+    color: inherit;
+    border-radius: 2px;
+    padding: 0 0.1em;
+  }
 `;
 
 const RecipeHeader = styled.div`
@@ -301,6 +355,19 @@ const RecipeDescription = styled.p`
   overflow: hidden;
 `;
 
+const RecipeSnippet = styled(RecipeDescription)`
+  font-style: italic;
+`;
+
+// Search highlights come back as text with <mark> around the matches; render those
+// as elements and everything else as plain text, never as HTML
+const renderHighlighted = (text) =>
+  text.split(/(<mark>.*?<\/mark>)/s).map((part, index) =>
+    part.startsWith('<mark>') && part.endsWith('</mark>')
+      ? <mark key={index}>{part.slice(6, -7)}</mark>
+      : part
+  );
+
 const RecipeMetrics = styled.div`
   display: flex;
   align-items: center;
@@ -427,6 +494,7 @@ const RecipeBrowsing = () => {
   
   // Search and Filter State
   const [searchQuery, setSearchQuery] = useState('');
+  const [submittedQuery, setSubmittedQuery] = useState(''); // Query the results are for; typing only drives suggestions
   const [categoryFilter, setCategoryFilter] = useState('');
   const [difficultyFilter, setDifficultyFilter] = useState('');
   const [timeFilter, setTimeFilter] = useState('');
@@ -438,6 +506,13 @@ const RecipeBrowsing = () => {
   const [totalRecipes, setTotalRecipes] = useState(0);
   const [favoritesLoading, setFavoritesLoading] = useState(false);
   const recipesPerPage = 12;
+  
+  // Typeahead suggestions for the search box
+  const [suggestions, setSuggestions] = useState({ recipes: [], ingredients: [] });
+  const [showSuggestions, setShowSuggestions] = useState(false);
+  const [activeSuggestion, setActiveSuggestion] = useState(-1);
+  const latestSuggestionQuery = useRef('');
+  const searchSubmitted = useRef(false);
 
   const fetchRecipes = useCallback(async (resetPage = false) => {
     setLoading(true);
@@ -446,7 +521,7 @@ const RecipeBrowsing = () => {
         page: resetPage ? 1 : currentPage,
         limit: recipesPerPage,
         sort_by: sortBy,
-        ...(searchQuery && { search: searchQuery }),
+        ...(submittedQuery && { search: submittedQuery }),
         ...(categoryFilter && { category: categoryFilter }),
         ...(difficultyFilter && { difficulty: difficultyFilter }),
         ...(timeFilter && { max_time: parseInt(timeFilter) }),
@@ -456,6 +531,8 @@ const RecipeBrowsing = () => {
       if (resetPage) {
         setCurrentPage(1);
       }
+      const announceEmpty = resetPage || searchSubmitted.current;
+      searchSubmitted.current = false;
 
       const response = await recipeAPI.searchRecipes(params);
       
@@ -470,7 +547,7 @@ const RecipeBrowsing = () => {
       setRecipes(recipes);
       setTotalRecipes(total);
       
-      if (resetPage && recipes.length === 0) {
+      if (announceEmpty && recipes.length === 0) {
         toast('No recipes found matching your criteria', { icon: '🔍' });
       }
     } catch (error) {
@@ -484,7 +561,7 @@ const RecipeBrowsing = () => {
     } finally {
       setLoading(false);
     }
-  }, [currentPage, searchQuery, categoryFilter, difficultyFilter, timeFilter, dietaryFilter, sortBy, recipesPerPage]);
+  }, [currentPage, submittedQuery, categoryFilter, difficultyFilter, timeFilter, dietaryFilter, sortBy, recipesPerPage]);
 
   // Load favorite status for recipes
   const loadFavoriteStatuses = async (recipes) => {
@@ -524,18 +601,99 @@ const RecipeBrowsing = () => {
     }
   }, [recipes]);
 
+  // Fetch suggestions once typing pauses, ignoring responses for older input
+  useEffect(() => {
+    const query = searchQuery.trim();
+    latestSuggestionQuery.current = query;
+    if (query.length < 2) {
+      setSuggestions({ recipes: [], ingredients: [] });
+      return undefined;
+    }
+
+    const timer = setTimeout(async () => {
+      try {
+        const response = await recipeAPI.autocomplete(query, 6);
+        if (latestSuggestionQuery.current === query) {
+          setSuggestions({
+            recipes: response.recipes || [],
+            ingredients: response.ingredients || []
+          });
+          setActiveSuggestion(-1);
+        }
+      } catch (error) {
+        // Suggestions are optional; the search itself still works
+        console.error('Autocomplete failed:', error);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+
+  const suggestionItems = [
+    ...suggestions.recipes.map(recipe => ({ type: 'recipe', key: `r${recipe.recipe_id}`, ...recipe })),
+    ...suggestions.ingredients.map(ingredient => ({ type: 'ingredient', key: `i${ingredient.ingredient_id}`, ...ingredient }))
+  ];
+
+  // Show results for a query; only this, not typing, sends a recipe search
+  const submitSearch = (query) => {
+    setShowSuggestions(false);
+    setSearchQuery(query);
+    // A new query is ranked by relevance; without one there is nothing to rank by
+    if (query && query !== submittedQuery) {
+      setSortBy('relevance');
+    } else if (!query && sortBy === 'relevance') {
+      setSortBy('title');
+    }
+    if (query === submittedQuery && currentPage === 1) {
+      fetchRecipes(true);
+    } else {
+      // The query or page change refetches through the effect above
+      searchSubmitted.current = true;
+      setSubmittedQuery(query);
+      setCurrentPage(1);
+    }
+  };
+
+  const selectSuggestion = (item) => {
+    if (item.type === 'recipe') {
+      setShowSuggestions(false);
+      navigate(`/recipe/${item.recipe_id}`);
+    } else {
+      submitSearch(item.name);
+    }
+  };
+
   const handleSearch = () => {
-    fetchRecipes(true);
+    submitSearch(searchQuery.trim());
   };
 
   const handleKeyPress = (e) => {
     if (e.key === 'Enter') {
-      handleSearch();
+      if (showSuggestions && activeSuggestion >= 0 && suggestionItems[activeSuggestion]) {
+        selectSuggestion(suggestionItems[activeSuggestion]);
+      } else {
+        handleSearch();
+      }
+    }
+  };
+
+  const handleKeyDown = (e) => {
+    if (!showSuggestions || suggestionItems.length === 0) {
+      return;
+    }
+    if (e.key === 'ArrowDown') {
+      e.preventDefault();
+      setActiveSuggestion(prev => (prev + 1) % suggestionItems.length);
+    } else if (e.key === 'ArrowUp') {
+      e.preventDefault();
+      setActiveSuggestion(prev => (prev <= 0 ? suggestionItems.length : prev) - 1);
+    } else if (e.key === 'Escape') {
+      setShowSuggestions(false);
     }
   };
 
   const clearFilters = useCallback(() => {
     setSearchQuery('');
+    setSubmittedQuery('');
     setCategoryFilter('');
     setDifficultyFilter('');
     setTimeFilter('');
@@ -581,7 +739,7 @@ const RecipeBrowsing = () => {
     return (recipe.prep_time_mins || 0) + (recipe.cook_time_mins || 0);
   };
 
-  const hasActiveFilters = searchQuery || categoryFilter || difficultyFilter || timeFilter || dietaryFilter;
+  const hasActiveFilters = searchQuery || submittedQuery || categoryFilter || difficultyFilter || timeFilter || dietaryFilter;
 
   return (
     <BrowsingContainer>
@@ -603,9 +761,42 @@ const RecipeBrowsing = () => {
               type="text"
               placeholder="Search recipes by name, ingredient, or cuisine..."
               value={searchQuery}
-              onChange={(e) => setSearchQuery(e.target.value)}
+              onChange={(e) => {
+                setSearchQuery(e.target.value);
+                setShowSuggestions(true);
+              }}
               onKeyPress={handleKeyPress}
+              onKeyDown={handleKeyDown}
+              onFocus={() => setShowSuggestions(true)}
+              onBlur={() => setShowSuggestions(false)}
+              autoComplete="off"
             />
+            {showSuggestions && suggestionItems.length > 0 && (
+              <SuggestionsList>
+                {suggestionItems.map((item, index) => (
+                  <React.Fragment key={item.key}>
+                    {(index === 0 || suggestionItems[index - 1].type !== item.type) && (
+                      <SuggestionGroupLabel>
+                        {item.type === 'recipe' ? 'Recipes' : 'Ingredients'}
+                      </SuggestionGroupLabel>
+                    )}
+                    <SuggestionItem
+                      active={index === activeSuggestion}
+                      onMouseDown={(e) => {
+                        // Select before the input's blur closes the list
+                        e.preventDefault();
+                        selectSuggestion(item);
+                      }}
+                    >
+                      <span>{item.type === 'recipe' ? item.title : item.name}</span>
+                      {item.type === 'ingredient' && (
+                        <span className="count">{item.recipe_count} recipes</span>
+                      )}
+                    </SuggestionItem>
+                  </React.Fragment>
+                ))}
+              </SuggestionsList>
+            )}
           </SearchInputContainer>
           <SearchButton onClick={handleSearch} disabled={loading}>
             <FiSearch />
@@ -699,8 +890,10 @@ const RecipeBrowsing = () => {
               setCurrentPage(1); // Reset to page 1 when sorting changes
             }}
           >
+            {submittedQuery && <option value="relevance">Sort by Relevance</option>}
             <option value="title">Sort by Name</option>
             <option value="prep_time_mins">Sort by Prep Time</option>
+            <option value="total_time_mins">Sort by Total Time</option>
             <option value="difficulty">Sort by Difficulty</option>
             <option value="servings">Sort by Servings</option>
           </SortSelect>
@@ -727,7 +920,9 @@ const RecipeBrowsing = () => {
                 }}
               >
                 <RecipeHeader>
-                  <RecipeTitle>{recipe.title}</RecipeTitle>
+                  <RecipeTitle>
+                    {recipe.highlights?.title ? renderHighlighted(recipe.highlights.title) : recipe.title}
+                  </RecipeTitle>
                   <FavoriteButton
                     isFavorite={favorites.has(recipe.recipe_id)}
                     disabled={favoritesLoading}
@@ -749,6 +944,10 @@ const RecipeBrowsing = () => {
                   <RecipeDescription>{recipe.description}</RecipeDescription>
                 )}
 
+                {recipe.highlights?.instructions && (
+                  <RecipeSnippet>{renderHighlighted(recipe.highlights.instructions)}</RecipeSnippet>
+                )}
+
                 <RecipeMetrics>
                   <MetricItem>
                     <FiClock />
@@ -32,6 +32,7 @@ export const API_ENDPOINTS = {
     LIST: `${API_BASE_URL}/recipes`,
     CREATE: `${API_BASE_URL}/recipes/create`,
     SEARCH: `${API_BASE_URL}/recipes/search`,
+    AUTOCOMPLETE: `${API_BASE_URL}/recipes/autocomplete`,
     RECOMMEND: `${API_BASE_URL}/recipes/recommend`,
     FAVORITES: `${API_BASE_URL}/recipes/favorites`,
     INGREDIENTS: `${API_BASE_URL}/recipes/ingredients`
@@ -264,11 +264,20 @@ export const recipeAPI = {
         difficulty: params.difficulty || '',
         max_time: params.max_time || null,
         dietary_restriction: params.dietary_restriction || '',
-        sort_by: params.sort_by || 'title',
-        sort_order: params.sort_order || 'asc'
+        sort_by: params.sort_by || (params.search ? 'relevance' : 'title'),
+        sort_order: params.sort_order || 'asc',
+        include_facets: params.include_facets || false
       }
     });
     return response.data;
+  },
+
+  // Typeahead suggestions for recipe titles and ingredient names
+  autocomplete: async (query, limit = 8) => {
+    const response = await api.get(API_ENDPOINTS.RECIPES.AUTOCOMPLETE, {
+      params: { q: query, limit }
+    });
+    return response.data;
   }
 };
 